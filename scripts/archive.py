@@ -0,0 +1,34 @@
+"""
+Pack collector outputs into seekable archives and look payloads up by ID.
+
+    python -m scripts.archive pack <output folder> [archive folder]
+    python -m scripts.archive get <archive folder> <id>
+"""
+
+import sys
+from pathlib import Path
+
+import orjson
+
+from tiktok.storage.archive import ArchiveReader, to_archive
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("pack", "get"):
+        print(__doc__)
+        sys.exit(1)
+
+    if sys.argv[1] == "pack":
+        output_path = Path(sys.argv[2])
+        destination = Path(sys.argv[3]) if len(sys.argv) > 3 else output_path / "archive"
+        writer = to_archive(output_path, destination)
+        print(
+            f"Archived {writer.payloads_written} payloads to {destination}: "
+            f"{writer.bytes_in:,} -> {writer.bytes_written:,} bytes in {writer.frames} frames"
+        )
+    else:
+        with ArchiveReader(Path(sys.argv[2])) as reader:
+            item = reader.get_item(int(sys.argv[3]))
+        if item is None:
+            print(f"No item {sys.argv[3]} in the archive")
+            sys.exit(1)
+        print(orjson.dumps(item, option=orjson.OPT_INDENT_2).decode())
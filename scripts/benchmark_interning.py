@@ -0,0 +1,66 @@
+import gc
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from tiktok.models.apis.comment import CommentListResponse
+from tiktok.models.apis.trending import TrendingResponse
+from tiktok.models.interning import INTERNER
+from tiktok.storage.blobs import iter_logged_responses
+
+LOGS_FOLDER = Path(__file__).parent.parent / "logs_c3"
+"""Bot logs spanning roughly one hour of collection."""
+
+MODELS: dict[str, type[BaseModel]] = {
+    "get_trending": TrendingResponse,
+    "list_comments": CommentListResponse,
+}
+
+
+def load_responses(folder: Path) -> list[tuple[type[BaseModel], bytes]]:
+    """Load the raw responses logged by the bot, re-encoded so each one is parsed fresh."""
+    return [
+        (MODELS[endpoint], json.dumps(payload).encode())
+        for endpoint, payload in iter_logged_responses(folder, list(MODELS))
+    ]
+
+
+def retained_memory(responses: list[tuple[type[BaseModel], bytes]]) -> int:
+    """Return the memory retained by the parsed models."""
+    gc.collect()
+    tracemalloc.start()
+    parsed: list[Any] = [model.model_validate(json.loads(raw)) for model, raw in responses]
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del parsed
+    return size
+
+
+def benchmark(folder: Path) -> None:
+    """Report the memory saved by interning on a replayed collection."""
+    responses = load_responses(folder)
+
+    INTERNER.enabled = False
+    baseline = retained_memory(responses)
+
+    INTERNER.enabled = True
+    INTERNER.clear()
+    interned = retained_memory(responses)
+
+    print(f"Responses replayed: {len(responses)}")
+    print(f"Retained without interning: {baseline / 2**20:.2f} MiB")
+    print(f"Retained with interning:    {interned / 2**20:.2f} MiB (table included)")
+    print(f"Saved: {(baseline - interned) / 2**20:.2f} MiB ({1 - interned / baseline:.1%})")
+    print(
+        f"Intern table: {len(INTERNER)} entries, {INTERNER.hits} hits, "
+        f"{INTERNER.bytes_saved / 2**20:.2f} MiB of duplicate strings dropped"
+    )
+
+
+if __name__ == "__main__":
+    benchmark(Path(sys.argv[1]) if len(sys.argv) > 1 else LOGS_FOLDER)
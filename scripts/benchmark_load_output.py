@@ -0,0 +1,64 @@
+import timeit
+import types
+from typing import Any, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+import tests.data as data
+from tiktok.models.apis.comment import CommentListResponse
+from tiktok.models.apis.search import SearchResponse
+from tiktok.models.apis.trending import TrendingResponse
+
+NUMBER = 200
+
+PAYLOADS: list[tuple[type[BaseModel], dict[str, Any]]] = [
+    (TrendingResponse, data.MULTIPLE_FYP),
+    (TrendingResponse, data.MULTIPLE_FYP_2),
+    (CommentListResponse, data.LIST_COMMENTS_RESPONSE),
+    (SearchResponse, data.SEARCH_RESPONSE),
+]
+
+
+def construct(annotation: Any, value: Any) -> Any:
+    """Build `value` as `annotation` with `model_construct`, recursively, without validation."""
+    origin = get_origin(annotation)
+    if origin is Union or origin is types.UnionType:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return construct(args[0], value) if len(args) == 1 and value is not None else value
+    if origin is list and isinstance(value, list):
+        (item_type,) = get_args(annotation) or (Any,)
+        return [construct(item_type, item) for item in value]
+    if (
+        isinstance(annotation, type)
+        and issubclass(annotation, BaseModel)
+        and isinstance(value, dict)
+    ):
+        fields = annotation.model_fields
+        return annotation.model_construct(
+            **{
+                key: construct(fields[key].annotation, item) if key in fields else item
+                for key, item in value.items()
+            }
+        )
+    return value
+
+
+def benchmark() -> None:
+    """Compare full validation against construction without validation on archived payloads."""
+    for model, payload in PAYLOADS:
+        # Archives store the JSON dump of already validated responses
+        archived = model.model_validate(payload).model_dump(mode="json")
+
+        validate = timeit.timeit(lambda: model.model_validate(archived), number=NUMBER)
+        shallow = timeit.timeit(lambda: model.model_construct(**archived), number=NUMBER)
+        nested = timeit.timeit(lambda: construct(model, archived), number=NUMBER)
+        print(
+            f"{model.__name__:<20} "
+            f"model_validate: {validate / NUMBER * 1e3:.3f}ms  "
+            f"model_construct (nested): {nested / NUMBER * 1e3:.3f}ms  "
+            f"model_construct (top level only): {shallow / NUMBER * 1e3:.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,94 @@
+"""
+Load benchmark of the SQLite sink.
+
+    python -m scripts.benchmark_sqlite [logs folder] [copies]
+
+The logged trending responses are replayed `copies` times with fresh video IDs into a temporary
+database, with a few batch sizes, while a reader thread queries the database to check that
+reads go on during the writes.
+"""
+
+import asyncio
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from tiktok.models.apis.trending import TrendingResponse
+from tiktok.storage.blobs import iter_logged_responses
+from tiktok.storage.sqlite import SqliteReader, SqliteSink, connect
+
+LOGS_FOLDER = Path(__file__).parent.parent / "logs_c3"
+
+
+def load_payloads(folder: Path) -> list[dict[str, Any]]:
+    """Load the trending responses logged by the bot, as written by the trending collector."""
+    return [
+        TrendingResponse.model_validate(payload).model_dump(mode="json")
+        for _, payload in iter_logged_responses(folder, ["get_trending"])
+    ]
+
+
+def replay(payloads: list[dict[str, Any]], copies: int) -> list[dict[str, Any]]:
+    """Copy the payloads with new video IDs."""
+    replayed = []
+    for copy in range(copies):
+        for payload in payloads:
+            items = [
+                {**item, "id": str(int(item["id"]) + (copy + 1) * 10**15)}
+                for item in payload["item_list"]
+            ]
+            replayed.append({**payload, "item_list": items})
+    return replayed
+
+
+def read_while(path: Path, writing: threading.Event, reads: list[int]) -> None:
+    """Query the database until the writes are done, counting the queries."""
+    with SqliteReader(path) as reader:
+        while writing.is_set():
+            reader.counts()
+            reads[0] += 1
+
+
+async def benchmark(folder: Path, copies: int) -> None:
+    """Report the rows per second written by the SQLite sink."""
+    replayed = replay(load_payloads(folder), copies)
+    print(f"Trending responses: {len(replayed)}")
+
+    for batch_rows in (1_000, 10_000, 50_000):
+        with tempfile.TemporaryDirectory() as folder_name:
+            path = Path(folder_name) / "tiktok.db"
+            sink = SqliteSink(path, batch_rows=batch_rows)
+            # Create the schema for the reader
+            connect(path).close()
+
+            writing, reads = threading.Event(), [0]
+            writing.set()
+            reader = threading.Thread(target=read_while, args=(path, writing, reads))
+            reader.start()
+
+            start = time.perf_counter()
+            # Written in collector-sized groups, as the buffered writer would
+            for index in range(0, len(replayed), 256):
+                await sink.write(replayed[index : index + 256])
+            await sink.close()
+            elapsed = time.perf_counter() - start
+            writing.clear()
+            reader.join()
+
+            print(
+                f"batch_rows={batch_rows:<6}: {sink.rows_written} rows in {elapsed:.2f}s "
+                f"({sink.rows_written / elapsed:,.0f} rows/s, {sink.transactions} transactions, "
+                f"{reads[0]} concurrent reads)"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        benchmark(
+            Path(sys.argv[1]) if len(sys.argv) > 1 else LOGS_FOLDER,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+        )
+    )
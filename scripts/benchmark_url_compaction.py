@@ -0,0 +1,34 @@
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+from tiktok.models.compaction import HostTable, compact_payload
+from tiktok.storage.blobs import iter_logged_responses
+
+LOGS_FOLDER = Path(__file__).parent.parent / "logs_c3"
+
+
+def load_payloads(folder: Path) -> list[dict[str, Any]]:
+    """Load the trending responses logged by the bot."""
+    return [payload for _, payload in iter_logged_responses(folder, ["get_trending"])]
+
+
+def benchmark(folder: Path) -> None:
+    """Report the archive size reduction of URL compaction."""
+    payloads = load_payloads(folder)
+    baseline = len(json.dumps(payloads))
+    print(f"Trending responses: {len(payloads)}, archived size: {baseline / 2**20:.2f} MiB")
+
+    for keep_query in (True, False):
+        hosts = HostTable()
+        compacted = [compact_payload(payload, hosts, keep_query) for payload in payloads]
+        size = len(json.dumps(compacted)) + len(json.dumps(hosts.to_list()))
+        print(
+            f"keep_query={keep_query!s:<5}: {size / 2**20:.2f} MiB "
+            f"({1 - size / baseline:.1%} smaller, {len(hosts)} hosts)"
+        )
+
+
+if __name__ == "__main__":
+    benchmark(Path(sys.argv[1]) if len(sys.argv) > 1 else LOGS_FOLDER)
@@ -0,0 +1,57 @@
+"""
+Maintain the blob store of the bot responses.
+
+    python -m scripts.blobs migrate [log folder]
+    python -m scripts.blobs gc [log folder] [output folders...]
+
+`migrate` moves the inline responses of the bot logs into the `blobs` store of the log folder,
+rewriting the logs with digests. `gc` deletes the blobs no longer referenced by the logs or the
+given collector outputs.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+from tiktok.storage.blobs import BlobStore, find_references
+
+LOGS_FOLDER = Path(__file__).parent.parent / "logs_c3"
+
+
+def migrate(log_dir: Path) -> None:
+    """Move the inline responses of the logs into the blob store."""
+    store = BlobStore(log_dir / "blobs", fsync=False)
+    before = after = 0
+    for log_file in sorted(log_dir.glob("bot_activity_*.json")):
+        raw = log_file.read_text()
+        log = json.loads(raw)
+        for cycle in log["cycles"]:
+            for response in cycle["api_responses"]:
+                if response.get("response_data"):
+                    response["response_digest"] = store.put(response.pop("response_data"))
+                    response["response_data"] = None
+        migrated = json.dumps(log, indent=2)
+        tmp_file = log_file.with_suffix(".tmp")
+        tmp_file.write_text(migrated)
+        tmp_file.replace(log_file)
+        before, after = before + len(raw), after + len(migrated)
+
+    print(
+        f"Logs: {before / 2**20:.2f} -> {after / 2**20:.2f} MiB, "
+        f"blobs: {store.bytes_in / 2**20:.2f} -> {store.bytes_written / 2**20:.2f} MiB "
+        f"({store.deduplicated}/{store.puts} deduplicated)"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("migrate", "gc"):
+        print(__doc__)
+        sys.exit(1)
+
+    log_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else LOGS_FOLDER
+    if sys.argv[1] == "migrate":
+        migrate(log_dir)
+    else:
+        references = find_references([log_dir, *map(Path, sys.argv[3:])])
+        deleted = BlobStore(log_dir / "blobs").collect_garbage(references)
+        print(f"Deleted {deleted} unreferenced blobs")
@@ -0,0 +1,43 @@
+"""
+Index the cover hashes of collector outputs and find the near-duplicate covers of a video.
+
+    python -m scripts.covers index <output folder> [index file]
+    python -m scripts.covers query <index file> <video id> [radius]
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+from tiktok.collectors.base import Record
+from tiktok.collectors.sinks import iter_ndjson
+from tiktok.media.covers import COVERS_FILE, CoverHashStage, HammingIndex
+
+
+async def index(output_path: Path, index_file: Path) -> None:
+    """Index the covers of the payloads in `output_path`."""
+    stage = CoverHashStage(index_file)
+    for payload in iter_ndjson(output_path):
+        await stage.index_covers(Record("trending", payload))
+    await stage.close()
+    print(f"Indexed {index_file}: {stage.metrics()}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("index", "query"):
+        print(__doc__)
+        sys.exit(1)
+
+    if sys.argv[1] == "index":
+        output_path = Path(sys.argv[2])
+        index_file = Path(sys.argv[3]) if len(sys.argv) > 3 else output_path.parent / COVERS_FILE
+        asyncio.run(index(output_path, index_file))
+    else:
+        covers = HammingIndex.load(Path(sys.argv[2]))
+        video_id = int(sys.argv[3])
+        if video_id not in covers:
+            print(f"No cover hash for video {video_id}")
+            sys.exit(1)
+        radius = int(sys.argv[4]) if len(sys.argv) > 4 else 8
+        for duplicate, distance in covers.near_duplicates(video_id, radius):
+            print(f"{duplicate}\t{distance}")
@@ -1,27 +1,66 @@
-import yt_dlp
-import os
-
-def download_tiktok(post_id: str, video_url: str, output_dir: str = "downloads"):
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, f"{post_id}.mp4")
-
-    ydl_opts = {
-        'outtmpl': output_path,
-        'quiet': False,
-        'noplaylist': True,
-        'format': 'mp4',
-        'cookiefile': "C:\\Users\\lexue\\OneDrive\\ComputerProjects\\MIT\\tiktok-scraper-master-3\\scripts\\cookies.txt",
-        'http_headers': {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',  
-        },
-    }
-
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        ydl.download([video_url])
-
-post_meta = {
-    "id": "7516123586508197142",
-    "link": "https://www.tiktok.com/@zanno_tw/video/7516123586508197142"
-}
-
-download_tiktok(post_id=post_meta["id"], video_url=post_meta["link"])
+"""
+Download the videos collected by a trending collector run.
+
+    python -m scripts.download <run folder> [media folder] [cookies file]
+
+The videos go to the content-addressed media store (by default `outputs/media`), shared by all
+the runs: videos already downloaded by a previous run are skipped and interrupted downloads
+resumed.
+"""
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+from tiktok.collectors.trending import DEFAULT_OUTPUT_FOLDER, load_output
+from tiktok.media.download import HttpFetcher, MediaDownloader, MediaStore, media_jobs
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+
+
+async def download(output_path: Path, media_path: Path, cookies_file: Path | None) -> None:
+    """Download the videos of a run, logging the progress."""
+    jobs = [
+        job
+        for response in load_output(output_path)
+        for job in media_jobs(response.model_dump(mode="json"))
+    ]
+    print(f"Videos: {len(jobs)}")
+
+    store = MediaStore(media_path)
+    fetcher = HttpFetcher(
+        headers={"User-Agent": USER_AGENT, "Referer": "https://www.tiktok.com/"},
+        cookies_file=cookies_file,
+    )
+    downloader = MediaDownloader(store, fetcher, concurrency=8)
+
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(5)
+            downloader.log_progress()
+
+    reporter = asyncio.create_task(report())
+    try:
+        await downloader.run(jobs)
+    finally:
+        reporter.cancel()
+        await fetcher.close()
+        store.sync()
+        store.close()
+    print(downloader.metrics())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(
+        download(
+            Path(sys.argv[1]),
+            Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_OUTPUT_FOLDER / "media",
+            Path(sys.argv[3]) if len(sys.argv) > 3 else None,
+        )
+    )
@@ -0,0 +1,38 @@
+"""
+Sample the frames of the downloaded videos into thumbnails and feature arrays.
+
+    python -m scripts.frames [media folder] [interval seconds] [scene threshold]
+
+An interval of 0 only samples on scene changes. Videos already extracted are skipped.
+"""
+
+import logging
+import sys
+import time
+from pathlib import Path
+
+from tiktok.collectors.trending import DEFAULT_OUTPUT_FOLDER
+from tiktok.media.download import MediaStore
+from tiktok.media.frames import FrameExtractor, FrameOptions
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ("-h", "--help"):
+        print(__doc__)
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO)
+    media_path = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_OUTPUT_FOLDER / "media"
+    interval = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    options = FrameOptions(
+        interval=interval or None,
+        scene_threshold=float(sys.argv[3]) if len(sys.argv) > 3 else None,
+    )
+
+    store = MediaStore(media_path)
+    extractor = FrameExtractor(store, options)
+    start = time.monotonic()
+    try:
+        extractor.run()
+    finally:
+        store.close()
+    print(f"{extractor.metrics()} in {time.monotonic() - start:.1f}s")
@@ -0,0 +1,13 @@
+import sys
+from pathlib import Path
+
+from tiktok.collectors.sinks import ndjson_to_json_array
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m scripts.ndjson_to_json <run folder>")
+        sys.exit(1)
+
+    output_path = Path(sys.argv[1])
+    count = ndjson_to_json_array(output_path, output_path / "trending.json")
+    print(f"Converted {count} payloads to {output_path / 'trending.json'}")
@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+from tiktok.storage.parquet import to_parquet
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print(
+            "Usage: python -m scripts.ndjson_to_parquet <output folder> [trending|videos|comments]"
+        )
+        sys.exit(1)
+
+    output_path = Path(sys.argv[1])
+    kind = sys.argv[2] if len(sys.argv) == 3 else "trending"
+    count = to_parquet(output_path, output_path / "parquet", kind)
+    print(f"Converted {count} records to {output_path / 'parquet'}")
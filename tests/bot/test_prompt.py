@@ -0,0 +1,31 @@
+import json
+
+import tests.data as data
+from tiktok.bot.prompt import get_video_prompts, project_videos, serialize_videos
+from tiktok.models.apis.trending import TrendingResponse
+
+
+def test_project_videos_matches_to_llm() -> None:
+    """Test that the batch projection matches the per-video projection."""
+    videos = TrendingResponse.model_validate(data.MULTIPLE_FYP).item_list
+
+    assert project_videos(videos) == [json.loads(json.dumps(v.to_llm())) for v in videos]
+
+
+def test_serialize_videos_is_memoized() -> None:
+    """Test that a video is serialized once until its state changes."""
+    video = TrendingResponse.model_validate(data.SINGLE_FYP).item_list[0]
+
+    first = serialize_videos([video])[0]
+    assert serialize_videos([video])[0] is first
+
+    assert video.stats is not None
+    video.stats.play_count = (video.stats.play_count or 0) + 1
+    assert serialize_videos([video])[0] is not first
+
+
+def test_get_video_prompts() -> None:
+    """Test that the prompt lists the available actions."""
+    videos = TrendingResponse.model_validate(data.SINGLE_FYP).item_list
+
+    assert "['NOOP', 'DIGG']" in get_video_prompts(videos, ["NOOP", "DIGG"])
@@ -0,0 +1,84 @@
+import asyncio
+from typing import Any, AsyncIterator, Iterable, Sequence
+
+from tiktok.collectors.base import Collector, CollectorState, Record, Stage
+
+
+class ListSink:
+    def __init__(self) -> None:
+        self.payloads: list[dict[str, Any]] = []
+        self.closed = False
+
+    async def write(self, payloads: Sequence[dict[str, Any]]) -> None:
+        self.payloads.extend(payloads)
+
+    async def flush(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+async def numbers(count: int) -> AsyncIterator[Record]:
+    for i in range(count):
+        yield Record("numbers", {"i": i})
+
+
+async def test_pipeline_without_stages() -> None:
+    collector = Collector()
+    sink = ListSink()
+
+    await collector.pipeline(numbers(5), {"numbers": [sink]})
+
+    assert [payload["i"] for payload in sink.payloads] == [0, 1, 2, 3, 4]
+    assert sink.closed
+
+
+async def test_pipeline_stages() -> None:
+    async def double(record: Record) -> Iterable[Record]:
+        await asyncio.sleep(0)
+        return [Record(record.stream, {"i": record.payload["i"] * 2})]
+
+    async def split(record: Record) -> Iterable[Record]:
+        if record.payload["i"] % 4:
+            return [record, Record("odd", record.payload)]
+        return []
+
+    collector = Collector([Stage("double", double, concurrency=3), Stage("split", split)])
+    numbers_sink, odd_sink, other_sink = ListSink(), ListSink(), ListSink()
+
+    await collector.pipeline(numbers(6), {"numbers": [numbers_sink, other_sink], "odd": [odd_sink]})
+
+    assert sorted(payload["i"] for payload in numbers_sink.payloads) == [2, 6, 10]
+    assert numbers_sink.payloads == other_sink.payloads
+    assert sorted(payload["i"] for payload in odd_sink.payloads) == [2, 6, 10]
+
+
+async def test_pipeline_stage_error() -> None:
+    async def fail(record: Record) -> Iterable[Record]:
+        raise ValueError("Test error")
+
+    collector = Collector([Stage("fail", fail)])
+    sink = ListSink()
+
+    await collector.pipeline(numbers(3), {"numbers": [sink]})
+
+    assert collector.state == CollectorState.ERROR
+    assert isinstance(collector.last_error, ValueError)
+    assert sink.closed
+
+
+async def test_pipeline_stop() -> None:
+    collector = Collector()
+    sink = ListSink()
+
+    async def endless() -> AsyncIterator[Record]:
+        async for cycle in collector.cycles(None, 0):
+            if cycle == 3:
+                collector.stop()
+            yield Record("numbers", {"i": cycle})
+
+    await collector.pipeline(endless(), {"numbers": [sink]})
+
+    assert collector.state == CollectorState.STOPPED
+    assert [payload["i"] for payload in sink.payloads] == [1, 2, 3]
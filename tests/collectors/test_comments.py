@@ -0,0 +1,130 @@
+import asyncio
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from tiktok.collectors.base import CollectorState, Record
+from tiktok.collectors.budget import RequestBudget
+from tiktok.collectors.comments import (
+    CommentCollector,
+    VideoIdTap,
+    ids_from_file,
+    ids_from_queue,
+)
+from tiktok.collectors.progress import PROGRESS_FILE, CursorProgress
+from tiktok.collectors.sinks import iter_ndjson
+from tiktok.models.apis.comment import Comment, CommentListResponse
+from tiktok.models.params.base import TikTokParams
+from tiktok.models.params.comment import CommentParams
+from tiktok.models.types import AwemeId
+
+PAGES = 3
+PAGE_SIZE = 2
+
+
+def comment_page(video_id: str, params: TikTokParams, cursor: int | None) -> CommentListResponse:
+    cursor = cursor or 0
+    return CommentListResponse(
+        comments=[
+            Comment(cid=f"{video_id}-{cursor + i}", aweme_id=video_id) for i in range(PAGE_SIZE)
+        ],
+        cursor=cursor + PAGE_SIZE,
+        has_more=cursor + PAGE_SIZE < PAGES * PAGE_SIZE,
+    )
+
+
+@pytest.fixture
+def collector(tiktok_client: Mock, tmp_path: Path) -> CommentCollector:
+    tiktok_client.list_comments = AsyncMock(side_effect=comment_page)
+    return CommentCollector(tiktok_client, TikTokParams.default_web(), tmp_path, concurrency=2)
+
+
+def collected(output_path: str) -> list[str]:
+    return sorted(comment["cid"] for comment in iter_ndjson(Path(output_path)))
+
+
+async def test_crawl_all_pages(collector: CommentCollector) -> None:
+    output_path = await collector.run(["1", "2", "3", "1"])
+
+    assert len(collected(output_path)) == 3 * PAGES * PAGE_SIZE
+    progress = CursorProgress.model_validate_json((Path(output_path) / PROGRESS_FILE).read_text())
+    assert all(state.done and state.items == PAGES * PAGE_SIZE for state in progress.keys.values())
+
+
+async def test_resume(tiktok_client: Mock, tmp_path: Path) -> None:
+    tiktok_client.list_comments = AsyncMock(side_effect=comment_page)
+    collector = CommentCollector(tiktok_client, TikTokParams.default_web(), tmp_path, max_pages=1)
+    await collector.run(["1"])
+
+    collector = CommentCollector(tiktok_client, TikTokParams.default_web(), tmp_path)
+    output_path = await collector.run(["1"])
+    await CommentCollector(tiktok_client, TikTokParams.default_web(), tmp_path).run(["1"])
+
+    assert collected(output_path) == [f"1-{i}" for i in range(PAGES * PAGE_SIZE)]
+    assert [call.args[2] for call in tiktok_client.list_comments.call_args_list] == [0, 2, 4]
+
+
+async def test_resume_drops_unsaved_pages(tiktok_client: Mock, tmp_path: Path) -> None:
+    tiktok_client.list_comments = AsyncMock(side_effect=comment_page)
+    collector = CommentCollector(tiktok_client, TikTokParams.default_web(), tmp_path, max_pages=1)
+    output_path = Path(await collector.run(["1"]))
+    checkpoint = (output_path / PROGRESS_FILE).read_bytes()
+
+    # Crash after the comments of the next page were flushed, but before the progress was saved
+    collector = CommentCollector(tiktok_client, TikTokParams.default_web(), tmp_path, max_pages=1)
+    await collector.run(["1"])
+    (output_path / PROGRESS_FILE).write_bytes(checkpoint)
+    with next(output_path.glob("comments-*.ndjson")).open("ab") as file:
+        file.write(b'{"cid": "1-')
+
+    await CommentCollector(tiktok_client, TikTokParams.default_web(), tmp_path).run(["1"])
+
+    assert collected(output_path.as_posix()) == [f"1-{i}" for i in range(PAGES * PAGE_SIZE)]
+
+
+async def test_error_stops_crawl(tiktok_client: Mock, tmp_path: Path) -> None:
+    tiktok_client.list_comments = AsyncMock(side_effect=Exception("Test error"))
+    collector = CommentCollector(tiktok_client, TikTokParams.default_web(), tmp_path)
+
+    await collector.run(["1", "2"])
+
+    assert collector.state == CollectorState.ERROR
+    assert collector.last_error is not None
+
+
+async def test_ids_from_trending_stream(collector: CommentCollector) -> None:
+    queue: asyncio.Queue[str | None] = asyncio.Queue()
+    tap = VideoIdTap(queue)
+
+    await tap.tap(Record("trending", {"item_list": [{"id": "1"}, {"id": "2"}]}))
+    await tap.close()
+    output_path = await collector.run(ids_from_queue(queue))
+
+    assert len(collected(output_path)) == 2 * PAGES * PAGE_SIZE
+
+
+def test_ids_from_file(tmp_path: Path) -> None:
+    (tmp_path / "ids.txt").write_text("1\n\n 2\n")
+
+    assert ids_from_file(tmp_path / "ids.txt") == ["1", "2"]
+
+
+async def test_request_budget() -> None:
+    budget = RequestBudget(rate=1000, burst=2)
+
+    for _ in range(4):
+        await budget.acquire()
+
+    assert budget.requests == 4
+    assert budget.waits == 2
+
+
+def test_comment_params_cursor() -> None:
+    params = TikTokParams.default_web()
+    video_id = AwemeId("1")
+
+    dumped = CommentParams.with_video_id(video_id, params).model_dump(exclude_unset=True)
+    assert "cursor" not in dumped
+    dumped = CommentParams.with_video_id(video_id, params, 20).model_dump(exclude_unset=True)
+    assert dumped["cursor"] == 20
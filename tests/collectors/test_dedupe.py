@@ -0,0 +1,95 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from tiktok.collectors.base import Record
+from tiktok.collectors.dedupe import DedupeStage, SeenSet
+
+
+def test_seen_set() -> None:
+    seen = SeenSet([5, 1, 3], merge_every=2)
+
+    seen.add(2)
+    assert 2 in seen
+    seen.add(7)
+    seen.add(7)
+
+    assert len(seen) == 5
+    assert all(video_id in seen for video_id in (1, 2, 3, 5, 7))
+    assert 4 not in seen
+    assert 8 not in seen
+
+
+def test_seen_set_merge() -> None:
+    seen = SeenSet(range(0, 100, 2), merge_every=10)
+
+    for video_id in [*range(99, 0, -2), 0, 2**63 - 1]:
+        seen.add(video_id)
+
+    seen.merge()
+    assert list(seen._sorted) == [*range(100), 2**63 - 1]
+    with pytest.raises(ValueError):
+        seen.add(2**63)
+    assert len(seen) == 101
+
+
+def test_seen_set_save_load(tmp_path: Path) -> None:
+    seen = SeenSet([7445701530583436550, 1])
+    seen.add(42)
+    seen.save(tmp_path / "seen.bin")
+
+    loaded = SeenSet.load(tmp_path / "seen.bin")
+
+    assert len(loaded) == 3
+    assert 7445701530583436550 in loaded
+    assert 42 in loaded
+    assert len(SeenSet.load(tmp_path / "missing.bin")) == 0
+
+
+def record(*video_ids: str, meta: Any = None) -> Record:
+    return Record("trending", {"item_list": [{"id": video_id} for video_id in video_ids]}, meta)
+
+
+async def test_dedupe_stage(tmp_path: Path) -> None:
+    stage = DedupeStage(tmp_path / "seen.bin")
+
+    (first,) = await stage.dedupe(record("1", "2", "3"))
+    (second,) = await stage.dedupe(record("2", "4", "4"))
+
+    assert [item["id"] for item in first.payload["item_list"]] == ["1", "2", "3"]
+    assert [item["id"] for item in second.payload["item_list"]] == ["4"]
+    assert stage.last_ratio == 2 / 3
+    assert stage.ratio == 2 / 6
+
+
+async def test_dedupe_stage_reloads(tmp_path: Path) -> None:
+    stage = DedupeStage(tmp_path / "seen.bin")
+    await stage.dedupe(record("1"))
+    await stage.dedupe(record("2", meta=(1,)))
+    await stage.close()
+    await stage.committed("trending", (1,))
+
+    stage = DedupeStage(tmp_path / "seen.bin")
+    (result,) = await stage.dedupe(record("2", "3"))
+
+    assert [item["id"] for item in result.payload["item_list"]] == ["3"]
+
+
+async def test_dedupe_stage_saves_committed_videos(tmp_path: Path) -> None:
+    stage = DedupeStage(tmp_path / "seen.bin", save_every=1)
+    first, second = [1], [2]
+    await stage.dedupe(record("1", "2", meta=first))
+    await stage.dedupe(record("2", "3", meta=second))
+
+    await stage.committed("trending", first)
+    # Another stream, or a record the stage never saw
+    await stage.committed("search", second)
+    await stage.committed("trending", [2])
+    await stage.close()
+
+    # The videos of the uncommitted record are still dropped, but not saved
+    (result,) = await stage.dedupe(record("3", "4"))
+    assert [item["id"] for item in result.payload["item_list"]] == ["4"]
+    seen = SeenSet.load(tmp_path / "seen.bin")
+    assert (1 in seen, 2 in seen, 3 in seen) == (True, True, False)
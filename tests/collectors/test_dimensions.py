@@ -0,0 +1,142 @@
+import copy
+import sqlite3
+from datetime import UTC, datetime, tzinfo
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+import tests.data as data
+from tiktok.collectors.base import Record
+from tiktok.collectors.dimensions import SCHEMA, DimensionStore, NormalizeStage, denormalize
+from tiktok.collectors.trending import TrendingCollector, load_output
+from tiktok.models.apis.trending import TrendingResponse
+from tiktok.models.params.base import TikTokParams
+
+FIRST = datetime(2025, 1, 11, 22, tzinfo=UTC)
+SECOND = datetime(2025, 1, 12, 22, tzinfo=UTC)
+
+
+def author(nickname: str, avatar: str = "https://cdn/a.jpeg?x-expires=1") -> dict[str, Any]:
+    return {"id": "42", "nickname": nickname, "verified": False, "avatar_thumb": avatar}
+
+
+def record(when: datetime, *authors: dict[str, Any]) -> Record:
+    items = [
+        {"id": str(index), "author": entity, "music": {"id": "7", "title": "song"}}
+        for index, entity in enumerate(authors)
+    ]
+    return Record("trending", {"extra": {"now": when.timestamp() * 1000}, "item_list": items})
+
+
+async def test_normalize_stage(tmp_path: Path) -> None:
+    stage = NormalizeStage(tmp_path / "dimensions.db")
+
+    (normalized,) = await stage.normalize(record(FIRST, author("first"), author("first")))
+    await stage.normalize(record(SECOND, author("second", avatar="https://cdn/b.jpeg")))
+
+    assert normalized.payload["item_list"][0] == {
+        "id": "0",
+        "author_id": "42",
+        "author_volatile": {"avatar_thumb": "https://cdn/a.jpeg?x-expires=1"},
+        "music_id": "7",
+    }
+    assert stage.metrics() == {
+        "dimensions_inserted": 2,
+        "dimensions_changed": 1,
+        "dimensions_unchanged": 3,
+        "dimensions_stale": 0,
+    }
+    store = stage.store
+    # Only the tracked fields are stored
+    assert store.get("authors", 42) == {"id": "42", "nickname": "second", "verified": False}
+    assert store.get("authors", 42, as_of=FIRST)["nickname"] == "first"  # type: ignore[index]
+    (change,) = store.changes("authors", 42)
+    assert change == {"changed_at": SECOND, "field": "nickname", "old": "first", "new": "second"}
+
+    payload = denormalize(normalized.payload, store)
+    assert payload["item_list"][0]["author"] == author("first")
+    assert payload["item_list"][0]["music"] == {"id": "7", "title": "song"}
+    await stage.close()
+
+    # The latest versions are reloaded
+    store = DimensionStore(tmp_path / "dimensions.db")
+    store.upsert("authors", [author("second")], SECOND)
+    assert store.metrics()["dimensions_unchanged"] == 1
+    # A late observation does not overwrite the newer version
+    store.upsert("authors", [author("first")], FIRST)
+    assert store.metrics()["dimensions_stale"] == 1
+    assert store.get("authors", 42) == {"id": "42", "nickname": "second", "verified": False}
+    store.close()
+
+
+def test_cache_follows_commits(tmp_path: Path) -> None:
+    store = DimensionStore(tmp_path / "dimensions.db")
+    store.upsert("authors", [author("first")], FIRST)
+    store.connection.execute("DROP TABLE changes")
+
+    with pytest.raises(sqlite3.OperationalError):
+        store.upsert("authors", [author("second")], SECOND)
+
+    # The failed version is not cached, the next upsert writes it again
+    assert store.latest["authors"][42]["nickname"] == "first"
+    store.connection.executescript(SCHEMA)
+    store.upsert("authors", [author("second")], SECOND)
+    assert store.get("authors", 42)["nickname"] == "second"  # type: ignore[index]
+    store.close()
+
+
+async def test_run_collector_normalized(tiktok_client: Mock, tmp_path: Path) -> None:
+    tiktok_client.get_trending = AsyncMock(
+        return_value=TrendingResponse.model_validate(data.MULTIPLE_FYP)
+    )
+    collector = TrendingCollector(
+        tiktok_client, TikTokParams.default_web(), tmp_path, normalize=True
+    )
+
+    output_path = Path(await collector.run(cycles=2, interval=0))
+
+    raw = (output_path / "trending-00000.ndjson").read_text()
+    assert '"author":' not in raw
+    expected = TrendingResponse.model_validate(data.MULTIPLE_FYP)
+    first, second = load_output(output_path)
+    assert first.item_list[0].author == expected.item_list[0].author
+    assert second.item_list[-1].music == expected.item_list[-1].music
+
+
+async def test_normalized_runs_keep_their_urls(
+    tiktok_client: Mock, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    served = TrendingResponse.model_validate(data.MULTIPLE_FYP)
+    tiktok_client.get_trending = AsyncMock(return_value=served)
+    first_path = await TrendingCollector(
+        tiktok_client, TikTokParams.default_web(), tmp_path, compact_urls=True, normalize=True
+    ).run(cycles=1, interval=0)
+
+    # A later run, where the author changed their nickname and avatar on another CDN host
+    later: dict[str, Any] = copy.deepcopy(data.MULTIPLE_FYP)
+    later["extra"]["now"] += 86_400_000
+    later["itemList"][0]["author"]["nickname"] = "renamed"
+    later["itemList"][0]["author"]["avatarThumb"] = "https://p77.example.com/new.jpeg"
+    tiktok_client.get_trending = AsyncMock(return_value=TrendingResponse.model_validate(later))
+
+    class Later(datetime):
+        @classmethod
+        def now(cls, tz: tzinfo | None = None) -> "Later":
+            return cls(2030, 1, 1, tzinfo=tz)
+
+    monkeypatch.setattr("tiktok.collectors.trending.datetime", Later)
+    second_path = await TrendingCollector(
+        tiktok_client, TikTokParams.default_web(), tmp_path, compact_urls=True, normalize=True
+    ).run(cycles=1, interval=0)
+
+    assert first_path != second_path
+    (first,) = load_output(Path(first_path))
+    (second,) = load_output(Path(second_path))
+    # As served to the first run, without the signatures dropped by the compaction
+    author = served.item_list[0].author
+    assert first.item_list[0].author.nickname == author.nickname
+    assert first.item_list[0].author.avatar_thumb == (author.avatar_thumb or "").split("?")[0]
+    assert second.item_list[0].author.nickname == "renamed"
+    assert second.item_list[0].author.avatar_thumb == "https://p77.example.com/new.jpeg"
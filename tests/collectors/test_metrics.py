@@ -0,0 +1,106 @@
+from pathlib import Path
+from typing import AsyncIterator
+
+import pytest
+
+from tests.collectors.test_base import ListSink
+from tiktok.collectors.base import Collector, Record
+from tiktok.collectors.dedupe import DedupeStage
+from tiktok.collectors.metrics import LatencyWindow, Meter, MetricsRegistry
+
+
+def test_latency_window_quantiles() -> None:
+    window = LatencyWindow(size=100)
+    for i in range(1, 201):
+        window.record(i / 1000)
+
+    summary = LatencyWindow.summary([window])
+
+    assert summary["count"] == 200
+    assert summary["sum"] == pytest.approx(20.1)
+    # Only the last 100 latencies are kept for quantiles
+    assert summary["p50"] == pytest.approx(0.150)
+    assert summary["p99"] == pytest.approx(0.199)
+
+
+def test_meter_rate() -> None:
+    meter = Meter()
+    meter.mark(3)
+    meter.mark()
+
+    assert meter.total == 4
+    # Less than a second old: the rate is over one second
+    assert meter.rate() == 4
+
+
+async def collect(collector: Collector, count: int) -> AsyncIterator[Record]:
+    async def respond(i: int) -> dict[str, list[dict[str, str]]]:
+        if i == 2:
+            raise TimeoutError()
+        return {"item_list": [{"id": "1"}, {"id": str(i + 2)}]}
+
+    for i in range(count):
+        try:
+            payload = await collector.fetch(respond(i))
+        except TimeoutError as e:
+            collector.record_error(e)
+            continue
+        yield Record("trending", payload)
+
+
+async def test_collector_metrics(tmp_path: Path) -> None:
+    collector = Collector([DedupeStage(tmp_path / "seen.bin")])
+    collector.skip_exceptions = True
+    sink = ListSink()
+
+    await collector.pipeline(collect(collector, 4), {"trending": [sink]}, skip_exceptions=True)
+    metrics = collector.metrics()
+
+    assert metrics["items"] == 3
+    assert metrics["requests"] == 4
+    assert metrics["fetch_latency"]["count"] == 4
+    assert metrics["errors"]["TimeoutError"]["total"] == 1
+    assert metrics["duplicate_ratio"] == pytest.approx(2 / 6)
+    assert set(metrics["queues"]) == {"dedupe", "sinks"}
+    assert metrics["streams"]["trending"]["items_written"] == 3
+    assert metrics["streams"]["trending"]["write_latency"]["count"] >= 1
+
+
+async def test_registry_prometheus(tmp_path: Path) -> None:
+    collector = Collector()
+    await collector.pipeline(collect(collector, 2), {"trending": [ListSink()]})
+    registry = MetricsRegistry()
+    registry.register("trending", collector)
+
+    text = registry.prometheus()
+
+    assert "# TYPE tiktok_collector_requests_total counter" in text
+    assert 'tiktok_collector_requests_total{collector="trending"} 2.0' in text
+    assert 'tiktok_collector_items_total{collector="trending"} 2.0' in text
+    assert 'tiktok_collector_fetch_latency_seconds{collector="trending",quantile="0.99"}' in text
+    assert (
+        'tiktok_collector_write_latency_seconds_count{collector="trending",stream="trending"}'
+        in text
+    )
+    # Not running a dedupe stage
+    assert "duplicate_ratio" not in text
+    assert registry.snapshot()["trending"]["items"] == 2
+
+    with pytest.raises(ValueError):
+        registry.register("trending", collector)
+
+
+async def test_metrics_server() -> None:
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    from tiktok.collectors.server import create_app
+
+    registry = MetricsRegistry()
+    registry.register("trending", Collector())
+    client = TestClient(create_app(registry))
+
+    assert client.get("/metrics.json").json()["trending"]["state"] == "idle"
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'tiktok_collector_up{collector="trending"} 0.0' in response.text
@@ -0,0 +1,108 @@
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+import tests.data as data
+from tiktok.collectors.partitions import PartitionedSink, iter_partitions, prune
+from tiktok.collectors.sinks import MANIFEST_FILE, SinkManifest
+from tiktok.collectors.trending import TrendingCollector
+from tiktok.models.apis.trending import TrendingResponse
+from tiktok.models.params.base import TikTokParams
+
+FIRST_HOUR = datetime(2025, 1, 11, 22, 15, tzinfo=UTC)
+SECOND_HOUR = datetime(2025, 1, 11, 23, 5, tzinfo=UTC)
+
+
+def response(*items: tuple[str, int]) -> dict[str, Any]:
+    return {"item_list": [{"id": video_id, "create_time": created} for video_id, created in items]}
+
+
+async def write_hours(tmp_path: Path) -> None:
+    sink = PartitionedSink(tmp_path)
+    await sink.write([response(("100", 1_000), ("200", 2_000))], now=FIRST_HOUR)
+    await sink.write([response(("300", 3_000))], now=FIRST_HOUR.replace(minute=40))
+    await sink.flush(now=SECOND_HOUR)
+    await sink.write([response(("400", 5_000), ("500", 6_000))], now=SECOND_HOUR)
+    await sink.close()
+
+
+async def test_write_indexes_ranges(tmp_path: Path) -> None:
+    await write_hours(tmp_path)
+
+    manifest_file = tmp_path / "dt=2025-01-11" / "hr=22" / MANIFEST_FILE
+    manifest = SinkManifest.model_validate_json(manifest_file.read_bytes())
+    (sink_file,) = manifest.files
+    assert sink_file.items == 2
+    assert sink_file.closed_at is not None
+    assert sink_file.first_written_at == FIRST_HOUR
+    assert sink_file.last_written_at == FIRST_HOUR.replace(minute=40)
+    assert (sink_file.min_create_time, sink_file.max_create_time) == (1_000, 3_000)
+    assert (sink_file.min_id, sink_file.max_id) == (100, 300)
+    assert (tmp_path / "dt=2025-01-11" / "hr=23" / MANIFEST_FILE).exists()
+
+
+async def test_day_partitions(tmp_path: Path) -> None:
+    sink = PartitionedSink(tmp_path, granularity="day")
+    await sink.write([response(("100", 1_000))], now=FIRST_HOUR)
+    await sink.write([response(("200", 2_000))], now=SECOND_HOUR)
+    await sink.close()
+
+    assert [path.parent.name for path in tmp_path.glob(f"*/{MANIFEST_FILE}")] == ["dt=2025-01-11"]
+    with pytest.raises(ValueError):
+        PartitionedSink(tmp_path, granularity="week")
+
+
+async def test_prune(tmp_path: Path) -> None:
+    await write_hours(tmp_path)
+
+    assert len(prune(tmp_path)) == 2
+    (selected,) = prune(tmp_path, collected_from=SECOND_HOUR.replace(minute=0))
+    assert selected[0].name == "hr=23"
+    (selected,) = prune(tmp_path, created_to=datetime.fromtimestamp(4_000, UTC))
+    assert selected[0].name == "hr=22"
+    (selected,) = prune(tmp_path, video_id=450)
+    assert selected[0].name == "hr=23"
+    assert prune(tmp_path, video_id=350) == []
+    assert prune(tmp_path, collected_to=FIRST_HOUR.replace(minute=0)) == []
+
+
+async def test_iter_partitions_skips_unflushed_lines(tmp_path: Path) -> None:
+    await write_hours(tmp_path)
+    (folder, sink_file), _ = prune(tmp_path)
+    with open(folder / sink_file.file, "ab") as f:
+        f.write(b'{"torn":')
+
+    payloads = list(iter_partitions(tmp_path, collected_to=SECOND_HOUR.replace(minute=0)))
+
+    assert [len(payload["item_list"]) for payload in payloads] == [2, 1]
+
+
+async def test_run_collector_partitioned(tiktok_client: Mock, tmp_path: Path) -> None:
+    tiktok_client.get_trending = AsyncMock(
+        return_value=TrendingResponse.model_validate(data.SINGLE_FYP)
+    )
+    collector = TrendingCollector(
+        tiktok_client, TikTokParams.default_web(), tmp_path, partition_by="hour"
+    )
+
+    output_path = await collector.run(cycles=2, interval=0)
+
+    assert output_path == (tmp_path / "trending" / "partitions").as_posix()
+    assert collector.sink is None
+    # Both cycles land in the current hour, unless the run straddles the hour
+    selected = prune(Path(output_path))
+    assert sum(sink_file.items for _, sink_file in selected) == 2
+    assert all(sink_file.min_id is not None for _, sink_file in selected)
+    assert len(list(iter_partitions(Path(output_path)))) == 2
+
+    with pytest.raises(ValueError):
+        TrendingCollector(
+            tiktok_client,
+            TikTokParams.default_web(),
+            tmp_path,
+            checkpoint_every=1,
+            partition_by="hour",
+        )
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from tiktok.collectors.budget import RequestBudget
+from tiktok.collectors.scheduler import JobBudget, Scheduler
+
+
+async def requests(budget: JobBudget, count: int, grants: list[str]) -> None:
+    for _ in range(count):
+        await budget.acquire()
+        grants.append(budget.name)
+
+
+async def test_weighted_fair_sharing() -> None:
+    scheduler = Scheduler(requests_per_minute=60_000)
+    grants: list[str] = []
+
+    await scheduler.run(
+        requests(scheduler.job("light", weight=1), 40, grants),
+        requests(scheduler.job("heavy", weight=3), 40, grants),
+    )
+
+    # While both are backlogged, the heavy job gets three requests out of four
+    assert 13 <= grants[:20].count("heavy") <= 17
+    assert scheduler.metrics()["heavy"]["requests"] == 40
+
+
+async def test_endpoint_limit_does_not_block_others() -> None:
+    scheduler = Scheduler(requests_per_minute=60_000, endpoint_limits={"list_comments": 600})
+    grants: list[str] = []
+    comment_times: list[float] = []
+
+    async def comments() -> None:
+        budget = scheduler.job("comments", endpoint="list_comments")
+        for _ in range(3):
+            await budget.acquire()
+            comment_times.append(asyncio.get_running_loop().time())
+            grants.append("comments")
+
+    await scheduler.run(
+        comments(), requests(scheduler.job("trending", endpoint="get_trending"), 20, grants)
+    )
+
+    # One comment request every 100ms, the trending job uses the rest of the budget meanwhile
+    assert comment_times[2] - comment_times[0] >= 0.19
+    first, second = [i for i, name in enumerate(grants) if name == "comments"][:2]
+    assert "trending" in grants[first:second]
+
+
+async def test_idle_job_gets_no_credit() -> None:
+    scheduler = Scheduler(requests_per_minute=60_000)
+    busy, idle = scheduler.job("busy"), scheduler.job("idle")
+    grants: list[str] = []
+
+    async def late() -> None:
+        await asyncio.sleep(0.02)
+        await requests(idle, 10, grants)
+
+    await scheduler.run(requests(busy, 40, grants), late())
+
+    # Once back, the idle job shares equally instead of catching up on its past share
+    start = grants.index("idle")
+    assert 4 <= grants[start : start + 10].count("busy") <= 6
+
+
+async def test_failing_job_cancels_others() -> None:
+    scheduler = Scheduler(requests_per_minute=600)
+    grants: list[str] = []
+    waiting = asyncio.create_task(requests(scheduler.job("waiting"), 10, grants))
+
+    async def failing() -> None:
+        await scheduler.job("failing").acquire()
+        raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(scheduler.run(waiting, failing()), 1)
+
+    assert waiting.cancelled()
+    assert len(grants) < 10
+
+
+def test_duplicate_job() -> None:
+    scheduler = Scheduler(requests_per_minute=60)
+    scheduler.job("trending")
+
+    with pytest.raises(ValueError):
+        scheduler.job("trending")
+
+
+async def test_request_budget_try_acquire() -> None:
+    budget = RequestBudget(rate=1, burst=1)
+
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+    assert 0 < budget.wait_time() <= 1
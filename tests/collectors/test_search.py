@@ -0,0 +1,88 @@
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+import tests.data as data
+from tiktok.collectors.progress import PROGRESS_FILE, CursorProgress
+from tiktok.collectors.search import SearchCollector
+from tiktok.collectors.sinks import iter_ndjson
+from tiktok.models.apis.search import SearchResponse
+from tiktok.models.params.base import TikTokParams
+from tiktok.models.params.search import SearchParams
+
+PAGES = 3
+
+
+def search_page(
+    keyword: str, params: TikTokParams, offset: int | None, search_id: str | None
+) -> SearchResponse:
+    response = SearchResponse.model_validate(data.SEARCH_RESPONSE)
+    response.cursor = (offset or 0) + 12
+    response.has_more = response.cursor < PAGES * 12
+    return response
+
+
+@pytest.fixture
+def search_client(tiktok_client: Mock) -> Mock:
+    tiktok_client.search_keyword = AsyncMock(side_effect=search_page)
+    return tiktok_client
+
+
+async def test_search_streams(search_client: Mock, tmp_path: Path) -> None:
+    collector = SearchCollector(search_client, TikTokParams.default_web(), tmp_path, max_pages=2)
+
+    output_path = Path(await collector.run(["cats", "dogs"]))
+
+    assert len(list(iter_ndjson(output_path / "items"))) == 2 * 2 * 12
+    assert len(list(iter_ndjson(output_path / "users"))) == 2 * 2
+    progress = CursorProgress.model_validate_json((output_path / PROGRESS_FILE).read_text())
+    assert progress.keys["cats"].cursor == 24
+    assert progress.keys["cats"].context["search_id"] == "20250209140830C746BDA3F53F6369DC33"
+    assert not progress.keys["cats"].done
+
+
+async def test_search_resumes(search_client: Mock, tmp_path: Path) -> None:
+    await SearchCollector(search_client, TikTokParams.default_web(), tmp_path, max_pages=1).run(
+        ["cats"]
+    )
+    await SearchCollector(search_client, TikTokParams.default_web(), tmp_path, max_pages=5).run(
+        ["cats"]
+    )
+    await SearchCollector(search_client, TikTokParams.default_web(), tmp_path, max_pages=5).run(
+        ["cats"]
+    )
+
+    calls = search_client.search_keyword.call_args_list
+    assert [call.args[2] for call in calls] == [None, 12, 24]
+    assert [call.args[3] for call in calls] == [None, *["20250209140830C746BDA3F53F6369DC33"] * 2]
+
+
+async def test_search_resume_drops_unsaved_pages(search_client: Mock, tmp_path: Path) -> None:
+    collector = SearchCollector(search_client, TikTokParams.default_web(), tmp_path, max_pages=1)
+    output_path = Path(await collector.run(["cats"]))
+    checkpoint = (output_path / PROGRESS_FILE).read_bytes()
+
+    # Crash after the results of the next page were flushed, but before the progress was saved
+    collector = SearchCollector(search_client, TikTokParams.default_web(), tmp_path, max_pages=2)
+    await collector.run(["cats"])
+    (output_path / PROGRESS_FILE).write_bytes(checkpoint)
+    for stream in ("items", "users"):
+        with next((output_path / stream).glob("*.ndjson")).open("ab") as file:
+            file.write(b'{"id": "')
+
+    await SearchCollector(search_client, TikTokParams.default_web(), tmp_path).run(["cats"])
+
+    assert len(list(iter_ndjson(output_path / "items"))) == PAGES * 12
+    assert len(list(iter_ndjson(output_path / "users"))) == PAGES
+
+
+def test_search_params_offset() -> None:
+    params = TikTokParams.default_web()
+
+    dumped = SearchParams.with_keyword("cats", params).model_dump(exclude_unset=True)
+    assert "offset" not in dumped
+    assert "search_id" not in dumped
+    dumped = SearchParams.with_keyword("cats", params, 12, "id").model_dump(exclude_unset=True)
+    assert dumped["offset"] == 12
+    assert dumped["search_id"] == "id"
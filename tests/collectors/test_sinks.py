@@ -0,0 +1,114 @@
+import json
+from pathlib import Path
+
+from tiktok.collectors.sinks import (
+    MANIFEST_FILE,
+    NdjsonSink,
+    SinkManifest,
+    iter_ndjson,
+    ndjson_to_json_array,
+)
+
+
+async def test_write_appends_lines(tmp_path: Path) -> None:
+    sink = NdjsonSink(tmp_path)
+
+    await sink.write([{"test": "first"}])
+    await sink.write([{"test": "second"}, {"test": "third"}])
+    await sink.close()
+
+    lines = (tmp_path / "trending-00000.ndjson").read_bytes().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"test": "first"},
+        {"test": "second"},
+        {"test": "third"},
+    ]
+
+
+async def test_flush_writes_manifest(tmp_path: Path) -> None:
+    sink = NdjsonSink(tmp_path)
+
+    await sink.write([{"test": "data"}])
+    await sink.flush()
+
+    manifest = SinkManifest.model_validate_json((tmp_path / MANIFEST_FILE).read_bytes())
+    assert len(manifest.files) == 1
+    assert manifest.files[0].items == 1
+    assert manifest.files[0].bytes == (tmp_path / manifest.files[0].file).stat().st_size
+    assert manifest.files[0].closed_at is None
+    await sink.close()
+
+
+async def test_rotate_by_size(tmp_path: Path) -> None:
+    sink = NdjsonSink(tmp_path, max_file_bytes=32)
+
+    for i in range(4):
+        await sink.write([{"test": "x" * 10, "i": i}])
+    await sink.close()
+
+    assert len(sink.manifest.files) == 4
+    assert all(sink_file.closed_at is not None for sink_file in sink.manifest.files)
+    assert [payload["i"] for payload in iter_ndjson(tmp_path)] == [0, 1, 2, 3]
+
+
+async def test_resume_appends_to_manifest(tmp_path: Path) -> None:
+    sink = NdjsonSink(tmp_path)
+    await sink.write([{"i": 0}])
+    await sink.close()
+
+    sink = NdjsonSink(tmp_path)
+    await sink.write([{"i": 1}])
+    await sink.close()
+
+    assert len(sink.manifest.files) == 2
+    assert [payload["i"] for payload in iter_ndjson(tmp_path)] == [0, 1]
+
+
+async def test_ndjson_to_json_array(tmp_path: Path) -> None:
+    sink = NdjsonSink(tmp_path, max_file_bytes=16)
+    payloads = [{"i": i} for i in range(5)]
+    await sink.write(payloads[:2])
+    await sink.write(payloads[2:])
+    await sink.close()
+
+    count = ndjson_to_json_array(tmp_path, tmp_path / "trending.json")
+
+    assert count == 5
+    assert json.loads((tmp_path / "trending.json").read_text()) == payloads
+
+
+def test_ndjson_to_json_array_empty(tmp_path: Path) -> None:
+    (tmp_path / MANIFEST_FILE).write_text(SinkManifest(name="trending").model_dump_json())
+
+    assert ndjson_to_json_array(tmp_path, tmp_path / "trending.json") == 0
+    assert json.loads((tmp_path / "trending.json").read_text()) == []
+
+
+async def test_restore_drops_unflushed(tmp_path: Path) -> None:
+    sink = NdjsonSink(tmp_path, max_file_bytes=16)
+    await sink.write([{"i": 0}])
+    await sink.flush()
+    snapshot = sink.manifest.model_copy(deep=True)
+    await sink.write([{"i": 1}, {"i": 2}])
+    await sink.write([{"i": 3}])
+    await sink.close()
+
+    sink = NdjsonSink(tmp_path)
+    sink.restore(snapshot)
+    await sink.write([{"i": 4}])
+    await sink.close()
+
+    assert [payload["i"] for payload in iter_ndjson(tmp_path)] == [0, 4]
+
+
+async def test_readers_skip_unflushed_lines(tmp_path: Path) -> None:
+    sink = NdjsonSink(tmp_path)
+    await sink.write([{"i": 0}, {"i": 1}])
+    await sink.flush()
+    # Simulate a crash: a torn line after the last flush
+    with open(tmp_path / sink.manifest.files[-1].file, "ab") as f:
+        f.write(b'{"i": 2}\n{"i":')
+
+    assert [payload["i"] for payload in iter_ndjson(tmp_path)] == [0, 1]
+    assert ndjson_to_json_array(tmp_path, tmp_path / "trending.json") == 2
+    assert json.loads((tmp_path / "trending.json").read_text()) == [{"i": 0}, {"i": 1}]
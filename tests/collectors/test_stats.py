@@ -0,0 +1,123 @@
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import tests.data as data
+from tiktok.collectors.base import Record
+from tiktok.collectors.sinks import iter_ndjson
+from tiktok.collectors.stats import StatsSchedule, StatsTracker, TrackStage
+from tiktok.models.apis.common import VideoStats
+from tiktok.models.apis.trending import TrendingResponse
+from tiktok.models.params.base import TikTokParams
+
+NOW = 1_750_000_000.0
+
+
+def test_schedule_order() -> None:
+    schedule = StatsSchedule()
+
+    assert schedule.add(3, now=NOW + 2)
+    assert schedule.add(1, now=NOW)
+    assert schedule.add(2, now=NOW + 1)
+    assert not schedule.add(1, now=NOW)
+
+    assert schedule.pop_due(NOW - 1) is None
+    due = [schedule.pop_due(NOW + 10) for _ in range(3)]
+    assert [schedule.ids[slot] for slot in due if slot is not None] == [1, 2, 3]
+    assert schedule.next_due() is None
+
+
+def test_schedule_deltas() -> None:
+    schedule = StatsSchedule()
+    schedule.add(1, created_at=NOW, now=NOW)
+
+    first = schedule.update(0, [100, 10, 1, 0, 0], now=NOW)
+    second = schedule.update(0, [1100, 15, 1, 2, 0], now=NOW + 3600)
+
+    assert first["d_play_count"] == 100
+    assert first["dt"] == 0
+    assert second == {
+        "id": "1",
+        "ts": int(NOW + 3600),
+        "dt": 3600,
+        "d_play_count": 1000,
+        "d_digg_count": 5,
+        "d_comment_count": 0,
+        "d_share_count": 2,
+        "d_collect_count": 0,
+    }
+
+
+def test_schedule_velocity_and_age() -> None:
+    schedule = StatsSchedule(velocity_scale=100)
+    for video_id in (1, 2, 3):
+        schedule.add(video_id, created_at=NOW, now=NOW)
+        schedule.update(video_id - 1, [0] * 5, now=NOW)
+
+    # A fast-growing video, a slow one and an old one
+    schedule.update(0, [10_000, 0, 0, 0, 0], now=NOW + 3600)
+    schedule.update(1, [10, 0, 0, 0, 0], now=NOW + 3600)
+    schedule.created_at[2] = NOW - 3 * 86400
+    schedule.update(2, [10, 0, 0, 0, 0], now=NOW + 3600)
+
+    fast, slow, old = (schedule.interval(slot, NOW + 3600) for slot in range(3))
+    assert fast < slow < old
+    assert fast == schedule.min_interval
+
+
+def test_schedule_drops_old_videos() -> None:
+    schedule = StatsSchedule(max_age=3600)
+    schedule.add(1, created_at=NOW - 7200, now=NOW)
+
+    slot = schedule.pop_due(NOW)
+    assert slot is not None
+    schedule.update(slot, [0] * 5, now=NOW)
+
+    assert schedule.scheduled == 0
+
+
+def details(play_count: int | None) -> Mock:
+    video = TrendingResponse.model_validate(data.SINGLE_FYP).item_list[0]
+    video.stats = VideoStats(play_count=play_count) if play_count is not None else None
+    return Mock(item_info=Mock(item_struct=video))
+
+
+async def test_tracker_polls(tiktok_client: Mock, tmp_path: Path) -> None:
+    tiktok_client.get_video_details = AsyncMock(side_effect=[details(10), Exception("Error")])
+    tracker = StatsTracker(
+        tiktok_client, TikTokParams.default_web(), tmp_path, requests_per_minute=6000
+    )
+    tracker.track("1")
+    tracker.track("2")
+    tracker.track("invalid")
+
+    output_path = await tracker.run(max_polls=2)
+
+    rows = list(iter_ndjson(Path(output_path)))
+    assert [row["d_play_count"] for row in rows] == [10]
+    assert tracker.polls == 2
+    assert tracker.schedule.scheduled == 2
+
+
+async def test_tracker_retries_missing_stats(tiktok_client: Mock, tmp_path: Path) -> None:
+    tiktok_client.get_video_details = AsyncMock(return_value=details(None))
+    tracker = StatsTracker(
+        tiktok_client, TikTokParams.default_web(), tmp_path, requests_per_minute=6000
+    )
+    tracker.track("1")
+
+    output_path = await tracker.run(max_polls=1)
+
+    assert not list(Path(output_path).glob("*.ndjson"))
+    assert tracker.schedule.polled_at[0] == 0
+    assert tracker.schedule.scheduled == 1
+
+
+async def test_track_stage(tiktok_client: Mock, tmp_path: Path) -> None:
+    tracker = StatsTracker(tiktok_client, TikTokParams.default_web(), tmp_path)
+    stage = TrackStage(tracker)
+
+    await stage.track(Record("trending", {"item_list": [{"id": "1", "create_time": NOW}]}))
+    await stage.track(Record("search", {"streams": {"items": [{"id": "2"}, {"id": "1"}]}}))
+
+    assert list(tracker.schedule.ids) == [1, 2]
+    assert tracker.schedule.created_at[0] == NOW
@@ -1,13 +1,18 @@
+import asyncio
 import json
 from pathlib import Path
+from typing import Any, Sequence
 from unittest.mock import AsyncMock, Mock
 
 import pytest
+from pydantic import SecretStr
 
 import tests.data as data
 from tests.mock import FakeIOReader
 from tiktok.client.tiktok_client import TikTokClient
-from tiktok.collectors.trending import CollectorState, TrendingCollector
+from tiktok.collectors.dedupe import SEEN_FILE, SeenSet
+from tiktok.collectors.sinks import NdjsonSink
+from tiktok.collectors.trending import CollectorState, TrendingCollector, load_output
 from tiktok.models.apis.trending import TrendingResponse
 from tiktok.models.params.base import TikTokParams
 
@@ -70,3 +75,127 @@ async def test_write_to_output_appends(collector: TrendingCollector) -> None:
 def test_stop_collector(collector: TrendingCollector) -> None:
     collector.stop()
     assert collector.state == CollectorState.STOPPED
+
+
+async def test_run_collector_appends_ndjson(
+    tiktok_client: Mock, collector: TrendingCollector
+) -> None:
+    tiktok_client.get_trending = AsyncMock(
+        return_value=TrendingResponse.model_validate(data.SINGLE_FYP)
+    )
+
+    output_path = await collector.run(cycles=2, interval=0)
+
+    assert len(load_output(Path(output_path))) == 2
+
+
+async def test_run_collector_dedupe(
+    tiktok_client: Mock, tmp_path: Path, io_reader: FakeIOReader
+) -> None:
+    tiktok_client.get_trending = AsyncMock(
+        return_value=TrendingResponse.model_validate(data.SINGLE_FYP)
+    )
+    collector = TrendingCollector(
+        tiktok_client,
+        TikTokParams.default_web(),
+        tmp_path,
+        dedupe=True,
+        _io_reader=io_reader,
+        _test=True,
+    )
+
+    output_path = await collector.run(cycles=2, interval=0)
+
+    first, second = load_output(Path(output_path))
+    assert first.item_list
+    assert not second.item_list
+    # Saved once committed
+    assert len(SeenSet.load(tmp_path / "trending" / SEEN_FILE)) == len(first.item_list)
+
+
+async def test_run_collector_resume(tmp_path: Path) -> None:
+    vv_counts = []
+
+    async def get_trending(params: TikTokParams) -> TrendingResponse:
+        vv_counts.append(params.vv_count_fyp)
+        return TrendingResponse.model_validate(data.SINGLE_FYP)
+
+    client = Mock(ms_token=SecretStr("first"), get_trending=get_trending)
+    params = TikTokParams.default_web()
+    collector = TrendingCollector(client, params, tmp_path, checkpoint_every=1)
+    output_path = await collector.run(batch_size=2, cycles=3, interval=0)
+
+    # Simulate a crash: a torn line after the last checkpoint and a fresh token
+    checkpoint = collector.load_checkpoint()
+    assert checkpoint is not None
+    assert checkpoint.cycle == 3
+    assert checkpoint.vv_count_fyp == 6
+    with open(Path(output_path) / checkpoint.manifest.files[-1].file, "ab") as f:
+        f.write(b'{"torn":')
+    client.ms_token = SecretStr("other")
+
+    collector = TrendingCollector(client, params, tmp_path, checkpoint_every=1)
+    resumed_path = await collector.run(batch_size=2, cycles=5, interval=0, resume=True)
+
+    assert resumed_path == output_path
+    assert client.ms_token.get_secret_value() == "first"
+    assert vv_counts == [0, 2, 4, 6, 8]
+    assert len(load_output(Path(output_path))) == 5
+
+
+class MemorySink:
+    """An extra sink committing instantly."""
+
+    def __init__(self) -> None:
+        self.payloads: list[dict[str, Any]] = []
+
+    async def write(self, payloads: Sequence[dict[str, Any]]) -> None:
+        self.payloads.extend(payloads)
+
+    async def flush(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+async def test_checkpoint_waits_for_every_sink(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    write = NdjsonSink.write
+
+    async def slow_write(self: NdjsonSink, payloads: Sequence[dict[str, Any]]) -> None:
+        await asyncio.sleep(0.05)
+        await write(self, payloads)
+
+    monkeypatch.setattr(NdjsonSink, "write", slow_write)
+    checkpoints = []
+    write_checkpoint = TrendingCollector.write_checkpoint
+
+    async def record_checkpoint(self: TrendingCollector, cycle: int, vv_count_fyp: int) -> None:
+        assert self.sink is not None
+        checkpoints.append((cycle, sum(file.items for file in self.sink.manifest.files)))
+        await write_checkpoint(self, cycle, vv_count_fyp)
+
+    monkeypatch.setattr(TrendingCollector, "write_checkpoint", record_checkpoint)
+    client = Mock(
+        ms_token=SecretStr("token"),
+        get_trending=AsyncMock(return_value=TrendingResponse.model_validate(data.SINGLE_FYP)),
+    )
+    extra = MemorySink()
+    collector = TrendingCollector(
+        client,
+        TikTokParams.default_web(),
+        tmp_path,
+        flush_interval=0.01,
+        checkpoint_every=1,
+        sinks=[extra],
+    )
+
+    await collector.run(cycles=3, interval=0)
+
+    assert len(extra.payloads) == 3
+    # Every checkpoint covers its cycle in the NDJSON output
+    assert checkpoints
+    assert all(items >= cycle for cycle, items in checkpoints)
+    assert checkpoints[-1][0] == 3
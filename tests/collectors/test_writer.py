@@ -0,0 +1,88 @@
+import asyncio
+from typing import Any, Sequence
+
+import pytest
+
+from tiktok.collectors.writer import BufferedWriter
+
+
+class FakeSink:
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.batches: list[list[dict[str, Any]]] = []
+        self.flushes = 0
+        self.closed = False
+
+    async def write(self, payloads: Sequence[dict[str, Any]]) -> None:
+        if self.fail:
+            raise OSError("Disk full")
+        self.batches.append(list(payloads))
+
+    async def flush(self) -> None:
+        self.flushes += 1
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+async def test_group_commit() -> None:
+    sink = FakeSink()
+    async with BufferedWriter(sink, max_batch=3, flush_interval=10) as writer:
+        for i in range(7):
+            await writer.put({"i": i})
+
+    assert [[p["i"] for p in batch] for batch in sink.batches] == [[0, 1, 2], [3, 4, 5], [6]]
+    assert sink.flushes == 3
+    assert sink.closed
+    assert writer.items_written == 7
+    assert writer.metrics()["flushes"] == 3
+
+
+async def test_flush_interval() -> None:
+    sink = FakeSink()
+    writer = BufferedWriter(sink, flush_interval=0.01)
+    writer.start()
+
+    await writer.put({"i": 0})
+    # Committed after the interval, without any more payloads
+    for _ in range(100):
+        if sink.batches:
+            break
+        await asyncio.sleep(0.01)
+
+    assert sink.batches == [[{"i": 0}]]
+    await writer.close()
+
+
+async def test_backpressure() -> None:
+    sink = FakeSink()
+    writer = BufferedWriter(sink, max_queue=2, max_batch=1)
+
+    await writer.put({"i": 0})
+    await writer.put({"i": 1})
+    assert writer.queue_depth == 2
+
+    # The queue is full, producers wait for the writer task
+    put = asyncio.create_task(writer.put({"i": 2}))
+    await asyncio.sleep(0)
+    assert not put.done()
+
+    writer.start()
+    await put
+    await writer.close()
+
+    assert writer.items_written == 3
+    assert writer.max_queue_depth == 2
+
+
+async def test_sink_error() -> None:
+    writer = BufferedWriter(FakeSink(fail=True), flush_interval=0)
+    writer.start()
+
+    await writer.put({"i": 0})
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(OSError):
+        await writer.put({"i": 1})
+    await writer.close()
+    assert writer.items_dropped == 1
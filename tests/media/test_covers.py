@@ -0,0 +1,138 @@
+import io
+from pathlib import Path
+from typing import Any
+from unittest.mock import Mock
+
+import httpx
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+import tiktok.media.covers as covers  # noqa: E402
+from tiktok.collectors.base import Record  # noqa: E402
+from tiktok.collectors.trending import TrendingCollector  # noqa: E402
+from tiktok.media.covers import CoverHashStage, HammingIndex, cover_pixels, phashes  # noqa: E402
+from tiktok.models.params.base import TikTokParams  # noqa: E402
+
+
+def cover(seed: int, size: int = 128, quality: int = 95) -> bytes:
+    """A random smooth JPEG cover."""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (8, 8, 3), dtype=np.uint8)
+    image = Image.fromarray(small).resize((size, size), Image.Resampling.BICUBIC)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def test_phash_near_duplicates() -> None:
+    original, reencoded, other = (
+        cover_pixels(cover(1)),
+        cover_pixels(cover(1, size=96, quality=40)),
+        cover_pixels(cover(2)),
+    )
+
+    hashes = phashes(np.stack([original, reencoded, other]))
+
+    assert hashes.dtype == np.uint64
+    assert bin(int(hashes[0] ^ hashes[1])).count("1") <= 6
+    assert bin(int(hashes[0] ^ hashes[2])).count("1") > 16
+
+
+def test_hamming_index(tmp_path: Path) -> None:
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(0, 2**63, 5000, dtype=np.uint64).tolist()
+    index = HammingIndex(merge_every=1000)
+    for key, hash_ in enumerate(hashes):
+        index.add(key, hash_)
+    # 3 bits from key 0, in different substrings; 9 bits from key 1
+    index.add(10_000, hashes[0] ^ (1 << 3 | 1 << 20 | 1 << 40))
+    index.add(10_001, hashes[1] ^ 0x1FF)
+
+    assert index.near_duplicates(0) == [(10_000, 3)]
+    assert index.near_duplicates(1) == []
+    assert index.near_duplicates(1, radius=9) == [(10_001, 9)]
+    # Matches a brute-force scan
+    query = hashes[2] ^ 0xF00F
+    expected = [
+        (key, bin(hash_ ^ query).count("1"))
+        for key, hash_ in enumerate(hashes)
+        if bin(hash_ ^ query).count("1") <= 12
+    ]
+    assert index.query(query, radius=12) == expected
+
+    index.save(tmp_path / "covers.npz")
+    loaded = HammingIndex.load(tmp_path / "covers.npz")
+    assert len(loaded) == 5002
+    assert 10_001 in loaded
+    assert loaded.near_duplicates(0) == [(10_000, 3)]
+
+
+def test_hamming_index_saves_pending_hashes_apart(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    written: list[str] = []
+    write_hashes = covers._write_hashes
+
+    def spy(path: Path, *arrays: Any) -> None:
+        written.append(path.name)
+        write_hashes(path, *arrays)
+
+    monkeypatch.setattr(covers, "_write_hashes", spy)
+    path = tmp_path / "covers.npz"
+    index = HammingIndex(merge_every=3)
+    for key in range(4):
+        index.add(key, key)
+    index.save(path)
+    assert written == ["covers.npz", "covers.pending.npz"]
+
+    # Without a merge, saves only rewrite the buffered hashes
+    index.add(4, 4)
+    index.save(path)
+    assert written[2:] == ["covers.pending.npz"]
+    assert len(HammingIndex.load(path)) == 5
+
+    index.add(5, 5)
+    index.save(path)
+    assert written[3:] == ["covers.npz", "covers.pending.npz"]
+    loaded = HammingIndex.load(path)
+    assert len(loaded) == 6
+    assert loaded.get(5) == 5
+
+
+async def test_cover_hash_stage(tmp_path: Path) -> None:
+    covers = {"/a.jpeg": cover(1), "/b.jpeg": cover(1, size=96, quality=40), "/c.jpeg": cover(2)}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path not in covers:
+            return httpx.Response(404)
+        return httpx.Response(200, content=covers[request.url.path])
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    stage = CoverHashStage(tmp_path / "covers.npz", _client=client)
+    items = [
+        {"id": "1", "video": {"cover": "https://cdn.example/a.jpeg"}},
+        {"id": "2", "video": {"origin_cover": "https://cdn.example/b.jpeg"}},
+        {"id": "3", "video": {"cover": "https://cdn.example/c.jpeg"}},
+        {"id": "4", "video": {"cover": "https://cdn.example/missing.jpeg"}},
+        # A compacted URL
+        {"id": "5", "video": {"cover": [0, "/a.jpeg"]}},
+    ]
+    record = Record("trending", {"item_list": items})
+
+    assert await stage.index_covers(record) == [record]
+    await stage.close()
+
+    assert stage.metrics() == {"covers_hashed": 3, "covers_failed": 1, "covers_indexed": 3}
+    index = HammingIndex.load(tmp_path / "covers.npz")
+    assert [key for key, _ in index.near_duplicates(1)] == [2]
+
+
+def test_cover_hash_stage_refuses_compacted_urls(tmp_path: Path) -> None:
+    stage = CoverHashStage(tmp_path / "covers.npz", _client=Mock())
+
+    with pytest.raises(ValueError):
+        TrendingCollector(
+            Mock(), TikTokParams.default_web(), tmp_path, compact_urls=True, stages=[stage]
+        )
@@ -0,0 +1,197 @@
+from pathlib import Path
+from typing import Any
+from unittest.mock import Mock
+
+import httpx
+import pytest
+
+import tests.data as data
+from tiktok.collectors.trending import TrendingCollector
+from tiktok.media.download import (
+    FileFetcher,
+    HttpFetcher,
+    MediaDownloader,
+    MediaJob,
+    MediaSink,
+    MediaSource,
+    MediaStore,
+    media_jobs,
+)
+from tiktok.models.apis.trending import TrendingResponse
+from tiktok.models.compaction import HostTable, compact_payload
+from tiktok.models.params.base import TikTokParams
+
+CONTENT = bytes(range(256)) * 1000
+
+
+def video(video_id: str, name: str, size: int | None = len(CONTENT)) -> dict[str, Any]:
+    return {
+        "id": video_id,
+        "video": {
+            "bitrate": 100,
+            "play_addr": f"https://cdn.example/{name}?sig=1",
+            "download_addr": "https://cdn.example/watermarked.mp4",
+            "bitrate_info": [
+                {"bitrate": 50, "play_addr": {"data_size": 1, "url_list": ["https://other"]}},
+                {"bitrate": 100, "play_addr": {"data_size": size, "url_list": ["https://mirror"]}},
+            ],
+        },
+    }
+
+
+def test_media_jobs() -> None:
+    payload = {"item_list": [video("1", "a.mp4"), {"id": "2", "video": {}}, {"id": "x"}]}
+
+    assert media_jobs(payload) == [
+        MediaJob(
+            "1",
+            (
+                MediaSource(("https://cdn.example/a.mp4?sig=1", "https://mirror"), len(CONTENT)),
+                MediaSource(("https://cdn.example/watermarked.mp4",)),
+            ),
+        )
+    ]
+
+
+def test_media_jobs_compacted() -> None:
+    payload = TrendingResponse.model_validate(data.MULTIPLE_FYP).model_dump(mode="json")
+
+    assert media_jobs(payload)
+    # Compacted URLs are skipped, not downloaded
+    assert media_jobs(compact_payload(payload, HostTable())) == []
+
+
+async def test_download_deduplicates(tmp_path: Path) -> None:
+    (tmp_path / "cdn").mkdir()
+    (tmp_path / "cdn" / "a.mp4").write_bytes(CONTENT)
+    (tmp_path / "cdn" / "b.mp4").write_bytes(CONTENT)
+    store = MediaStore(tmp_path / "media")
+    downloader = MediaDownloader(store, FileFetcher(tmp_path / "cdn"), concurrency=2)
+
+    jobs = [*media_jobs(video("1", "a.mp4")), *media_jobs(video("2", "b.mp4"))]
+    await downloader.run([*jobs, jobs[0]])
+    await downloader.run(jobs)
+
+    assert store.get("1") == store.get("2")
+    assert store.get("1").read_bytes() == CONTENT  # type: ignore[union-attr]
+    assert len(list((tmp_path / "media" / "objects").rglob("*.mp4"))) == 1
+    metrics = downloader.metrics()
+    assert metrics["completed"] == 2
+    assert metrics["skipped"] == 3
+    assert metrics["bytes"] == 2 * len(CONTENT)
+    store.close()
+
+    # The index is reloaded
+    assert MediaStore(tmp_path / "media").get("2") == store.get("2")
+
+
+async def test_download_checks_size(tmp_path: Path) -> None:
+    (tmp_path / "a.mp4").write_bytes(CONTENT)
+    store = MediaStore(tmp_path / "media")
+    downloader = MediaDownloader(store, FileFetcher(tmp_path), attempts=2)
+
+    too_small = MediaJob("1", (MediaSource(("a.mp4",), len(CONTENT) + 1),))
+    too_large = MediaJob("2", (MediaSource(("a.mp4",), len(CONTENT) - 1),))
+    assert await downloader.download(too_small) is None
+    assert await downloader.download(too_large) is None
+
+    assert downloader.failed == 2
+    # Incomplete downloads are kept for resuming, oversized ones dropped
+    assert store.partial("1").stat().st_size == len(CONTENT)
+    assert not store.partial("2").exists()
+
+
+def range_server(requests: list[dict[str, str]]) -> httpx.MockTransport:
+    """A CDN serving `CONTENT` with range requests, failing the first transfer halfway."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(dict(request.headers))
+        start = int(request.headers.get("Range", "bytes=0-")[6:].rstrip("-"))
+        if len(requests) == 1:
+            # Cut short
+            return httpx.Response(200, content=CONTENT[:1000])
+        return httpx.Response(
+            206,
+            headers={"Content-Range": f"bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}"},
+            content=CONTENT[start:],
+        )
+
+    return httpx.MockTransport(handler)
+
+
+async def test_http_download_resumes(tmp_path: Path) -> None:
+    requests: list[dict[str, str]] = []
+    fetcher = HttpFetcher(_client=httpx.AsyncClient(transport=range_server(requests)))
+    store = MediaStore(tmp_path)
+    downloader = MediaDownloader(store, fetcher)
+
+    job = MediaJob("1", (MediaSource(("https://cdn.example/a.mp4",), len(CONTENT)),))
+    path = await downloader.download(job)
+
+    assert path is not None
+    assert path.read_bytes() == CONTENT
+    assert "range" not in requests[0]
+    assert requests[1]["range"] == "bytes=1000-"
+    assert downloader.retried == 1
+    await fetcher.close()
+
+
+async def test_download_does_not_splice_sources(tmp_path: Path) -> None:
+    watermarked = bytes(reversed(CONTENT)) + b"watermark"
+    requests: list[dict[str, str]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append({"path": request.url.path, **request.headers})
+        if request.url.path == "/a.mp4":
+            # Cut short halfway
+            return httpx.Response(200, content=CONTENT[: len(CONTENT) // 2])
+        return httpx.Response(200, content=watermarked)
+
+    fetcher = HttpFetcher(_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    store = MediaStore(tmp_path)
+    downloader = MediaDownloader(store, fetcher, attempts=2)
+    # The play address without mirrors, then the download address
+    job = MediaJob(
+        "1",
+        (
+            MediaSource(("https://cdn.example/a.mp4",), len(CONTENT)),
+            MediaSource(("https://cdn.example/watermarked.mp4",)),
+        ),
+    )
+
+    path = await downloader.download(job)
+
+    assert [request["path"] for request in requests] == ["/a.mp4", "/watermarked.mp4"]
+    assert "range" not in requests[1]
+    assert path is not None
+    # The download address served another file: restarted from scratch, not resumed
+    assert path.read_bytes() == watermarked
+    assert not store.partial("1").exists()
+    assert not store.partial("1", 1).exists()
+    await fetcher.close()
+
+
+async def test_media_sink(tmp_path: Path) -> None:
+    (tmp_path / "cdn").mkdir()
+    (tmp_path / "cdn" / "a.mp4").write_bytes(CONTENT)
+    store = MediaStore(tmp_path / "media")
+    sink = MediaSink(MediaDownloader(store, FileFetcher(tmp_path / "cdn")))
+
+    await sink.write([{"item_list": [video("1", "a.mp4")]}])
+    await sink.close()
+
+    assert store.get("1") is not None
+    assert sink.pending == 0
+
+
+async def test_media_sink_refuses_compacted_urls(tmp_path: Path) -> None:
+    sink = MediaSink(MediaDownloader(MediaStore(tmp_path), FileFetcher(tmp_path)))
+    payload = TrendingResponse.model_validate(data.MULTIPLE_FYP).model_dump(mode="json")
+
+    with pytest.raises(ValueError):
+        await sink.write([compact_payload(payload, HostTable())])
+    with pytest.raises(ValueError):
+        TrendingCollector(
+            Mock(), TikTokParams.default_web(), tmp_path, compact_urls=True, sinks=[sink]
+        )
+    await sink.close()
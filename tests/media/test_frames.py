@@ -0,0 +1,75 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from tiktok.media.download import MediaStore  # noqa: E402
+from tiktok.media.frames import (  # noqa: E402
+    FrameExtractor,
+    FrameOptions,
+    load_features,
+    sample_frames,
+)
+
+FPS = 10
+
+
+def write_video(path: Path, colors: list[tuple[int, int, int]], seconds: float = 1.6) -> None:
+    """A video showing each BGR color for `seconds`."""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), FPS, (320, 240))
+    if not writer.isOpened():
+        pytest.skip("No MP4 encoder")
+    for color in colors:
+        frame = np.full((240, 320, 3), color, dtype=np.uint8)
+        for _ in range(round(seconds * FPS)):
+            writer.write(frame)
+    writer.release()
+
+
+def test_sample_frames(tmp_path: Path) -> None:
+    write_video(tmp_path / "a.mp4", [(0, 0, 255), (255, 0, 0)])
+
+    at_intervals = list(sample_frames(tmp_path / "a.mp4", FrameOptions(interval=1.0)))
+    on_scenes = list(
+        sample_frames(tmp_path / "a.mp4", FrameOptions(interval=None, scene_threshold=0.5))
+    )
+    capped = list(sample_frames(tmp_path / "a.mp4", FrameOptions(interval=0.1, max_frames=4)))
+
+    assert [frame.timestamp for frame in at_intervals] == [0.0, 1.0, 2.0, 3.0]
+    assert [frame.timestamp for frame in on_scenes] == [0.0, 1.6]
+    assert on_scenes[1].score > 0.5
+    assert len(capped) == 4
+    with pytest.raises(ValueError):
+        next(sample_frames(tmp_path / "a.mp4", FrameOptions(interval=None)))
+
+
+def test_frame_extractor(tmp_path: Path) -> None:
+    store = MediaStore(tmp_path / "media")
+    for video_id, colors in (("1", [(0, 0, 255)]), ("2", [(0, 255, 0), (255, 0, 0)])):
+        write_video(tmp_path / f"{video_id}.mp4", colors)
+        store.commit(video_id, tmp_path / f"{video_id}.mp4", video_id * 64)
+    # The same file as video 2
+    shutil.copy(
+        tmp_path / "media" / "objects" / "22" / "22" / f"{'2' * 64}.mp4", tmp_path / "3.mp4"
+    )
+    store.commit("3", tmp_path / "3.mp4", "2" * 64)
+    (tmp_path / "broken.mp4").write_bytes(b"not a video")
+    store.commit("4", tmp_path / "broken.mp4", "4" * 64)
+
+    extractor = FrameExtractor(store, FrameOptions(interval=1.0, thumbnail_size=64), workers=2)
+    extractor.run()
+    extractor.run(["1", "2"])
+
+    assert extractor.metrics() == {"extracted": 2, "skipped": 2, "failed": 1, "frames": 6}
+    folder = extractor.get("3")
+    assert folder is not None and folder == extractor.get("2")
+    features = load_features(folder)
+    assert features["timestamps"].tolist() == [0.0, 1.0, 2.0, 3.0]
+    assert features["features"].shape == (4, 128)
+    thumbnail = cv2.imread(str(folder / "0000.jpeg"))
+    assert thumbnail.shape == (48, 64, 3)
+    assert extractor.get("4") is None
+    store.close()
@@ -0,0 +1,41 @@
+import json
+
+import tests.data as data
+from tiktok.models.apis.trending import TrendingResponse
+from tiktok.models.compaction import HostTable, compact_payload, compact_url, expand_payload
+
+
+def test_compact_url() -> None:
+    """Test that URLs are split into host id, path and expiry."""
+    hosts = HostTable()
+    url = "https://p16-sign-va.tiktokcdn.com/obj/tos/abc?lk3s=1&x-expires=1736805600&x-signature=x"
+
+    assert compact_url(url, hosts) == [0, "/obj/tos/abc", 1736805600]
+    assert compact_url(url, hosts, keep_query=True) == [
+        0,
+        "/obj/tos/abc?lk3s=1&x-expires=1736805600&x-signature=x",
+        1736805600,
+    ]
+    assert hosts.to_list() == ["https://p16-sign-va.tiktokcdn.com"]
+
+
+def test_roundtrip_with_query() -> None:
+    """Test that payloads compacted keeping the query string are restored exactly."""
+    hosts = HostTable()
+
+    compacted = compact_payload(data.MULTIPLE_FYP, hosts, keep_query=True)
+
+    assert expand_payload(compacted, HostTable.from_list(hosts.to_list())) == data.MULTIPLE_FYP
+
+
+def test_roundtrip_without_query() -> None:
+    """Test that payloads compacted without the signed query strings still validate."""
+    hosts = HostTable()
+
+    compacted = compact_payload(data.MULTIPLE_FYP, hosts)
+    expanded = TrendingResponse.model_validate(expand_payload(compacted, hosts))
+
+    assert len(json.dumps(compacted)) < len(json.dumps(data.MULTIPLE_FYP))
+    video = expanded.item_list[0].video
+    assert video.cover is not None and "?" not in video.cover
+    assert video.cover.startswith("https://")
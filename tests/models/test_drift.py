@@ -0,0 +1,47 @@
+import copy
+from typing import Any
+
+import tests.data as data
+from tiktok.models.apis.trending import TrendingResponse
+from tiktok.models.drift import SchemaDriftMonitor
+
+
+def test_no_drift_on_known_payload() -> None:
+    """Test that a payload matching the models reports no drift."""
+    monitor = SchemaDriftMonitor(sample_every=1)
+
+    monitor.observe(TrendingResponse, data.MULTIPLE_FYP)
+
+    report = monitor.report()
+    assert report["payloads_sampled"] == {"TrendingResponse": 1}
+    assert report["unknown_keys"] == {}
+    assert report["type_mismatches"] == []
+
+
+def test_drift_detected() -> None:
+    """Test that unknown keys and type changes are reported with their paths."""
+    payload: dict[str, Any] = copy.deepcopy(data.SINGLE_FYP)
+    payload["itemList"][0]["author"]["newField"] = 1
+    payload["itemList"][0]["stats"]["playCount"] = "1000"
+    monitor = SchemaDriftMonitor(sample_every=1)
+
+    monitor.observe(TrendingResponse, payload)
+
+    report = monitor.report()
+    assert report["unknown_keys"] == {
+        "TrendingResponse.itemList[].author.newField": {"count": 1, "types": {"int": 1}}
+    }
+    assert report["type_mismatches"] == [
+        {"path": "TrendingResponse.itemList[].stats.playCount", "type": "str", "count": 1}
+    ]
+
+
+def test_sampling() -> None:
+    """Test that only one in `sample_every` payloads is walked."""
+    monitor = SchemaDriftMonitor(sample_every=10)
+
+    for _ in range(25):
+        monitor.observe(TrendingResponse, data.SINGLE_FYP)
+
+    assert monitor.payloads_seen["TrendingResponse"] == 25
+    assert monitor.payloads_sampled["TrendingResponse"] == 3
@@ -0,0 +1,33 @@
+import json
+
+import tests.data as data
+from tiktok.models.apis.trending import TrendingResponse
+from tiktok.models.interning import StringInterner
+
+
+def test_parsed_strings_are_shared() -> None:
+    """Test that hot string fields share one instance across separately parsed responses."""
+    raw = json.dumps(data.SINGLE_FYP)
+
+    first = TrendingResponse.model_validate(json.loads(raw)).item_list[0]
+    second = TrendingResponse.model_validate(json.loads(raw)).item_list[0]
+
+    assert first.author.sec_uid is not None
+    assert first.author.sec_uid is second.author.sec_uid
+    assert first.video.codec_type is second.video.codec_type
+
+
+def test_interner_is_bounded() -> None:
+    """Test that the oldest entries are evicted once the table is full."""
+    interner = StringInterner(max_size=2)
+
+    for value in ["a", "b", "c"]:
+        interner.intern(value)
+
+    assert len(interner) == 2
+    assert interner.misses == 3
+
+    # "a" was evicted, "c" is still there
+    interner.intern("a")
+    interner.intern("c")
+    assert interner.misses == 4
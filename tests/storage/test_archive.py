@@ -0,0 +1,108 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+pytest.importorskip("zstandard")
+
+from tiktok.collectors.sinks import NdjsonSink  # noqa: E402
+from tiktok.storage.archive import (  # noqa: E402
+    ArchiveReader,
+    ArchiveSink,
+    ArchiveWriter,
+    to_archive,
+)
+
+
+def response(first_id: int, videos: int = 10) -> dict[str, Any]:
+    return {
+        "item_list": [
+            {"id": str(first_id + index), "desc": "trending " * 20} for index in range(videos)
+        ]
+    }
+
+
+async def test_sink_random_access(tmp_path: Path) -> None:
+    sink = ArchiveSink(tmp_path, frame_bytes=4096, max_file_bytes=2048)
+    await sink.write([response(video_id) for video_id in range(0, 1000, 10)])
+    await sink.close()
+
+    assert len(list(tmp_path.glob("archive-*.idx"))) > 1
+    assert sink.writer.frames > 1
+    assert sink.bytes_written < sink.writer.bytes_in / 5
+    with ArchiveReader(tmp_path) as reader:
+        assert len(reader) == 1000
+        payload = reader.get(537)
+        assert payload is not None
+        assert payload["item_list"][0]["id"] == "530"
+        assert reader.get_item(999) == {"id": "999", "desc": "trending " * 20}
+        assert reader.get(1000) is None
+        assert reader.get_item(-1 % 2**64) is None
+
+
+async def test_sink_flush_writes_pending_payloads(tmp_path: Path) -> None:
+    sink = ArchiveSink(tmp_path, frame_bytes=4096)
+    for video_id in range(0, 30, 10):
+        await sink.write([response(video_id)])
+        await sink.flush()
+
+    # Every flushed payload is durable
+    assert sink.writer.frames == 3
+    await sink.close()
+
+    sink = ArchiveSink(tmp_path / "buffered", frame_bytes=4096, flush_pending=False)
+    for video_id in range(0, 100, 10):
+        await sink.write([response(video_id)])
+        await sink.flush()
+
+    # Only complete frames are written
+    assert 0 < sink.writer.frames <= 5
+    await sink.close()
+    with ArchiveReader(tmp_path / "buffered") as reader:
+        assert len(reader) == 100
+
+
+async def test_get_returns_newest_payload(tmp_path: Path) -> None:
+    writer = ArchiveWriter(tmp_path)
+    writer.add([{"id": "1", "desc": "old"}, {"id": "2"}])
+    writer.close()
+    writer = ArchiveWriter(tmp_path)
+    writer.add([{"id": "1", "desc": "new"}, {"cid": "3", "text": "comment"}])
+    writer.close()
+
+    with ArchiveReader(tmp_path) as reader:
+        assert reader.get_item(1) == {"id": "1", "desc": "new"}
+        assert reader.get_item(2) == {"id": "2"}
+        assert reader.get_item(3) == {"cid": "3", "text": "comment"}
+
+
+async def test_unindexed_file_is_indexed_by_next_writer(tmp_path: Path) -> None:
+    writer = ArchiveWriter(tmp_path)
+    writer.add([response(0)])
+    writer.flush(pending=True)
+    writer.add([response(100)])
+    writer.flush(pending=True)
+    # Simulate a crash: no index and a torn last frame
+    with open(tmp_path / "archive-00000.zst", "ab") as f:
+        f.write(b"\x28\xb5\x2f\xfd\x00")
+    assert not (tmp_path / "archive-00000.idx").exists()
+
+    writer = ArchiveWriter(tmp_path)
+    writer.add([response(200)])
+    writer.close()
+
+    with ArchiveReader(tmp_path) as reader:
+        assert len(reader) == 30
+        assert reader.get_item(105) is not None
+
+
+async def test_to_archive(tmp_path: Path) -> None:
+    sink = NdjsonSink(tmp_path / "run")
+    await sink.write([response(0), response(10)])
+    await sink.close()
+
+    writer = to_archive(tmp_path / "run", tmp_path / "archive")
+
+    assert writer.payloads_written == 2
+    with ArchiveReader(tmp_path / "archive") as reader:
+        assert reader.get_item(15) is not None
@@ -0,0 +1,118 @@
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+pytest.importorskip("zstandard")
+
+from tiktok.storage.blobs import (  # noqa: E402
+    BlobSink,
+    BlobStore,
+    find_references,
+    iter_logged_responses,
+)
+
+
+def response(*video_ids: str, now: int = 0) -> dict[str, Any]:
+    return {
+        "extra": {"now": now},
+        "item_list": [{"id": video_id, "desc": f"video {video_id}"} for video_id in video_ids],
+    }
+
+
+def test_put_deduplicates_items(tmp_path: Path) -> None:
+    store = BlobStore(tmp_path, fsync=False)
+
+    first = store.put(response("1", "2", now=1))
+    second = store.put(response("2", "3", now=2))
+
+    assert store.get(first) == response("1", "2", now=1)
+    assert store.get(second) == response("2", "3", now=2)
+    assert store.put(response("1", "2", now=1)) == first
+    # Two envelopes and three videos
+    assert len(list(store.digests())) == 5
+    assert store.path(first).parent.parent.parent == tmp_path
+    with pytest.raises(KeyError):
+        store.get("0" * 64)
+
+
+def test_collect_garbage(tmp_path: Path) -> None:
+    store = BlobStore(tmp_path, fsync=False)
+    kept = store.put(response("1", "2"))
+    dropped = store.put(response("3"))
+
+    # Recent blobs are kept, as their references may not be written yet
+    assert store.collect_garbage([kept]) == 0
+    for path in tmp_path.glob("??/??/*.zst"):
+        os.utime(path, (0, 0))
+    assert store.collect_garbage([kept]) == 2
+
+    assert store.get(kept) == response("1", "2")
+    assert dropped not in store
+
+
+def test_collect_garbage_keeps_refreshed_blobs(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store = BlobStore(tmp_path, fsync=False)
+    digest = store.put_bytes(b"blob")
+    path = store.path(digest)
+    os.utime(path, (0, 0))
+    rename = os.rename
+
+    def put_then_rename(source: Path, destination: Path) -> None:
+        # A concurrent put deduplicates against the blob, after the sweep checked it
+        assert store.put_bytes(b"blob") == digest
+        rename(source, destination)
+
+    monkeypatch.setattr(os, "rename", put_then_rename)
+    assert store.collect_garbage([]) == 0
+    monkeypatch.undo()
+    assert store.get_bytes(digest) == b"blob"
+
+    # A sweep interrupted after the rename: restored while still recent or referenced
+    os.rename(path, path.with_name(path.name + ".trash"))
+    assert store.collect_garbage([]) == 0
+    assert digest in store
+    os.rename(path, path.with_name(path.name + ".trash"))
+    os.utime(path.with_name(path.name + ".trash"), (0, 0))
+    assert store.collect_garbage([digest]) == 0
+    assert digest in store
+    assert store.collect_garbage([]) == 1
+    assert list(tmp_path.glob("??/??/*")) == []
+
+
+async def test_blob_sink_references(tmp_path: Path) -> None:
+    store = BlobStore(tmp_path / "blobs", fsync=False)
+    sink = BlobSink(store, tmp_path / "run")
+
+    await sink.write([response("1"), response("1")])
+    await sink.close()
+
+    (digest,) = find_references([tmp_path / "run"])
+    assert store.get(digest) == response("1")
+
+
+def test_iter_logged_responses(tmp_path: Path) -> None:
+    store = BlobStore(tmp_path / "blobs", fsync=False)
+    log = {
+        "cycles": [
+            {
+                "api_responses": [
+                    {"endpoint": "get_trending", "response_data": response("1")},
+                    {"endpoint": "get_trending", "response_digest": store.put(response("2"))},
+                    {"endpoint": "digg_video", "response_data": {"is_digg": 0}},
+                    {"endpoint": "get_trending", "response_data": None, "error": "timeout"},
+                ],
+                "actions": [],
+            }
+        ]
+    }
+    (tmp_path / "bot_activity_20250101_000000.json").write_text(json.dumps(log))
+
+    responses = list(iter_logged_responses(tmp_path, ["get_trending"]))
+
+    assert responses == [("get_trending", response("1")), ("get_trending", response("2"))]
+    assert len(find_references([tmp_path])) == 1
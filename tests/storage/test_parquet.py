@@ -0,0 +1,56 @@
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from tests.data import MULTIPLE_FYP  # noqa: E402
+from tiktok.collectors.sinks import NdjsonSink  # noqa: E402
+from tiktok.models.apis.trending import TrendingResponse  # noqa: E402
+from tiktok.storage.parquet import ParquetSink, to_parquet  # noqa: E402
+
+
+def trending_payload() -> dict[str, Any]:
+    return TrendingResponse.model_validate(MULTIPLE_FYP).model_dump(mode="json")
+
+
+async def test_parquet_sink_row_groups(tmp_path: Path) -> None:
+    payload = trending_payload()
+    videos = len(payload["item_list"])
+    sink = ParquetSink(tmp_path, row_group_rows=4, max_file_rows=8)
+
+    await sink.write([payload, payload])
+    # Only complete files are published
+    assert len(list(tmp_path.glob("*.parquet"))) == 2 * videos // 8
+    assert list(tmp_path.glob("*.parquet.tmp"))
+    await sink.close()
+
+    files = sorted(tmp_path.glob("*.parquet"))
+    assert len(files) == -(-2 * videos // 8)
+    metadata = pq.ParquetFile(files[0]).metadata
+    assert metadata.num_row_groups == 2
+    column = metadata.row_group(0).column(1)
+    assert column.path_in_schema == "create_time"
+    assert column.statistics.has_min_max
+    assert column.compression == "ZSTD"
+
+    table = pq.read_table(tmp_path)
+    assert table.num_rows == 2 * videos
+    assert table.schema.field("hashtags").type.value_type == "string"
+
+
+async def test_to_parquet(tmp_path: Path) -> None:
+    payload = trending_payload()
+    sink = NdjsonSink(tmp_path / "run")
+    await sink.write([payload])
+    await sink.close()
+
+    count = to_parquet(tmp_path / "run", tmp_path / "parquet")
+
+    assert count == len(payload["item_list"])
+    table = pq.read_table(
+        tmp_path / "parquet", filters=[("create_time", ">", datetime(2020, 1, 1, tzinfo=UTC))]
+    )
+    assert table.num_rows == count
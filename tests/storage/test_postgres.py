@@ -0,0 +1,73 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+import pytest
+
+pytest.importorskip("asyncpg")
+
+from tests.data import MULTIPLE_FYP  # noqa: E402
+from tiktok.models.apis.trending import TrendingResponse  # noqa: E402
+from tiktok.storage.postgres import PostgresSink, upsert_query  # noqa: E402
+from tiktok.storage.rows import VIDEO_HASHTAGS, VIDEOS  # noqa: E402
+
+
+class FakeConnection:
+    def __init__(self, pool: "FakePool") -> None:
+        self.pool = pool
+
+    async def execute(self, query: str) -> None:
+        self.pool.queries.append(query)
+
+    async def copy_records_to_table(
+        self, table: str, records: list[Any], columns: tuple[str, ...]
+    ) -> None:
+        await asyncio.sleep(0.01)
+        self.pool.copied.setdefault(table, []).extend(records)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        yield
+
+
+class FakePool:
+    def __init__(self) -> None:
+        self.queries: list[str] = []
+        self.copied: dict[str, list[Any]] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[FakeConnection]:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            yield FakeConnection(self)
+        finally:
+            self.in_flight -= 1
+
+
+def test_upsert_query() -> None:
+    assert upsert_query(VIDEO_HASHTAGS, "staging").endswith(
+        "ON CONFLICT (video_id, hashtag_id) DO NOTHING"
+    )
+    query = upsert_query(VIDEOS, "staging")
+    assert "description = EXCLUDED.description" in query
+    # In key order, never overwriting a newer row
+    assert "FROM staging ORDER BY id ON CONFLICT (id)" in query
+    assert query.endswith("WHERE videos.updated_at <= EXCLUDED.updated_at")
+
+
+async def test_postgres_sink_batches() -> None:
+    payload = TrendingResponse.model_validate(MULTIPLE_FYP).model_dump(mode="json")
+    pool = FakePool()
+    sink = PostgresSink("postgresql://test", batch_rows=50, max_in_flight=2, _pool=pool)
+
+    for _ in range(6):
+        await sink.write([payload])
+    await sink.close()
+
+    assert pool.max_in_flight <= 2
+    assert sink.batches_loaded >= 2
+    assert len(pool.copied["staging_videos"]) == 6 * len(payload["item_list"])
+    assert any(query.startswith("INSERT INTO videos") for query in pool.queries)
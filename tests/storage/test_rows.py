@@ -0,0 +1,89 @@
+from datetime import UTC, datetime
+
+import pytest
+
+from tests.data import LIST_COMMENTS_RESPONSE, MULTIPLE_FYP
+from tiktok.models.apis.comment import CommentListResponse
+from tiktok.models.apis.trending import TrendingResponse
+from tiktok.storage.rows import (
+    COMMENTS,
+    VIDEO_HASHTAGS,
+    VIDEO_STATS,
+    VIDEOS,
+    RowBatch,
+    flat_records,
+    to_id,
+)
+
+
+def test_trending_rows() -> None:
+    payload = TrendingResponse.model_validate(MULTIPLE_FYP).model_dump(mode="json")
+    batch = RowBatch()
+
+    batch.extend("trending", [payload, payload])
+
+    # Repeated videos are upserted once per batch
+    assert len(batch.records(VIDEOS)) == len(payload["item_list"])
+    video = batch.records(VIDEOS)[0]
+    item = payload["item_list"][0]
+    assert video[0] == int(item["id"])
+    assert video[1] == int(item["author"]["id"])
+    observed_at = datetime.fromtimestamp(payload["extra"]["now"] / 1000, UTC)
+    stats = batch.records(VIDEO_STATS)[0]
+    assert stats[:3] == (int(item["id"]), observed_at, item["stats"]["play_count"])
+    assert len(batch.records(VIDEO_HASHTAGS)) == sum(
+        len(item["challenges"] or []) for item in payload["item_list"]
+    )
+
+
+def test_comment_rows() -> None:
+    response = CommentListResponse.model_validate(LIST_COMMENTS_RESPONSE)
+    comments = [comment.model_dump(mode="json") for comment in response.comments]
+    batch = RowBatch()
+
+    batch.extend("comments", [*comments, {"cid": None}])
+
+    assert len(batch.records(COMMENTS)) == len(comments)
+    assert batch.skipped == 1
+    row = batch.records(COMMENTS)[0]
+    assert row[0] == int(comments[0]["cid"])
+    assert row[1] == int(comments[0]["aweme_id"])
+
+
+def test_unknown_kind() -> None:
+    with pytest.raises(ValueError):
+        RowBatch().extend("users", [{}])
+
+
+def test_to_id() -> None:
+    assert to_id("7454987487992204566") == 7454987487992204566
+    assert to_id("") is None
+    assert to_id("MS4wLjABAAAA") is None
+
+
+def test_flat_records() -> None:
+    payload = TrendingResponse.model_validate(MULTIPLE_FYP).model_dump(mode="json")
+
+    records = flat_records("trending", payload)
+
+    assert len(records) == len(payload["item_list"])
+    item = payload["item_list"][0]
+    assert records[0]["id"] == int(item["id"])
+    assert records[0]["author_unique_id"] == item["author"]["unique_id"]
+    assert records[0]["play_count"] == item["stats"]["play_count"]
+    assert records[0]["video_width"] == item["video"]["width"]
+    tagged = next(i for i, item in enumerate(payload["item_list"]) if item["challenges"])
+    assert records[tagged]["hashtags"] == [
+        challenge["title"] for challenge in payload["item_list"][tagged]["challenges"]
+    ]
+
+
+def test_flat_comments() -> None:
+    response = CommentListResponse.model_validate(LIST_COMMENTS_RESPONSE)
+    comment = response.comments[0].model_dump(mode="json")
+
+    (record,) = flat_records("comments", comment)
+
+    assert record["id"] == int(comment["cid"])
+    assert record["author_unique_id"] == comment["user"]["unique_id"]
+    assert flat_records("comments", {"cid": "not an ID"}) == []
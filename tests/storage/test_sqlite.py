@@ -0,0 +1,66 @@
+from datetime import UTC, datetime
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+from tests.data import LIST_COMMENTS_RESPONSE, MULTIPLE_FYP
+from tiktok.collectors.trending import TrendingCollector
+from tiktok.models.apis.comment import CommentListResponse
+from tiktok.models.apis.trending import TrendingResponse
+from tiktok.models.params.base import TikTokParams
+from tiktok.storage.sqlite import SqliteReader, SqliteSink
+
+
+async def test_sqlite_sink(tmp_path: Path) -> None:
+    payload = TrendingResponse.model_validate(MULTIPLE_FYP).model_dump(mode="json")
+    item = payload["item_list"][0]
+    path = tmp_path / "tiktok.db"
+    sink = SqliteSink(path, batch_rows=10)
+
+    await sink.write([payload])
+    await sink.flush()
+
+    # A reader sees the committed rows while the sink is still open
+    with SqliteReader(path) as reader:
+        assert reader.counts()["videos"] == len(payload["item_list"])
+        video = reader.video(int(item["id"]))
+        assert video is not None
+        assert video["description"] == item["desc"]
+        assert reader.videos_by_author(int(item["author"]["id"]))[0]["id"] == int(item["id"])
+        tagged = next(item for item in payload["item_list"] if item["challenges"])
+        hashtag = tagged["challenges"][0]["title"]
+        assert int(tagged["id"]) in [row["id"] for row in reader.videos_by_hashtag(hashtag)]
+        created = datetime.fromtimestamp(item["create_time"], UTC)
+        assert reader.videos_created_between(created, created.replace(year=created.year + 1))
+        assert reader.stats(int(item["id"]))[0]["play_count"] == item["stats"]["play_count"]
+
+        # Upserted, not duplicated
+        await sink.write([payload])
+        await sink.close()
+        assert reader.counts()["videos"] == len(payload["item_list"])
+
+    assert sink.transactions == 2
+
+
+async def test_sqlite_sink_comments(tmp_path: Path) -> None:
+    response = CommentListResponse.model_validate(LIST_COMMENTS_RESPONSE)
+    comments = [comment.model_dump(mode="json") for comment in response.comments]
+    sink = SqliteSink(tmp_path / "tiktok.db", kind="comments")
+
+    await sink.write(comments)
+    await sink.close()
+
+    with SqliteReader(tmp_path / "tiktok.db") as reader:
+        rows = reader.comments(int(comments[0]["aweme_id"]))
+    assert len(rows) == len({comment["cid"] for comment in comments})
+
+
+async def test_trending_collector_sqlite(tiktok_client: Mock, tmp_path: Path) -> None:
+    response = TrendingResponse.model_validate(MULTIPLE_FYP)
+    tiktok_client.get_trending = AsyncMock(return_value=response)
+    sink = SqliteSink(tmp_path / "tiktok.db")
+    collector = TrendingCollector(tiktok_client, TikTokParams.default_web(), tmp_path, sinks=[sink])
+
+    await collector.run(interval=0, cycles=2)
+
+    with SqliteReader(tmp_path / "tiktok.db") as reader:
+        assert reader.counts()["videos"] == len(response.item_list)
@@ -18,6 +18,9 @@ class BotConfig(BaseSettings):
     video_action_prompt: str = VIDEO_ACTION_PROMPT
     end_of_cycle_prompt: str = END_OF_CYCLE_PROMPT
 
+    # Store the API responses in the blob store of the log folder, referenced from the logs
+    store_responses: bool = True
+
     # # DIGGING
     # tq_like: float = 0.14
     # bq_like: float = 0.06
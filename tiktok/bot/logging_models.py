@@ -12,6 +12,8 @@ class APIResponse(BaseModel):
     timestamp: datetime
     success: bool
     response_data: dict[str, Any] | None = None
+    # Digest of the response in the blob store, instead of an inline `response_data`
+    response_digest: str | None = None
     error: str | None = None
 
 
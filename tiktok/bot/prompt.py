@@ -1,4 +1,6 @@
-import json
+from typing import Any, Final
+
+import orjson
 
 from tiktok.models.apis.common import TikTokVideo
 
@@ -92,14 +94,55 @@ def get_behavior_prompt(behavior: str) -> str:
     return BOT_BEHAVIOR_PROMPT.format(bot_behavior=behavior)
 
 
+LLM_CACHE_SIZE: Final[int] = 4096
+"""Maximum number of serialized video projections kept in memory."""
+
+_LLM_CACHE: dict[str, tuple[tuple[Any, ...], bytes]] = {}
+"""Serialized `to_llm` projections by video ID, with the state they were computed from."""
+
+
+def _llm_state(video: TikTokVideo) -> tuple[Any, ...]:
+    """Return the mutable part of a video projection, which invalidates a memoized entry."""
+    stats = video.stats
+    return (
+        video.digged,
+        video.collected,
+        (stats.play_count, stats.digg_count, stats.comment_count, stats.share_count)
+        if stats
+        else None,
+    )
+
+
+def serialize_videos(videos: list[TikTokVideo]) -> list[bytes]:
+    """
+    Project and serialize a batch of videos for the LLM in a single pass.
+
+    Projections are memoized per video ID, so a video seen again (in a later batch or when the
+    same prompt is rebuilt) is neither projected nor serialized twice.
+    """
+    serialized = []
+    for video in videos:
+        state = _llm_state(video)
+        cached = _LLM_CACHE.get(video.id)
+        if cached is None or cached[0] != state:
+            if cached is None and len(_LLM_CACHE) >= LLM_CACHE_SIZE:
+                del _LLM_CACHE[next(iter(_LLM_CACHE))]
+            cached = _LLM_CACHE[video.id] = (state, orjson.dumps(video.to_llm()))
+        serialized.append(cached[1])
+    return serialized
+
+
+def project_videos(videos: list[TikTokVideo]) -> list[dict[str, Any]]:
+    """Return the LLM-facing summaries of a batch of videos."""
+    return [orjson.loads(serialized) for serialized in serialize_videos(videos)]
+
+
 def get_video_prompts(videos: list[TikTokVideo], actions: list[str]) -> str:
     """
     Get the prompt for deciding actions for a list of trending videos.
     """
     # Convert each video to its LLM-friendly string representation.
-    video_details = "\n".join([json.dumps(video.to_llm()) for video in videos])
-    # print("vidoes", videos)
-    print("in vdieo prompt", VIDEO_ACTION_PROMPT.format(video_details=video_details, actions=actions))
+    video_details = b"\n".join(serialize_videos(videos)).decode()
     return VIDEO_ACTION_PROMPT.format(video_details=video_details, actions=actions)
 
 
@@ -38,6 +38,7 @@ from tiktok.models.apis.comment import Comment
 from tiktok.models.apis.trending import TikTokVideo
 from tiktok.models.params.base import TikTokParams
 from tiktok.models.types import AwemeId
+from tiktok.storage.blobs import BlobStore
 
 # Configure stdout logging
 _LOGGER = logging.getLogger(__name__)
@@ -66,6 +67,7 @@ class TikTokBot:
     :param current_cycle: Statistics for the current cycle.
     :param log_dir: Directory for storing log files.
     :param log_file: Specific file path for the session's log file.
+    :param blob_store: Content-addressed store of the API responses, None to log them inline.
     """
 
     def __init__(
@@ -138,6 +140,11 @@ class TikTokBot:
         self.log_file = (
             self.log_dir / f"bot_activity_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         )
+        # Identical responses (and videos) are stored once across cycles and sessions.
+        # Blobs are not fsynced, as the logs referencing them are not either.
+        self.blob_store = (
+            BlobStore(self.log_dir / "blobs", fsync=False) if config.store_responses else None
+        )
 
         _LOGGER.info(
             "[Init] Initialized TikTokBot with config: %s",
@@ -167,12 +174,19 @@ class TikTokBot:
         if self.current_cycle is None:
             return None
 
+        # Reference the response by digest, keeping the log to metadata.
+        response_digest = None
+        if self.blob_store is not None and response_data is not None:
+            response_digest = await asyncio.to_thread(self.blob_store.put, response_data)
+            response_data = None
+
         api_response = APIResponse(
             id=response_id,
             endpoint=endpoint,
             timestamp=datetime.now(),
             success=success,
             response_data=response_data,
+            response_digest=response_digest,
             error=error,
         )
         # Append this API response to the current cycle's log.
@@ -285,19 +299,16 @@ class TikTokBot:
                 )
 
                 # Generate a prompt for the current batch of videos
-                decision_video = await self.agent.decide_action(
-                    get_video_prompts(videos, list(VideoActions.__members__.keys())), VideoDecision
-                )
-                print("decision video", decision_video)
-                print("vidoes collected", self.current_cycle.videos_collected)
-                print("get", get_video_prompts(videos, list(VideoActions.__members__.keys())))
+                video_prompt = get_video_prompts(videos, list(VideoActions.__members__.keys()))
+                decision_video = await self.agent.decide_action(video_prompt, VideoDecision)
+                _LOGGER.debug("[Decision] Batch prompt -> [prompt: %s]", video_prompt)
+                _LOGGER.debug("[Decision] Batch decision -> [decision: %s]", decision_video)
                 if decision_video is None:
                     _LOGGER.warning("[Decision] No decision made for batch %d", idx)
                     continue
                 
                 success = True
                 # Process the decision for each video in the batch.
-                print("items", decision_video.actions.items())
                 for video_id, decision in decision_video.actions.items():
                     _LOGGER.info(
                         "[Decision] VIDEO %s: %s, %s",
@@ -306,7 +317,7 @@ class TikTokBot:
                         decision.reason,
                     )
                     video_id = self.current_cycle.videos_collected[0]
-                    print("new video id", video_id)
+                    _LOGGER.debug("[Decision] Acting on video -> [video_id: %s]", video_id)
                     match decision.action:
                         case VideoActions.NOOP:
                             pass
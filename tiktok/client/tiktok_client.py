@@ -1,9 +1,9 @@
 import logging
 import urllib.parse
-from typing import Any, cast
+from typing import Any, TypeVar, cast
 
 import httpx
-from pydantic import SecretStr
+from pydantic import BaseModel, SecretStr
 
 from tiktok.client.bogus import XBogus
 from tiktok.client.urls import Urls, standard_headers
@@ -17,6 +17,7 @@ from tiktok.models.apis.digg import DiggResponse
 from tiktok.models.apis.follow import FollowResponse
 from tiktok.models.apis.search import SearchResponse
 from tiktok.models.apis.trending import TrendingResponse
+from tiktok.models.drift import SchemaDriftMonitor
 from tiktok.models.params.base import TikTokParams
 from tiktok.models.params.comment import CommentDiggParams, CommentParams, CommentPublishParams
 from tiktok.models.params.details import VideoDetailsParams
@@ -26,6 +27,7 @@ from tiktok.models.params.search import SearchParams
 from tiktok.models.types import AwemeId
 
 _LOGGER = logging.getLogger(__name__)
+_ResponseT = TypeVar("_ResponseT", bound=BaseModel)
 
 
 class TikTokClient:
@@ -38,6 +40,7 @@ class TikTokClient:
         csrf_token: str,
         base_url: str = Urls.BASE_URL,
         *,
+        drift_monitor: SchemaDriftMonitor | None = None,
         _client: httpx.AsyncClient | None = None,
         _user_agent: str | None = None,
     ):
@@ -49,6 +52,7 @@ class TikTokClient:
             _user_agent
             or "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36"
         )
+        self.drift_monitor = drift_monitor
 
     async def _execute_request(
         self, method: str, url: str, params: dict[str, Any] | None, **kwargs: Any
@@ -85,6 +89,13 @@ class TikTokClient:
 
         return cast(dict[str, Any], response.json())
 
+    def _parse(self, model: type[_ResponseT], response: dict[str, Any]) -> _ResponseT:
+        """Parse a raw response into `model`, feeding the drift monitor if any."""
+        if self.drift_monitor is not None:
+            self.drift_monitor.observe(model, response)
+
+        return model.model_validate(response)
+
     async def get_trending(self, params: TikTokParams) -> TrendingResponse:
         """Get the trending videos."""
         _LOGGER.info(
@@ -99,7 +110,7 @@ class TikTokClient:
             params=params.model_dump(by_alias=True, exclude_unset=True),
         )
 
-        return TrendingResponse.model_validate(response)
+        return self._parse(TrendingResponse, response)
 
     async def digg_video(self, video_id: AwemeId, params: TikTokParams) -> DiggResponse:
         """Dig a video."""
@@ -113,22 +124,31 @@ class TikTokClient:
             url=Urls.DIGG,
             params=digg_params.model_dump(by_alias=True, exclude_unset=True),
         )
-        return DiggResponse.model_validate(response)
+        return self._parse(DiggResponse, response)
 
-    async def list_comments(self, video_id: AwemeId, params: TikTokParams) -> CommentListResponse:
-        """List comments for a video."""
+    async def list_comments(
+        self, video_id: AwemeId, params: TikTokParams, cursor: int | None = None
+    ) -> CommentListResponse:
+        """
+        List comments for a video.
+
+        :param video_id: the video to list the comments of
+        :param params: the base parameters, `count` being the page size
+        :param cursor: the cursor of the page to list, as returned by the previous page
+        """
         # video_id = "7518780802759511318"
         _LOGGER.info(
-            "[API Call] Listing comments -> [video_id: %s]",
+            "[API Call] Listing comments -> [video_id: %s, cursor: %s]",
             video_id,
+            cursor,
         )
-        comment_params = CommentParams.with_video_id(video_id, params)
+        comment_params = CommentParams.with_video_id(video_id, params, cursor)
         response = await self._execute_request(
             method="GET",
             url=Urls.GET_COMMENTS,
             params=comment_params.model_dump(by_alias=True, exclude_unset=True),
         )
-        return CommentListResponse.model_validate(response)
+        return self._parse(CommentListResponse, response)
 
     async def digg_comment(self, comment_id: AwemeId, params: TikTokParams) -> CommentDiggResponse:
         """Dig a comment."""
@@ -142,7 +162,7 @@ class TikTokClient:
             url=Urls.DIGG_COMMENT,
             params=digg_comment_params.model_dump(by_alias=True, exclude_unset=True),
         )
-        return CommentDiggResponse.model_validate(response)
+        return self._parse(CommentDiggResponse, response)
 
     async def publish_comment(
         self, comment: str, video_id: AwemeId, params: TikTokParams
@@ -161,21 +181,35 @@ class TikTokClient:
             url=Urls.POST_COMMENT,
             params=publish_comment_params.model_dump(by_alias=True, exclude_unset=True),
         )
-        return CommentPublishResponse.model_validate(response)
+        return self._parse(CommentPublishResponse, response)
 
-    async def search_keyword(self, keyword: str, params: TikTokParams) -> SearchResponse:
-        """Search for videos."""
+    async def search_keyword(
+        self,
+        keyword: str,
+        params: TikTokParams,
+        offset: int | None = None,
+        search_id: str | None = None,
+    ) -> SearchResponse:
+        """
+        Search for videos.
+
+        :param keyword: the keyword to search for
+        :param params: the base parameters
+        :param offset: the offset of the page to list, as returned by the previous page cursor
+        :param search_id: the ID of the search, as returned by the first page `log_pb`
+        """
         _LOGGER.info(
-            "[API Call] Searching -> [keyword: %s]",
+            "[API Call] Searching -> [keyword: %s, offset: %s]",
             keyword,
+            offset,
         )
-        search_params = SearchParams.with_keyword(keyword, params)
+        search_params = SearchParams.with_keyword(keyword, params, offset, search_id)
         response = await self._execute_request(
             method="GET",
             url=Urls.FULL_SEARCH,
             params=search_params.model_dump(by_alias=True, exclude_unset=True),
         )
-        return SearchResponse.model_validate(response)
+        return self._parse(SearchResponse, response)
 
     async def follow_user(self, user_id: str, params: TikTokParams) -> FollowResponse:
         """Follow a user."""
@@ -189,7 +223,7 @@ class TikTokClient:
             url=Urls.FOLLOW,
             params=follow_params.model_dump(by_alias=True, exclude_unset=True),
         )
-        return FollowResponse.model_validate(response)
+        return self._parse(FollowResponse, response)
 
     async def get_video_details(
         self, video_id: AwemeId, params: TikTokParams
@@ -205,4 +239,4 @@ class TikTokClient:
             url=Urls.GET_VIDEO_DETAIL,
             params=details_params.model_dump(by_alias=True, exclude_unset=True),
         )
-        return VideoDetailsResponse.model_validate(response)
+        return self._parse(VideoDetailsResponse, response)
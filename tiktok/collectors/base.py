@@ -0,0 +1,428 @@
+"""
+The generic collector pipeline.
+
+A collector is a source of records (trending cycles, search pages, comment pages...) feeding
+optional transform stages, which feed one or more sinks per stream:
+
+    source -> [queue] -> stage 1 (n workers) -> [queue] -> ... -> sinks (write-behind)
+
+Every queue is bounded, so a slow stage or sink slows the source down instead of buffering
+without limit.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from enum import StrEnum
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Mapping,
+    NamedTuple,
+    Sequence,
+    TypeVar,
+)
+
+from tiktok.collectors.metrics import LatencyWindow, Meter
+from tiktok.collectors.sinks import Sink
+from tiktok.collectors.writer import BufferedWriter
+
+_LOGGER = logging.getLogger(__name__)
+
+_DONE = object()
+"""Queue sentinel marking the end of the records."""
+
+_T = TypeVar("_T")
+
+
+class CollectorState(StrEnum):
+    """The collector state."""
+
+    IDLE = "idle"
+    RUNNING = "running"
+    STOPPED = "stopped"
+    ERROR = "error"
+
+
+class Record(NamedTuple):
+    """A payload flowing through the pipeline."""
+
+    stream: str
+    """The stream the payload belongs to, selecting its sinks."""
+
+    payload: dict[str, Any]
+    """The JSON payload."""
+
+    meta: Any = None
+    """Opaque source state (e.g. a cursor), handed to `Collector.committed` once written."""
+
+
+class _Commit(NamedTuple):
+    """The last record carrying a `Record.meta` committed by a writer, by its routing order."""
+
+    sequence: int
+    meta: Any
+
+
+Transform = Callable[[Record], Awaitable[Iterable[Record]]]
+"""A stage transform, returning the records to pass on (none to drop the record)."""
+
+
+class Stage:
+    """
+    A transform stage of the pipeline.
+
+    With a `concurrency` above 1, records may leave the stage out of order.
+    """
+
+    def __init__(
+        self, name: str, transform: Transform, concurrency: int = 1, max_queue: int = 64
+    ) -> None:
+        self.name = name
+        self.transform = transform
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+
+    async def close(self) -> None:
+        """Release the stage resources, once all records went through it."""
+
+    async def committed(self, stream: str, meta: Any) -> None:
+        """Called along with `Collector.committed`, possibly after `close`."""
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the stage metrics, merged into the collector metrics."""
+        return {}
+
+
+class Collector:
+    """A collector running a source through stages into sinks, with a lifecycle state."""
+
+    def __init__(
+        self,
+        stages: Sequence[Stage] = (),
+        max_queue: int = 64,
+        flush_interval: float = 1.0,
+    ) -> None:
+        # Input params
+        self.stages = list(stages)
+        self.max_queue = max_queue
+        # Output group commit interval (seconds)
+        self.flush_interval = flush_interval
+
+        # State params
+        self.state = CollectorState.IDLE
+        self.cycle = 0
+        self.last_error: Exception | None = None
+        self.skip_exceptions = False
+        self.writers: dict[str, list[BufferedWriter]] = {}
+        self.queues: dict[str, asyncio.Queue[Any]] = {}
+        # Per stream: the records with a meta routed, the last commit of each writer and the last
+        # sequence handed to `committed`
+        self._routed: dict[str, int] = {}
+        self._commits: dict[str, list[_Commit | None]] = {}
+        self._reported: dict[str, int] = {}
+
+        # Metrics
+        self.items = Meter()
+        self.requests = Meter()
+        self.fetch_latency = LatencyWindow()
+        self.errors: dict[str, Meter] = {}
+
+    def stop(self) -> None:
+        """Stop the collector."""
+        self.state = CollectorState.STOPPED
+
+    async def cycles(
+        self, cycles: int | None, interval: float, start: int = 0
+    ) -> AsyncIterator[int]:
+        """
+        Yield the cycle numbers while the collector is running.
+
+        :param cycles: the cycle to stop at. None for indefinitely.
+        :param interval: the wait-time (in seconds) between cycles
+        :param start: the last cycle already run, when resuming
+        """
+        self.cycle = start
+        while self.state == CollectorState.RUNNING and (cycles is None or self.cycle < cycles):
+            self.log_state()
+            self.cycle += 1
+            yield self.cycle
+
+            # Wait for the next cycle
+            if cycles is not None and self.cycle < cycles:
+                await asyncio.sleep(interval)
+
+    async def fan_out(
+        self,
+        keys: Iterable[str] | AsyncIterable[str],
+        crawl: Callable[[str], AsyncIterator[Record]],
+        concurrency: int,
+    ) -> AsyncIterator[Record]:
+        """
+        Yield the records of `crawl` for every key, crawling up to `concurrency` keys at once.
+
+        Duplicate keys are crawled once. A failing crawl is recorded and skips to the next key.
+        """
+        queued: asyncio.Queue[Any] = asyncio.Queue(maxsize=concurrency)
+        records: asyncio.Queue[Any] = asyncio.Queue(maxsize=concurrency)
+
+        feeder = asyncio.create_task(self._feed(keys, queued, concurrency))
+        crawlers = [
+            asyncio.create_task(self._crawl(crawl, queued, records)) for _ in range(concurrency)
+        ]
+        try:
+            remaining = len(crawlers)
+            while remaining:
+                record = await records.get()
+                if record is _DONE:
+                    remaining -= 1
+                    continue
+                yield record
+        finally:
+            for task in (feeder, *crawlers):
+                task.cancel()
+            await asyncio.gather(feeder, *crawlers, return_exceptions=True)
+
+    async def _feed(
+        self, keys: Iterable[str] | AsyncIterable[str], queued: asyncio.Queue[Any], workers: int
+    ) -> None:
+        """Queue the distinct keys, then one end marker per crawler."""
+        seen: set[str] = set()
+        try:
+            if isinstance(keys, AsyncIterable):
+                async for key in keys:
+                    if key not in seen:
+                        seen.add(key)
+                        await queued.put(key)
+            else:
+                for key in keys:
+                    if key not in seen:
+                        seen.add(key)
+                        await queued.put(key)
+        except Exception as e:
+            self.record_error(e)
+
+        # Not in a finally clause: a cancelled feeder must not block on a full queue
+        for _ in range(workers):
+            await queued.put(_DONE)
+
+    async def _crawl(
+        self,
+        crawl: Callable[[str], AsyncIterator[Record]],
+        queued: asyncio.Queue[Any],
+        records: asyncio.Queue[Any],
+    ) -> None:
+        """Crawl the queued keys one at a time, until the end marker."""
+        while (key := await queued.get()) is not _DONE:
+            try:
+                async for record in crawl(key):
+                    await records.put(record)
+            except Exception as e:
+                _LOGGER.warning("[Pipeline] Crawl failed -> [key: %s]", key)
+                self.record_error(e)
+
+        await records.put(_DONE)
+
+    async def fetch(self, request: Awaitable[_T]) -> _T:
+        """Await a client request, recording its latency."""
+        start = time.perf_counter()
+        try:
+            return await request
+        finally:
+            self.requests.mark()
+            self.fetch_latency.record(time.perf_counter() - start)
+
+    async def committed(self, stream: str, meta: Any) -> None:
+        """
+        Called once the records of `stream` up to the one carrying `meta` are durably written.
+
+        With several sinks per stream, a record is written once every sink committed it.
+        :param stream: the stream of the records
+        :param meta: the `Record.meta` of the last written record that had one
+        """
+
+    async def _writer_committed(self, stream: str, index: int, commit: _Commit) -> None:
+        """Hand the last record committed by every writer of `stream` to `committed`."""
+        commits = self._commits[stream]
+        commits[index] = commit
+        if any(last is None for last in commits):
+            return
+
+        # The writers commit the same records in the same order, at their own pace
+        oldest = min(last.sequence for last in commits if last is not None)
+        if oldest <= self._reported[stream]:
+            return
+        self._reported[stream] = oldest
+        meta = next(last.meta for last in commits if last is not None and last.sequence == oldest)
+        for stage in self.stages:
+            await stage.committed(stream, meta)
+        await self.committed(stream, meta)
+
+    def record_error(self, error: Exception) -> None:
+        """Record an error, stopping the collector unless exceptions are skipped."""
+        _LOGGER.error("Error while running the collector", exc_info=error)
+        self.last_error = error
+        self.errors.setdefault(type(error).__name__, Meter()).mark()
+        if not self.skip_exceptions:
+            self.state = CollectorState.ERROR
+
+    async def pipeline(
+        self,
+        source: AsyncIterator[Record],
+        sinks: Mapping[str, Sequence[Sink]],
+        skip_exceptions: bool = False,
+    ) -> None:
+        """
+        Run `source` through the collector stages into `sinks` until exhausted or stopped.
+
+        :param source: the source of records, stopped as soon as the collector is not running
+        :param sinks: the sinks of each stream, closed once the pipeline is drained
+        :param skip_exceptions: whether to skip exceptions and continue running
+        """
+        self.state = CollectorState.RUNNING
+        self.skip_exceptions = skip_exceptions
+        self.writers = {
+            stream: [
+                BufferedWriter(
+                    sink,
+                    flush_interval=self.flush_interval,
+                    on_commit=functools.partial(self._writer_committed, stream, index),
+                )
+                for index, sink in enumerate(targets)
+            ]
+            for stream, targets in sinks.items()
+        }
+        self._routed = dict.fromkeys(sinks, 0)
+        self._commits = {stream: [None] * len(targets) for stream, targets in sinks.items()}
+        self._reported = dict.fromkeys(sinks, 0)
+        for writers in self.writers.values():
+            for writer in writers:
+                writer.start()
+
+        queues: list[asyncio.Queue[Any]] = [asyncio.Queue(maxsize=self.max_queue)]
+        queues += [asyncio.Queue(maxsize=stage.max_queue) for stage in self.stages]
+        # Named after their consumer
+        self.queues = dict(zip([stage.name for stage in self.stages] + ["sinks"], queues))
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(self._pump(source, queues[0]))
+                for stage, inbox, outbox in zip(self.stages, queues, queues[1:]):
+                    group.create_task(self._run_stage(stage, inbox, outbox))
+                group.create_task(self._route(queues[-1]))
+        finally:
+            for writers in self.writers.values():
+                for writer in writers:
+                    await writer.close()
+                    writer.log_metrics()
+
+    async def _pump(self, source: AsyncIterator[Record], outbox: asyncio.Queue[Any]) -> None:
+        """Move the source records into the first queue."""
+        try:
+            async for record in source:
+                await outbox.put(record)
+                if self.state != CollectorState.RUNNING:
+                    break
+        except Exception as e:
+            # A failing source cannot be resumed, skipped exceptions or not
+            self.record_error(e)
+            self.state = CollectorState.ERROR
+        finally:
+            if hasattr(source, "aclose"):
+                await source.aclose()
+            await outbox.put(_DONE)
+
+    async def _run_stage(
+        self, stage: Stage, inbox: asyncio.Queue[Any], outbox: asyncio.Queue[Any]
+    ) -> None:
+        """Run the workers of `stage`, then pass on the end of the records."""
+        async with asyncio.TaskGroup() as group:
+            for _ in range(stage.concurrency):
+                group.create_task(self._work(stage, inbox, outbox))
+        await stage.close()
+        await outbox.put(_DONE)
+
+    async def _work(
+        self, stage: Stage, inbox: asyncio.Queue[Any], outbox: asyncio.Queue[Any]
+    ) -> None:
+        """Transform records from `inbox` into `outbox` until the end of the records."""
+        while True:
+            record = await inbox.get()
+            if record is _DONE:
+                # Let the other workers of the stage see it too
+                await inbox.put(_DONE)
+                return
+
+            try:
+                for result in await stage.transform(record):
+                    await outbox.put(result)
+            except Exception as e:
+                _LOGGER.warning("[Pipeline] Stage failed -> [stage: %s]", stage.name)
+                self.record_error(e)
+
+    async def _route(self, inbox: asyncio.Queue[Any]) -> None:
+        """Hand the records over to the writers of their stream."""
+        while True:
+            record = await inbox.get()
+            if record is _DONE:
+                return
+
+            writers = self.writers.get(record.stream)
+            if writers is None:
+                _LOGGER.warning("[Pipeline] No sink -> [stream: %s]", record.stream)
+                continue
+
+            marker = None
+            if record.meta is not None:
+                self._routed[record.stream] += 1
+                marker = _Commit(self._routed[record.stream], record.meta)
+            for writer in writers:
+                try:
+                    await writer.put(record.payload, marker)
+                except Exception as e:
+                    self.record_error(e)
+            self.items.mark()
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the collector metrics: throughput, latencies, errors, queues and outputs."""
+        stage_metrics: dict[str, Any] = {}
+        for stage in self.stages:
+            stage_metrics.update(stage.metrics())
+
+        return {
+            "state": self.state.value,
+            "cycle": self.cycle,
+            "items": self.items.total,
+            "items_per_second": self.items.rate(),
+            "requests": self.requests.total,
+            "requests_per_second": self.requests.rate(),
+            "fetch_latency": LatencyWindow.summary([self.fetch_latency]),
+            "errors": {
+                name: {"total": meter.total, "per_second": meter.rate()}
+                for name, meter in self.errors.items()
+            },
+            "duplicate_ratio": stage_metrics.get("duplicate_ratio"),
+            "queues": {name: queue.qsize() for name, queue in self.queues.items()},
+            "streams": {
+                stream: {
+                    "items_written": sum(writer.items_written for writer in writers),
+                    "bytes_written": sum(writer.metrics()["bytes_written"] for writer in writers),
+                    "queue_depth": sum(writer.queue_depth for writer in writers),
+                    "write_latency": LatencyWindow.summary(
+                        writer.commit_latency for writer in writers
+                    ),
+                }
+                for stream, writers in self.writers.items()
+            },
+            "stages": stage_metrics,
+        }
+
+    def log_state(self) -> None:
+        """Log current collector state and metrics in a clear, structured format."""
+        state_msg = f"Status -> [state: {self.state}, cycle: {self.cycle}, items/s: {self.items.rate():.2f}, requests/s: {self.requests.rate():.2f}, errors: {sum(meter.total for meter in self.errors.values())}, error: {str(self.last_error) if self.last_error else 'None'}]"
+        self.last_error = None
+        _LOGGER.info(state_msg)
@@ -0,0 +1,66 @@
+import asyncio
+import time
+from typing import Protocol
+
+
+class Budget(Protocol):
+    """A limit on the requests of a collector."""
+
+    async def acquire(self) -> None:
+        """Wait until a request can be made, and consume it."""
+        ...
+
+
+class RequestBudget:
+    """
+    A token bucket limiting the request rate, shared by every task (or collector) holding it.
+
+    Up to `burst` requests can be made at once, then one more every `1 / rate` seconds.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+        # Metrics
+        self.requests = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    async def acquire(self) -> None:
+        """Wait until a request can be made, and consume it."""
+        # Waiters are served in order: the lock is held while sleeping for a token
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                self.waits += 1
+                self.wait_seconds += delay
+                await asyncio.sleep(delay)
+                self._refill()
+
+            self._tokens -= 1
+            self.requests += 1
+
+    def try_acquire(self) -> bool:
+        """Consume a request if one can be made right away."""
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        self.requests += 1
+        return True
+
+    def wait_time(self) -> float:
+        """The time (in seconds) until a request can be made."""
+        self._refill()
+        return max(1 - self._tokens, 0) / self.rate
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, Iterable, Sequence
+
+from tiktok.client.tiktok_client import TikTokClient
+from tiktok.collectors.base import Collector, CollectorState, Record, Stage
+from tiktok.collectors.budget import Budget
+from tiktok.collectors.progress import (
+    PROGRESS_FILE,
+    CheckpointSink,
+    CursorProgress,
+    page_payload,
+)
+from tiktok.collectors.sinks import DEFAULT_MAX_FILE_BYTES, NdjsonSink
+from tiktok.collectors.trending import DEFAULT_OUTPUT_FOLDER
+from tiktok.models.params.base import TikTokParams
+from tiktok.models.types import AwemeId
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CommentCollector(Collector):
+    """
+    A collector for the comments of TikTok videos.
+
+    Up to `concurrency` videos are crawled at once, each page after page, while every request
+    waits on the (possibly shared) `budget`. Comments are appended to the `comments` folder of
+    the output folder, and a progress file lets a new run resume where the last one stopped.
+    """
+
+    def __init__(
+        self,
+        client: TikTokClient,
+        params: TikTokParams,
+        output_folder: Path = DEFAULT_OUTPUT_FOLDER,
+        concurrency: int = 4,
+        budget: Budget | None = None,
+        page_size: int = 20,
+        max_pages: int | None = None,
+        max_file_bytes: int | None = DEFAULT_MAX_FILE_BYTES,
+        flush_interval: float = 1.0,
+        stages: Sequence[Stage] = (),
+    ) -> None:
+        super().__init__(stages, flush_interval=flush_interval)
+
+        # Input params
+        self.client = client
+        self.params = params.model_copy(update={"count": page_size}, deep=True)
+        self.output_path = output_folder / "comments"
+        self.concurrency = concurrency
+        self.budget = budget
+        self.max_pages = max_pages
+        self.max_file_bytes = max_file_bytes
+
+        # Progress of the crawl, resumed from the last run if any
+        self.progress = CursorProgress.load(self.output_path / PROGRESS_FILE)
+
+    async def run(
+        self,
+        video_ids: Iterable[str] | AsyncIterable[str],
+        skip_exceptions: bool = False,
+    ) -> str:
+        """
+        Crawl the comments of the given videos.
+
+        :param video_ids: the IDs of the videos to crawl, see `ids_from_file` and `ids_from_queue`
+        :param skip_exceptions: whether to skip failing videos and continue running
+        :return: the output folder location
+        """
+        _LOGGER.info(
+            "Starting the comment collector -> [concurrency: %s, resumed videos: %s]",
+            self.concurrency,
+            len(self.progress.keys),
+        )
+
+        sink = CheckpointSink(
+            {"comments": NdjsonSink(self.output_path, "comments", self.max_file_bytes)},
+            self.progress,
+            self.output_path / PROGRESS_FILE,
+        )
+        # Drop the comments written after the last progress save, which are crawled again
+        sink.restore()
+        await self.pipeline(
+            self.fan_out(video_ids, self.crawl_video, self.concurrency),
+            {"comments": [sink]},
+            skip_exceptions,
+        )
+
+        return self.output_path.as_posix()
+
+    async def crawl_video(self, video_id: str) -> AsyncIterator[Record]:
+        """Yield the comment pages of a video, from where the last run stopped."""
+        state = self.progress.keys.get(video_id)
+        if state is not None and state.done:
+            return
+        cursor = state.cursor if state is not None else 0
+        page_count = 0
+
+        while self.state == CollectorState.RUNNING and (
+            self.max_pages is None or page_count < self.max_pages
+        ):
+            if self.budget is not None:
+                await self.budget.acquire()
+
+            response = await self.fetch(
+                self.client.list_comments(AwemeId(video_id), self.params, cursor)
+            )
+            page_count += 1
+            next_cursor = response.cursor if response.cursor is not None else cursor
+            has_more = bool(response.has_more) and bool(response.comments) and next_cursor != cursor
+            comments = [comment.model_dump(mode="json") for comment in response.comments]
+            yield Record(
+                "comments", page_payload(video_id, next_cursor, has_more, {"comments": comments})
+            )
+
+            if not has_more:
+                _LOGGER.info("Crawled comments -> [video_id: %s, pages: %s]", video_id, page_count)
+                return
+            cursor = next_cursor
+
+
+def ids_from_file(path: Path) -> list[str]:
+    """Read video IDs from a file, one per line."""
+    return [line.strip() for line in path.read_text().splitlines() if line.strip()]
+
+
+async def ids_from_queue(queue: asyncio.Queue[str | None]) -> AsyncIterator[str]:
+    """Yield video IDs from `queue` until a None is received."""
+    while (video_id := await queue.get()) is not None:
+        yield video_id
+
+
+class VideoIdTap(Stage):
+    """
+    A pass-through pipeline stage publishing the IDs of the videos of trending records.
+
+    Plugged in a `TrendingCollector`, it feeds a `CommentCollector` running on `ids_from_queue`.
+    The queue is closed with a None once the trending pipeline is drained.
+    """
+
+    def __init__(self, queue: asyncio.Queue[str | None]) -> None:
+        super().__init__("video_id_tap", self.tap)
+        self.queue = queue
+
+    async def tap(self, record: Record) -> list[Record]:
+        """Publish the video IDs of `record`."""
+        for key in ("item_list", "itemList"):
+            for item in record.payload.get(key) or []:
+                if item.get("id"):
+                    await self.queue.put(item["id"])
+        return [record]
+
+    async def close(self) -> None:
+        """Close the queue."""
+        await self.queue.put(None)
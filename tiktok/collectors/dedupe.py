@@ -0,0 +1,193 @@
+import logging
+import os
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Iterable
+
+from tiktok.collectors.base import Record, Stage
+
+_LOGGER = logging.getLogger(__name__)
+
+SEEN_FILE = "seen.bin"
+_ITEM_LIST_KEYS = ("item_list", "itemList")
+# The IDs an array('q') holds
+_ID_RANGE = range(-(2**63), 2**63)
+
+
+class SeenSet:
+    """
+    A compact set of video IDs.
+
+    TikTok video IDs are 64-bit integers: they are kept in a sorted `array('q')` (8 bytes per ID,
+    against ~100 for a `set` of strings) and looked up with a binary search. Recent IDs are
+    buffered in a small set and merged in batches: a batch is sorted on its own, then the array
+    is copied in one pass, chunk by chunk between the insertion points of the batch.
+    """
+
+    def __init__(self, ids: Iterable[int] = (), merge_every: int = 4096) -> None:
+        self.merge_every = merge_every
+        self._sorted = array("q", sorted(set(ids)))
+        self._pending: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._pending)
+
+    def __contains__(self, video_id: int) -> bool:
+        if video_id in self._pending:
+            return True
+        index = bisect_left(self._sorted, video_id)
+        return index < len(self._sorted) and self._sorted[index] == video_id
+
+    def add(self, video_id: int) -> None:
+        """Add `video_id` to the set, raising a ValueError if it is not a signed 64-bit integer."""
+        if video_id not in _ID_RANGE:
+            raise ValueError(f"Video ID out of range: {video_id}")
+        if video_id in self:
+            return
+        self._pending.add(video_id)
+        if len(self._pending) >= self.merge_every:
+            self.merge()
+
+    def merge(self) -> None:
+        """Merge the buffered IDs into the sorted array."""
+        if not self._pending:
+            return
+        merged = array("q")
+        start = 0
+        for video_id in sorted(self._pending):
+            index = bisect_left(self._sorted, video_id, start)
+            merged.extend(self._sorted[start:index])
+            merged.append(video_id)
+            start = index
+        merged.extend(self._sorted[start:])
+        self._sorted = merged
+        self._pending.clear()
+
+    def save(self, path: Path) -> None:
+        """Atomically write the set to `path`."""
+        self.merge()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(self._sorted.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, merge_every: int = 4096) -> "SeenSet":
+        """Load a set written by `save`, or an empty one if `path` does not exist."""
+        seen = cls(merge_every=merge_every)
+        if path.exists():
+            seen._sorted.frombytes(path.read_bytes())
+        return seen
+
+
+class DedupeStage(Stage):
+    """
+    A pipeline stage dropping the videos already collected, across cycles and runs.
+
+    The seen-set is reloaded from `path` on start. A video is only added to it once the record
+    which passed it on is committed by every sink (see `Collector.committed`): until then it is
+    kept in flight, still dropped from the next records but not saved, so that a crash never
+    leaves a video marked as seen without being written. Records without a `Record.meta` are
+    committed along with the next record having one. The set is saved every `save_every` commits
+    and on every commit once the pipeline is drained.
+    """
+
+    def __init__(self, path: Path, save_every: int = 10) -> None:
+        super().__init__("dedupe", self.dedupe)
+        self.path = path
+        self.save_every = save_every
+        self.seen = SeenSet.load(path)
+        _LOGGER.info("Loaded seen videos -> [path: %s, count: %s]", path, len(self.seen))
+        # The videos passed on but not committed yet, and per stream the (meta, video IDs) of
+        # the records not committed yet, in order
+        self._in_flight: set[int] = set()
+        self._uncommitted: dict[str, list[tuple[Any, list[int]]]] = {}
+        self._closed = False
+
+        # Metrics
+        self.records = 0
+        self.commits = 0
+        self.items = 0
+        self.duplicates = 0
+        self.last_ratio = 0.0
+
+    async def dedupe(self, record: Record) -> list[Record]:
+        """Drop the already seen videos from the item list of `record`."""
+        fresh_ids: list[int] = []
+        self._uncommitted.setdefault(record.stream, []).append((record.meta, fresh_ids))
+        key = next((key for key in _ITEM_LIST_KEYS if key in record.payload), None)
+        if key is None:
+            return [record]
+
+        items: list[dict[str, Any]] = record.payload[key] or []
+        fresh = [item for item in items if self._is_new(item, fresh_ids)]
+
+        duplicates = len(items) - len(fresh)
+        self.records += 1
+        self.items += len(items)
+        self.duplicates += duplicates
+        self.last_ratio = duplicates / len(items) if items else 0.0
+        _LOGGER.info(
+            "[Dedupe] Cycle -> [items: %s, duplicates: %s, ratio: %.2f, total ratio: %.2f]",
+            len(items),
+            duplicates,
+            self.last_ratio,
+            self.ratio,
+        )
+
+        return [record._replace(payload={**record.payload, key: fresh})]
+
+    async def committed(self, stream: str, meta: Any) -> None:
+        """Mark the videos of the records up to the one carrying `meta` as seen."""
+        uncommitted = self._uncommitted.get(stream, [])
+        index = next(
+            (i for i, (record_meta, _) in enumerate(uncommitted) if record_meta is meta), None
+        )
+        if index is None:
+            return
+
+        for _, video_ids in uncommitted[: index + 1]:
+            for video_id in video_ids:
+                self.seen.add(video_id)
+                self._in_flight.discard(video_id)
+        del uncommitted[: index + 1]
+
+        self.commits += 1
+        if self._closed or self.commits % self.save_every == 0:
+            self.seen.save(self.path)
+
+    @property
+    def ratio(self) -> float:
+        """The ratio of duplicate videos since the start."""
+        return self.duplicates / self.items if self.items else 0.0
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the duplicate metrics."""
+        return {
+            "duplicate_ratio": self.ratio,
+            "last_duplicate_ratio": self.last_ratio,
+            "duplicates": self.duplicates,
+            "seen": len(self.seen) + len(self._in_flight),
+        }
+
+    async def close(self) -> None:
+        """Save the seen-set; the last commits, still to come, save it too."""
+        self._closed = True
+        self.seen.save(self.path)
+
+    def _is_new(self, item: dict[str, Any], fresh_ids: list[int]) -> bool:
+        """Whether the video `item` was not seen yet, adding it to `fresh_ids` if so."""
+        try:
+            video_id = int(item["id"])
+        except (KeyError, TypeError, ValueError):
+            # Not a numeric ID, we cannot tell
+            return True
+        if video_id not in _ID_RANGE:
+            return True
+
+        if video_id in self.seen or video_id in self._in_flight:
+            return False
+        self._in_flight.add(video_id)
+        fresh_ids.append(video_id)
+        return True
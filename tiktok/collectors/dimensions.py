@@ -0,0 +1,329 @@
+"""
+Author and music dimensions, stored once instead of embedded in every video.
+
+`NormalizeStage` replaces the `author` and `music` objects of the collected videos by their
+`author_id` and `music_id`, upserting them into a `DimensionStore`: a SQLite database keeping the
+latest version of every author and music track, plus a change log of their fields. A version is
+only written when a tracked field changes (e.g. `nickname`, `signature` or `verified`).
+
+The volatile fields (the signed CDN URLs, which change on every response, and the viewer relation)
+are not stored: they stay in the video row, under `author_volatile` and `music_volatile`. The
+store is shared by the runs of an output folder, whereas these fields belong to the response they
+were served in (and, with URL compaction, are only valid against the host table of its run).
+
+`denormalize` joins the dimensions back into a normalized payload, as of when it was collected,
+with the volatile fields it was served.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from tiktok.collectors.base import Record, Stage
+
+_LOGGER = logging.getLogger(__name__)
+
+DIMENSIONS_FILE = "dimensions.db"
+_ITEM_LIST_KEYS = ("item_list", "itemList")
+
+DIMENSIONS = {"authors": "author", "music": "music"}
+"""The dimension tables, by the video field they are taken from."""
+
+VOLATILE_FIELDS = {
+    "authors": frozenset({"avatar_larger", "avatar_medium", "avatar_thumb", "relation"}),
+    "music": frozenset({"cover_large", "cover_medium", "cover_thumb", "play_url"}),
+}
+"""The fields which change without the entity changing: signed URLs, viewer relation."""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS authors (
+    id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    first_seen INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS music (
+    id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    first_seen INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    dimension TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    changed_at INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    old TEXT,
+    new TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_id ON changes (dimension, id, changed_at);
+"""
+"""The schema, created if missing. Timestamps are stored as Unix seconds, values as JSON."""
+
+
+def tracked(dimension: str, entity: dict[str, Any]) -> dict[str, Any]:
+    """Return the tracked fields of an entity."""
+    volatile = VOLATILE_FIELDS[dimension]
+    return {field: value for field, value in entity.items() if field not in volatile}
+
+
+class DimensionStore:
+    """
+    The latest version and change log of every author and music track.
+
+    Versions are compared on their tracked fields, cached in memory for the known entities along
+    with their update time: an observation older than the stored version is skipped, so late
+    records (e.g. replayed from a checkpoint) never overwrite a newer version.
+    :param path: the database file
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+
+        # The tracked fields and the update time (Unix seconds) of the latest versions, by
+        # dimension and ID
+        self.latest: dict[str, dict[int, dict[str, Any]]] = {}
+        self.updated_at: dict[str, dict[int, int]] = {}
+        for dimension in DIMENSIONS:
+            rows = self.connection.execute(f"SELECT id, data, updated_at FROM {dimension}")
+            self.latest[dimension], self.updated_at[dimension] = {}, {}
+            for entity_id, data, updated_at in rows:
+                self.latest[dimension][entity_id] = tracked(dimension, json.loads(data))
+                self.updated_at[dimension][entity_id] = updated_at
+
+        # Metrics
+        self.inserted = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.stale = 0
+
+    def close(self) -> None:
+        """Close the database."""
+        self.connection.close()
+
+    def upsert(self, dimension: str, entities: list[dict[str, Any]], observed_at: datetime) -> None:
+        """
+        Insert the new entities and the changed ones, logging their changed fields.
+
+        Entities observed before their stored version are skipped. The cache is only updated once
+        the transaction is committed.
+
+        :param dimension: `authors` or `music`
+        :param entities: the entities, with a numeric `id`; only their tracked fields are stored
+        :param observed_at: when the entities were observed
+        """
+        known = self.latest[dimension]
+        updated_at = self.updated_at[dimension]
+        timestamp = int(observed_at.timestamp())
+        # The versions written by this call, by ID
+        staged: dict[int, dict[str, Any]] = {}
+        inserts: list[tuple[Any, ...]] = []
+        updates: list[tuple[Any, ...]] = []
+        changes: list[tuple[Any, ...]] = []
+        for entity in entities:
+            entity_id = int(entity["id"])
+            if timestamp < updated_at.get(entity_id, timestamp):
+                _LOGGER.debug(
+                    "[Dimensions] Skipped stale entity -> [dimension: %s, id: %s]",
+                    dimension,
+                    entity_id,
+                )
+                self.stale += 1
+                continue
+            fields = tracked(dimension, entity)
+            previous = staged.get(entity_id, known.get(entity_id))
+            if previous == fields:
+                self.unchanged += 1
+                continue
+
+            data = json.dumps(fields)
+            if previous is None:
+                inserts.append((entity_id, data, timestamp, timestamp))
+                self.inserted += 1
+            else:
+                updates.append((data, timestamp, entity_id, timestamp))
+                changes.extend(
+                    (
+                        dimension,
+                        entity_id,
+                        timestamp,
+                        field,
+                        json.dumps(previous.get(field)),
+                        json.dumps(fields.get(field)),
+                    )
+                    for field in sorted(previous.keys() | fields.keys())
+                    if previous.get(field) != fields.get(field)
+                )
+                self.changed += 1
+            staged[entity_id] = fields
+
+        if not staged:
+            return
+        with self.connection:
+            self.connection.execute("BEGIN")
+            # Another writer may have inserted it since the cache was loaded
+            self.connection.executemany(
+                f"INSERT INTO {dimension} (id, data, first_seen, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at "
+                f"WHERE {dimension}.updated_at <= excluded.updated_at",
+                inserts,
+            )
+            self.connection.executemany(
+                f"UPDATE {dimension} SET data = ?, updated_at = ? WHERE id = ? AND updated_at <= ?",
+                updates,
+            )
+            self.connection.executemany(
+                "INSERT INTO changes (dimension, id, changed_at, field, old, new) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                changes,
+            )
+        known.update(staged)
+        updated_at.update(dict.fromkeys(staged, timestamp))
+
+    def get(
+        self, dimension: str, entity_id: int, as_of: datetime | None = None
+    ) -> dict[str, Any] | None:
+        """
+        Return the tracked fields of an entity, None if unknown.
+
+        :param dimension: `authors` or `music`
+        :param entity_id: the entity ID
+        :param as_of: the time of the version to return, by undoing the later changes. None for
+         the latest version.
+        """
+        row = self.connection.execute(
+            f"SELECT data FROM {dimension} WHERE id = ?", (entity_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        entity: dict[str, Any] = json.loads(row[0])
+        if as_of is not None:
+            for field, old in self.connection.execute(
+                "SELECT field, old FROM changes WHERE dimension = ? AND id = ? AND changed_at > ? "
+                "ORDER BY changed_at DESC, rowid DESC",
+                (dimension, entity_id, int(as_of.timestamp())),
+            ):
+                entity[field] = json.loads(old)
+        return entity
+
+    def changes(self, dimension: str, entity_id: int) -> list[dict[str, Any]]:
+        """Return the field changes of an entity, oldest first."""
+        rows = self.connection.execute(
+            "SELECT changed_at, field, old, new FROM changes WHERE dimension = ? AND id = ? "
+            "ORDER BY changed_at, rowid",
+            (dimension, entity_id),
+        )
+        return [
+            {
+                "changed_at": datetime.fromtimestamp(changed_at, UTC),
+                "field": field,
+                "old": json.loads(old),
+                "new": json.loads(new),
+            }
+            for changed_at, field, old, new in rows
+        ]
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the upsert metrics."""
+        return {
+            "dimensions_inserted": self.inserted,
+            "dimensions_changed": self.changed,
+            "dimensions_unchanged": self.unchanged,
+            "dimensions_stale": self.stale,
+        }
+
+
+def observed_at(payload: dict[str, Any]) -> datetime:
+    """Return when a response was served, from its `extra.now` (ms), else now."""
+    now = (payload.get("extra") or {}).get("now")
+    return datetime.fromtimestamp(now / 1000, UTC) if now else datetime.now(UTC)
+
+
+class NormalizeStage(Stage):
+    """
+    A pipeline stage moving the authors and music of the videos to a `DimensionStore`.
+
+    Their volatile fields stay in the videos, under `<field>_volatile`.
+    """
+
+    def __init__(self, path: Path) -> None:
+        super().__init__("normalize", self.normalize)
+        self.store = DimensionStore(path)
+        _LOGGER.info(
+            "Loaded dimensions -> [path: %s, authors: %s, music: %s]",
+            path,
+            len(self.store.latest["authors"]),
+            len(self.store.latest["music"]),
+        )
+
+    async def normalize(self, record: Record) -> list[Record]:
+        """Replace the embedded authors and music of `record` by their IDs."""
+        key = next((key for key in _ITEM_LIST_KEYS if key in record.payload), None)
+        if key is None:
+            return [record]
+
+        entities: dict[str, list[dict[str, Any]]] = {dimension: [] for dimension in DIMENSIONS}
+        items = []
+        for item in record.payload[key] or []:
+            item = dict(item)
+            for dimension, field in DIMENSIONS.items():
+                entity = item.get(field)
+                if isinstance(entity, dict) and str(entity.get("id") or "").isdigit():
+                    entities[dimension].append(entity)
+                    item[f"{field}_id"] = entity["id"]
+                    volatile = {
+                        name: value
+                        for name, value in entity.items()
+                        if name in VOLATILE_FIELDS[dimension]
+                    }
+                    if volatile:
+                        item[f"{field}_volatile"] = volatile
+                    del item[field]
+            items.append(item)
+
+        when = observed_at(record.payload)
+        for dimension, batch in entities.items():
+            if batch:
+                await asyncio.to_thread(self.store.upsert, dimension, batch, when)
+        return [record._replace(payload={**record.payload, key: items})]
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the upsert metrics."""
+        return self.store.metrics()
+
+    async def close(self) -> None:
+        """Close the store."""
+        self.store.close()
+
+
+def denormalize(payload: dict[str, Any], store: DimensionStore) -> dict[str, Any]:
+    """
+    Join the authors and music back into a normalized response, as of when it was served.
+
+    The tracked fields come from `store`, the volatile ones from the videos themselves.
+    """
+    key = next((key for key in _ITEM_LIST_KEYS if key in payload), None)
+    if key is None:
+        return payload
+
+    when = observed_at(payload)
+    items = []
+    for item in payload[key] or []:
+        item = dict(item)
+        for dimension, field in DIMENSIONS.items():
+            entity_id = item.pop(f"{field}_id", None)
+            volatile = item.pop(f"{field}_volatile", None) or {}
+            if entity_id is not None and field not in item:
+                entity = store.get(dimension, int(entity_id), as_of=when)
+                item[field] = {**entity, **volatile} if entity is not None else None
+        items.append(item)
+    return {**payload, key: items}
@@ -0,0 +1,242 @@
+"""
+Live collector metrics.
+
+Collectors keep cheap in-process meters (`Meter`, `LatencyWindow`) updated on the hot path, and
+expose a snapshot with `Collector.metrics()`. A `MetricsRegistry` gathers the snapshots of the
+registered collectors and renders them as JSON or in the Prometheus text format, e.g. for
+`tiktok.collectors.server`.
+"""
+
+import math
+import time
+from array import array
+from collections import deque
+from typing import Any, Iterable, Protocol
+
+LATENCY_QUANTILES = (0.5, 0.95, 0.99)
+"""The latency quantiles reported by `LatencyWindow.summary`."""
+
+
+class Meter:
+    """An event counter with its rate over a sliding window, kept in one-second buckets."""
+
+    def __init__(self, window: int = 60) -> None:
+        self.window = window
+        self.total = 0
+        self._started_at = time.monotonic()
+        # [second, count] per second with events
+        self._buckets: deque[list[int]] = deque()
+
+    def mark(self, count: int = 1) -> None:
+        """Record `count` events."""
+        self.total += count
+        second = int(time.monotonic())
+        if self._buckets and self._buckets[-1][0] == second:
+            self._buckets[-1][1] += count
+        else:
+            self._buckets.append([second, count])
+            self._expire(second)
+
+    def rate(self) -> float:
+        """The events per second over the window, or since the start if more recent."""
+        now = time.monotonic()
+        self._expire(int(now))
+        elapsed = min(now - self._started_at, self.window)
+        return sum(count for _, count in self._buckets) / max(elapsed, 1)
+
+    def _expire(self, second: int) -> None:
+        """Drop the buckets out of the window."""
+        while self._buckets and self._buckets[0][0] <= second - self.window:
+            self._buckets.popleft()
+
+
+class LatencyWindow:
+    """The latencies of the last `size` operations, for quantiles, with overall totals."""
+
+    def __init__(self, size: int = 1024) -> None:
+        self.size = size
+        self.count = 0
+        self.sum = 0.0
+        self._samples = array("d")
+
+    def record(self, seconds: float) -> None:
+        """Record the latency of an operation."""
+        if len(self._samples) < self.size:
+            self._samples.append(seconds)
+        else:
+            self._samples[self.count % self.size] = seconds
+        self.count += 1
+        self.sum += seconds
+
+    @staticmethod
+    def summary(windows: Iterable["LatencyWindow"]) -> dict[str, float]:
+        """Return the count, sum and quantiles of the combined windows."""
+        windows = list(windows)
+        samples = sorted(sample for window in windows for sample in window._samples)
+        result = {
+            "count": sum(window.count for window in windows),
+            "sum": sum(window.sum for window in windows),
+        }
+        for quantile in LATENCY_QUANTILES:
+            # Nearest-rank quantile
+            rank = max(math.ceil(quantile * len(samples)) - 1, 0)
+            result[f"p{round(quantile * 100)}"] = samples[rank] if samples else 0.0
+        return result
+
+
+class MetricsSource(Protocol):
+    """Anything exposing a metrics snapshot, e.g. a `Collector`."""
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the current metrics."""
+        ...
+
+
+class MetricsRegistry:
+    """The collectors whose metrics are served, by name."""
+
+    def __init__(self, namespace: str = "tiktok_collector") -> None:
+        self.namespace = namespace
+        self.sources: dict[str, MetricsSource] = {}
+
+    def register(self, name: str, source: MetricsSource) -> None:
+        """Serve the metrics of `source` under `name`."""
+        if name in self.sources:
+            raise ValueError(f"Metrics source '{name}' already registered")
+        self.sources[name] = source
+
+    def unregister(self, name: str) -> None:
+        """Stop serving the metrics of `name`."""
+        self.sources.pop(name, None)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Return the metrics of every registered collector."""
+        return {name: source.metrics() for name, source in self.sources.items()}
+
+    def prometheus(self) -> str:
+        """Render the collector metrics in the Prometheus text exposition format."""
+        families: dict[str, tuple[str, str, list[str]]] = {}
+
+        def sample(
+            name: str, kind: str, description: str, labels: dict[str, Any], value: Any
+        ) -> None:
+            if value is None:
+                return
+            family = families.setdefault(name, (kind, description, []))
+            label_str = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+            family[2].append(f"{self.namespace}_{name}{{{label_str}}} {float(value)!r}")
+
+        def latency(
+            name: str, description: str, labels: dict[str, Any], summary: dict[str, Any]
+        ) -> None:
+            for quantile in LATENCY_QUANTILES:
+                value = summary[f"p{round(quantile * 100)}"]
+                sample(name, "summary", description, {**labels, "quantile": quantile}, value)
+            sample(f"{name}_count", "untyped", "", labels, summary["count"])
+            sample(f"{name}_sum", "untyped", "", labels, summary["sum"])
+
+        for collector, metrics in self.snapshot().items():
+            labels = {"collector": collector}
+            sample(
+                "up",
+                "gauge",
+                "Whether the collector is running",
+                labels,
+                metrics["state"] == "running",
+            )
+            sample("cycle", "gauge", "The current cycle", labels, metrics["cycle"])
+            sample("items_total", "counter", "Records written", labels, metrics["items"])
+            sample(
+                "items_per_second",
+                "gauge",
+                "Records per second",
+                labels,
+                metrics["items_per_second"],
+            )
+            sample("requests_total", "counter", "Client requests", labels, metrics["requests"])
+            sample(
+                "requests_per_second",
+                "gauge",
+                "Client requests per second",
+                labels,
+                metrics["requests_per_second"],
+            )
+            sample(
+                "duplicate_ratio",
+                "gauge",
+                "Ratio of duplicate videos",
+                labels,
+                metrics["duplicate_ratio"],
+            )
+            latency(
+                "fetch_latency_seconds", "Client request latency", labels, metrics["fetch_latency"]
+            )
+
+            for error, error_metrics in metrics["errors"].items():
+                error_labels = {**labels, "error": error}
+                sample(
+                    "errors_total",
+                    "counter",
+                    "Errors by class",
+                    error_labels,
+                    error_metrics["total"],
+                )
+                sample(
+                    "errors_per_second",
+                    "gauge",
+                    "Errors per second by class",
+                    error_labels,
+                    error_metrics["per_second"],
+                )
+
+            for queue, depth in metrics["queues"].items():
+                sample(
+                    "queue_depth",
+                    "gauge",
+                    "Records waiting in a pipeline queue",
+                    {**labels, "queue": queue},
+                    depth,
+                )
+
+            for stream, stream_metrics in metrics["streams"].items():
+                stream_labels = {**labels, "stream": stream}
+                sample(
+                    "stream_items_total",
+                    "counter",
+                    "Records committed to the sinks",
+                    stream_labels,
+                    stream_metrics["items_written"],
+                )
+                sample(
+                    "stream_bytes_total",
+                    "counter",
+                    "Bytes written to the sinks",
+                    stream_labels,
+                    stream_metrics["bytes_written"],
+                )
+                sample(
+                    "stream_queue_depth",
+                    "gauge",
+                    "Records waiting to be written",
+                    stream_labels,
+                    stream_metrics["queue_depth"],
+                )
+                latency(
+                    "write_latency_seconds",
+                    "Sink commit latency",
+                    stream_labels,
+                    stream_metrics["write_latency"],
+                )
+
+        lines = []
+        for name, (kind, description, samples) in families.items():
+            if kind != "untyped":
+                lines.append(f"# HELP {self.namespace}_{name} {description}")
+                lines.append(f"# TYPE {self.namespace}_{name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
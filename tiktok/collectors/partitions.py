@@ -0,0 +1,224 @@
+"""
+Time-partitioned NDJSON output.
+
+`PartitionedSink` routes every write to the partition of its collection time (UTC), one
+`NdjsonSink` folder per hour or day:
+
+    partitions/dt=2025-01-11/hr=22/manifest.json
+    partitions/dt=2025-01-11/hr=22/trending-00000.ndjson
+
+Besides the usual file list, each partition manifest records per file the collection time range,
+the item `create_time` range and the item ID range. `prune` selects the files that may match a
+query from the partition names and manifests alone, without opening any data file, and
+`iter_partitions` reads them.
+"""
+
+import logging
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterator, Sequence
+
+import orjson
+
+from tiktok.collectors.sinks import (
+    DEFAULT_MAX_FILE_BYTES,
+    MANIFEST_FILE,
+    NdjsonSink,
+    SinkFile,
+    SinkManifest,
+    iter_lines,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+_ITEM_LIST_KEYS = ("item_list", "itemList")
+
+
+def partition_name(written_at: datetime, granularity: str = "hour") -> str:
+    """Return the relative folder of the partition of `written_at`."""
+    written_at = written_at.astimezone(UTC)
+    if granularity == "day":
+        return f"dt={written_at:%Y-%m-%d}"
+    return f"dt={written_at:%Y-%m-%d}/hr={written_at:%H}"
+
+
+def partition_range(folder: Path, root: Path) -> tuple[datetime, datetime]:
+    """Return the `[start, end)` collection time range of a partition folder under `root`."""
+    parts = dict(part.split("=", 1) for part in folder.relative_to(root).parts)
+    start = datetime.strptime(parts["dt"], "%Y-%m-%d").replace(tzinfo=UTC)
+    if "hr" in parts:
+        start += timedelta(hours=int(parts["hr"]))
+        return start, start + GRANULARITIES["hour"]
+    return start, start + GRANULARITIES["day"]
+
+
+def item_ranges(payloads: Sequence[dict[str, Any]]) -> tuple[list[int], list[int]]:
+    """Return the item IDs and `create_time`s of trending responses, videos or comments."""
+    ids, create_times = [], []
+    for payload in payloads:
+        items = next((payload[key] for key in _ITEM_LIST_KEYS if key in payload), None)
+        for item in [payload] if items is None else items:
+            item_id = item.get("id") or item.get("cid")
+            if isinstance(item_id, (int, str)) and str(item_id).isdigit():
+                ids.append(int(item_id))
+            create_time = item.get("create_time") or item.get("createTime")
+            if isinstance(create_time, int):
+                create_times.append(create_time)
+    return ids, create_times
+
+
+def _extend(low: int | None, high: int | None, values: list[int]) -> tuple[int | None, int | None]:
+    """Extend a `[low, high]` range to `values`."""
+    if not values:
+        return low, high
+    return (
+        min(values) if low is None else min(low, *values),
+        max(values) if high is None else max(high, *values),
+    )
+
+
+class PartitionedSink:
+    """
+    A sink writing each payload to the NDJSON partition of its collection time.
+
+    Partitions are append-only: a later run writing to the same hour adds files to its manifest.
+    A partition is closed (its last file rotated) at the first flush after its period is over.
+
+    :param output_path: the root folder of the partitions
+    :param name: the stream name, used as file prefix
+    :param granularity: `hour` or `day`
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        name: str = "trending",
+        granularity: str = "hour",
+        max_file_bytes: int | None = DEFAULT_MAX_FILE_BYTES,
+        max_file_age: float | None = None,
+    ) -> None:
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity '{granularity}'")
+        self.output_path = output_path
+        self.name = name
+        self.granularity = granularity
+        self.max_file_bytes = max_file_bytes
+        self.max_file_age = max_file_age
+
+        # The open partitions, by relative folder
+        self.partitions: dict[str, NdjsonSink] = {}
+
+    async def write(self, payloads: Sequence[dict[str, Any]], now: datetime | None = None) -> None:
+        """Append payloads to the current partition, indexing their ranges."""
+        if not payloads:
+            return
+        now = now or datetime.now(UTC)
+        sink = self._partition(partition_name(now, self.granularity))
+        await sink.write(payloads)
+
+        current = sink.current
+        if current is None:
+            return
+        ids, create_times = item_ranges(payloads)
+        current.first_written_at = current.first_written_at or now
+        current.last_written_at = now
+        current.min_id, current.max_id = _extend(current.min_id, current.max_id, ids)
+        current.min_create_time, current.max_create_time = _extend(
+            current.min_create_time, current.max_create_time, create_times
+        )
+
+    async def flush(self, now: datetime | None = None) -> None:
+        """Flush the open partitions, closing the ones whose period is over."""
+        active = partition_name(now or datetime.now(UTC), self.granularity)
+        for name, sink in list(self.partitions.items()):
+            await sink.flush()
+            if name != active:
+                await sink.close()
+                del self.partitions[name]
+                _LOGGER.info("Closed partition -> [partition: %s]", name)
+
+    async def close(self) -> None:
+        """Close every open partition."""
+        for sink in self.partitions.values():
+            await sink.close()
+        self.partitions.clear()
+
+    def _partition(self, name: str) -> NdjsonSink:
+        """Return the sink of a partition, opening it if needed."""
+        sink = self.partitions.get(name)
+        if sink is None:
+            sink = NdjsonSink(
+                self.output_path / name, self.name, self.max_file_bytes, self.max_file_age
+            )
+            # Drop whatever a crashed run wrote after its last flush
+            sink.restore(sink.manifest)
+            self.partitions[name] = sink
+        return sink
+
+
+def prune(
+    output_path: Path,
+    collected_from: datetime | None = None,
+    collected_to: datetime | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    video_id: int | None = None,
+) -> list[tuple[Path, SinkFile]]:
+    """
+    Select the partition files which may hold items matching all the given filters.
+
+    Only partition names and manifests are read.
+    :param output_path: the root folder of the partitions
+    :param collected_from: the start of the collection time range (inclusive, aware)
+    :param collected_to: the end of the collection time range (exclusive, aware)
+    :param created_from: the start of the item `create_time` range (inclusive, aware)
+    :param created_to: the end of the item `create_time` range (exclusive, aware)
+    :param video_id: an item ID
+    :return: the (partition folder, file entry) pairs, oldest first
+    """
+    collected_from = collected_from or datetime.min.replace(tzinfo=UTC)
+    collected_to = collected_to or datetime.max.replace(tzinfo=UTC)
+    created_low = int(created_from.timestamp()) if created_from else None
+    created_high = int(created_to.timestamp()) if created_to else None
+
+    selected = []
+    for manifest_file in sorted(output_path.glob(f"dt=*/**/{MANIFEST_FILE}")):
+        folder = manifest_file.parent
+        start, end = partition_range(folder, output_path)
+        if end <= collected_from or start >= collected_to:
+            continue
+
+        manifest = SinkManifest.model_validate_json(manifest_file.read_bytes())
+        for sink_file in manifest.files:
+            if sink_file.items == 0:
+                continue
+            if sink_file.last_written_at is not None and sink_file.first_written_at is not None:
+                if (
+                    sink_file.last_written_at < collected_from
+                    or sink_file.first_written_at >= collected_to
+                ):
+                    continue
+            if sink_file.max_create_time is not None and sink_file.min_create_time is not None:
+                if (created_low is not None and sink_file.max_create_time < created_low) or (
+                    created_high is not None and sink_file.min_create_time >= created_high
+                ):
+                    continue
+            if video_id is not None and sink_file.min_id is not None:
+                if not sink_file.min_id <= video_id <= (sink_file.max_id or video_id):
+                    continue
+            selected.append((folder, sink_file))
+    return selected
+
+
+def iter_partitions(output_path: Path, **filters: Any) -> Iterator[dict[str, Any]]:
+    """
+    Yield the payloads of the partition files selected by `prune`.
+
+    Files are pruned as a whole: the payloads of a selected file are not filtered.
+    :param output_path: the root folder of the partitions
+    :param filters: the `prune` filters
+    """
+    for folder, sink_file in prune(output_path, **filters):
+        for line in iter_lines(folder / sink_file.file, sink_file.bytes):
+            yield orjson.loads(line)
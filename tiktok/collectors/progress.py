@@ -0,0 +1,142 @@
+"""
+Resumable cursor crawling.
+
+Paged collectors (comments of a video, results of a keyword...) emit one record per page, tagged
+with the crawled key and the cursor of the next page. `CheckpointSink` splits the page contents
+into their output streams and records the cursor of every key, persisting it only after the
+contents were flushed: a restarted crawl continues each key where it stopped, without skipping a
+page whose contents were not durably written. The manifests of its `NdjsonSink`s are saved along
+with the cursors, and `CheckpointSink.restore` rolls the files back to them before a restarted
+crawl writes the pages after the cursors again.
+"""
+
+import os
+from pathlib import Path
+from typing import Any, Mapping, Sequence
+
+from pydantic import BaseModel, Field
+
+from tiktok.collectors.sinks import NdjsonSink, Sink, SinkManifest
+
+PROGRESS_FILE = "progress.json"
+
+
+class CursorState(BaseModel):
+    """The crawling progress of a key."""
+
+    cursor: int = 0
+    """The cursor of the next page to list."""
+
+    pages: int = 0
+    """Number of pages collected so far."""
+
+    items: int = 0
+    """Number of items collected so far, across all streams."""
+
+    done: bool = False
+    """Whether all the pages were collected."""
+
+    context: dict[str, str] = Field(default_factory=dict)
+    """Endpoint-specific state needed to request the next page (e.g. a search ID)."""
+
+
+class CursorProgress(BaseModel):
+    """The crawling progress of all the keys."""
+
+    keys: dict[str, CursorState] = Field(default_factory=dict)
+
+    manifests: dict[str, SinkManifest] = Field(default_factory=dict)
+    """The manifests of the `NdjsonSink` streams, as of the cursors."""
+
+    @classmethod
+    def load(cls, progress_file: Path) -> "CursorProgress":
+        """Load the progress written by a `CheckpointSink`, or an empty one."""
+        if progress_file.exists():
+            return cls.model_validate_json(progress_file.read_bytes())
+        return cls()
+
+
+def page_payload(
+    key: str,
+    cursor: int,
+    has_more: bool,
+    streams: Mapping[str, list[dict[str, Any]]],
+    context: Mapping[str, str] | None = None,
+) -> dict[str, Any]:
+    """
+    Build the payload of a crawled page, as written to a `CheckpointSink`.
+
+    :param key: the crawled key
+    :param cursor: the cursor of the next page
+    :param has_more: whether there is a next page
+    :param streams: the page contents, per output stream
+    :param context: endpoint-specific state needed to request the next page
+    """
+    return {
+        "key": key,
+        "cursor": cursor,
+        "has_more": has_more,
+        "streams": streams,
+        "context": dict(context or {}),
+    }
+
+
+class CheckpointSink:
+    """A sink splitting crawled pages into per-stream sinks, and checkpointing their cursors."""
+
+    def __init__(
+        self, sinks: Mapping[str, Sink], progress: CursorProgress, progress_file: Path
+    ) -> None:
+        self.sinks = sinks
+        self.progress = progress
+        self.progress_file = progress_file
+
+    @property
+    def bytes_written(self) -> int:
+        """The bytes written by the per-stream sinks."""
+        return sum(getattr(sink, "bytes_written", 0) for sink in self.sinks.values())
+
+    async def write(self, payloads: Sequence[dict[str, Any]]) -> None:
+        """Write the contents of the pages, and advance the progress of their keys."""
+        for stream, sink in self.sinks.items():
+            await sink.write(
+                [item for page in payloads for item in page["streams"].get(stream, [])]
+            )
+
+        for page in payloads:
+            state = self.progress.keys.setdefault(page["key"], CursorState())
+            state.cursor = page["cursor"]
+            state.pages += 1
+            state.items += sum(len(items) for items in page["streams"].values())
+            state.done = not page["has_more"]
+            state.context.update(page["context"])
+
+    def restore(self) -> None:
+        """
+        Roll the `NdjsonSink` streams back to the manifests saved with the progress.
+
+        Lines written after the last progress save would be written again by the resumed crawl,
+        and may end with a torn line. Streams without a saved manifest (e.g. a progress file of
+        an older version) are rolled back to their own manifest, i.e. their last flush.
+        """
+        for stream, sink in self.sinks.items():
+            if isinstance(sink, NdjsonSink):
+                sink.restore(self.progress.manifests.get(stream, sink.manifest))
+
+    async def flush(self) -> None:
+        """Flush the contents, then atomically persist the progress."""
+        for stream, sink in self.sinks.items():
+            await sink.flush()
+            if isinstance(sink, NdjsonSink):
+                self.progress.manifests[stream] = sink.manifest.model_copy(deep=True)
+
+        self.progress_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.progress_file.with_suffix(".tmp")
+        tmp_file.write_text(self.progress.model_dump_json())
+        os.replace(tmp_file, self.progress_file)
+
+    async def close(self) -> None:
+        """Persist the progress and close the per-stream sinks."""
+        await self.flush()
+        for sink in self.sinks.values():
+            await sink.close()
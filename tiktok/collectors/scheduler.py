@@ -0,0 +1,196 @@
+"""
+Weighted fair sharing of request budgets between collectors.
+
+A `Scheduler` runs several collector jobs in one event loop. Every job gets a `JobBudget`, which
+it passes to its collector as `budget`; each `acquire` joins the job queue, and a dispatcher
+grants requests while the global and per-endpoint token buckets allow it.
+
+Grants follow start-time fair queueing: every job has a virtual time advancing by
+`1 / weight` per granted request, and the waiting job with the lowest virtual time is served
+first. Backlogged jobs thus share the budget in proportion to their weights, a job with nothing
+to send leaves its share to the others, and weights may be changed at any time.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Mapping
+
+from tiktok.collectors.budget import RequestBudget
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class JobBudget:
+    """The budget of a scheduled job, to hand to its collector."""
+
+    def __init__(self, scheduler: "Scheduler", name: str, endpoint: str | None, weight: float):
+        self.scheduler = scheduler
+        self.name = name
+        self.endpoint = endpoint
+        self.weight = weight
+
+        self.virtual_time = 0.0
+        self.waiters: deque[asyncio.Future[None]] = deque()
+
+        # Metrics
+        self.requests = 0
+        self.wait_seconds = 0.0
+
+    async def acquire(self) -> None:
+        """Wait until the scheduler grants a request to the job."""
+        loop = asyncio.get_running_loop()
+        waiter: asyncio.Future[None] = loop.create_future()
+        if not self.waiters:
+            # A job coming back from idle does not get credit for the time it sent nothing
+            self.virtual_time = max(self.virtual_time, self.scheduler.virtual_time)
+        self.waiters.append(waiter)
+        self.scheduler.wake()
+
+        start = loop.time()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+            raise
+        self.wait_seconds += loop.time() - start
+
+
+class Scheduler:
+    """
+    A weighted fair scheduler of the requests of several collectors.
+
+    :param requests_per_minute: the global request budget
+    :param endpoint_limits: the request budget (per minute) of some endpoints
+    :param burst: how many requests may be granted at once after an idle period
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        endpoint_limits: Mapping[str, float] | None = None,
+        burst: int = 1,
+    ) -> None:
+        self.budget = RequestBudget(requests_per_minute / 60, burst)
+        self.endpoint_budgets = {
+            endpoint: RequestBudget(limit / 60, burst)
+            for endpoint, limit in (endpoint_limits or {}).items()
+        }
+        self.jobs: dict[str, JobBudget] = {}
+        self.virtual_time = 0.0
+
+        self._wake = asyncio.Event()
+        self._dispatcher: asyncio.Task[None] | None = None
+
+    def job(self, name: str, endpoint: str | None = None, weight: float = 1) -> JobBudget:
+        """
+        Register a job, returning the budget to hand to its collector.
+
+        :param name: the job name
+        :param endpoint: the endpoint the job calls, subject to its limit if any
+        :param weight: the share of the budget of the job, relative to the other jobs
+        """
+        if name in self.jobs:
+            raise ValueError(f"Job '{name}' already exists")
+        self.jobs[name] = JobBudget(self, name, endpoint, weight)
+        return self.jobs[name]
+
+    def set_weight(self, name: str, weight: float) -> None:
+        """Change the share of a job, effective from its next request."""
+        self.jobs[name].weight = weight
+
+    def wake(self) -> None:
+        """Signal the dispatcher that a job is waiting."""
+        self._wake.set()
+
+    async def run(self, *jobs: Awaitable[Any]) -> list[Any]:
+        """
+        Run the jobs (e.g. `collector.run(...)` calls) concurrently, dispatching their requests.
+
+        If a job fails, the others are cancelled (they would otherwise wait forever on their budget
+        once the dispatcher stops) and the error is raised.
+
+        :return: the results of the jobs
+        """
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        tasks = [asyncio.ensure_future(job) for job in jobs]
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+            self.log_metrics()
+
+    async def _dispatch(self) -> None:
+        """Grant the waiting requests in fair order, as the budgets allow."""
+        while True:
+            waiting = [job for job in self.jobs.values() if job.waiters]
+            if not waiting:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+
+            # Jobs whose endpoint can take a request now
+            ready = [
+                job
+                for job in waiting
+                if job.endpoint not in self.endpoint_budgets
+                or self.endpoint_budgets[job.endpoint].wait_time() == 0
+            ]
+            delay = self.budget.wait_time()
+            if not ready or delay > 0:
+                if not ready:
+                    delay = max(delay, min(self._endpoint_wait(job) for job in waiting))
+                self._wake.clear()
+                try:
+                    # A new waiter may be ready earlier, e.g. on another endpoint
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except TimeoutError:
+                    pass
+                continue
+
+            job = min(ready, key=lambda job: job.virtual_time)
+            waiter = job.waiters.popleft()
+            if waiter.done():
+                continue
+
+            self.budget.try_acquire()
+            if job.endpoint in self.endpoint_budgets:
+                self.endpoint_budgets[job.endpoint].try_acquire()
+            self.virtual_time = job.virtual_time
+            job.virtual_time += 1 / job.weight
+            job.requests += 1
+            waiter.set_result(None)
+
+    def _endpoint_wait(self, job: JobBudget) -> float:
+        """The time until the endpoint of `job` can take a request."""
+        budget = self.endpoint_budgets.get(job.endpoint or "")
+        return budget.wait_time() if budget is not None else 0
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the per-job metrics."""
+        return {
+            name: {
+                "weight": job.weight,
+                "requests": job.requests,
+                "waiting": len(job.waiters),
+                "wait_seconds": job.wait_seconds,
+            }
+            for name, job in self.jobs.items()
+        }
+
+    def log_metrics(self) -> None:
+        """Log a one-line summary per job."""
+        for name, job in self.jobs.items():
+            _LOGGER.info(
+                "Scheduler -> [job: %s, weight: %s, requests: %s, wait: %.2f]",
+                name,
+                job.weight,
+                job.requests,
+                job.wait_seconds,
+            )
@@ -0,0 +1,135 @@
+import logging
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Sequence
+
+from tiktok.client.tiktok_client import TikTokClient
+from tiktok.collectors.base import Collector, CollectorState, Record, Stage
+from tiktok.collectors.budget import Budget
+from tiktok.collectors.progress import (
+    PROGRESS_FILE,
+    CheckpointSink,
+    CursorProgress,
+    page_payload,
+)
+from tiktok.collectors.sinks import DEFAULT_MAX_FILE_BYTES, NdjsonSink
+from tiktok.collectors.trending import DEFAULT_OUTPUT_FOLDER
+from tiktok.models.params.base import TikTokParams
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SearchCollector(Collector):
+    """
+    A collector for the results of TikTok keyword searches.
+
+    Up to `concurrency` keywords are searched at once, following the result cursors up to
+    `max_pages` pages per keyword. Videos and users are written to the `search/items` and
+    `search/users` folders of the output folder, and the cursor of every keyword is checkpointed
+    so a new run continues each search instead of fetching its first pages again.
+    """
+
+    def __init__(
+        self,
+        client: TikTokClient,
+        params: TikTokParams,
+        output_folder: Path = DEFAULT_OUTPUT_FOLDER,
+        concurrency: int = 2,
+        budget: Budget | None = None,
+        max_pages: int | None = 5,
+        max_file_bytes: int | None = DEFAULT_MAX_FILE_BYTES,
+        flush_interval: float = 1.0,
+        stages: Sequence[Stage] = (),
+    ) -> None:
+        super().__init__(stages, flush_interval=flush_interval)
+
+        # Input params
+        self.client = client
+        self.params = params.model_copy(deep=True)
+        self.output_path = output_folder / "search"
+        self.concurrency = concurrency
+        self.budget = budget
+        self.max_pages = max_pages
+        self.max_file_bytes = max_file_bytes
+
+        # Progress of the searches, resumed from the last run if any
+        self.progress = CursorProgress.load(self.output_path / PROGRESS_FILE)
+
+    async def run(self, keywords: Iterable[str], skip_exceptions: bool = False) -> str:
+        """
+        Search the given keywords.
+
+        :param keywords: the keywords to search
+        :param skip_exceptions: whether to skip failing keywords and continue running
+        :return: the output folder location
+        """
+        _LOGGER.info(
+            "Starting the search collector -> [concurrency: %s, max_pages: %s]",
+            self.concurrency,
+            self.max_pages,
+        )
+
+        sink = CheckpointSink(
+            {
+                stream: NdjsonSink(self.output_path / stream, stream, self.max_file_bytes)
+                for stream in ("items", "users")
+            },
+            self.progress,
+            self.output_path / PROGRESS_FILE,
+        )
+        # Drop the results written after the last progress save, which are searched again
+        sink.restore()
+        await self.pipeline(
+            self.fan_out(keywords, self.crawl_keyword, self.concurrency),
+            {"search": [sink]},
+            skip_exceptions,
+        )
+
+        return self.output_path.as_posix()
+
+    async def crawl_keyword(self, keyword: str) -> AsyncIterator[Record]:
+        """Yield the result pages of a keyword, from where the last run stopped."""
+        state = self.progress.keys.get(keyword)
+        if state is not None and state.done:
+            return
+        cursor = state.cursor if state is not None else 0
+        search_id = state.context.get("search_id") if state is not None else None
+        depth = state.pages if state is not None else 0
+
+        while self.state == CollectorState.RUNNING and (
+            self.max_pages is None or depth < self.max_pages
+        ):
+            if self.budget is not None:
+                await self.budget.acquire()
+
+            response = await self.fetch(
+                self.client.search_keyword(keyword, self.params, cursor or None, search_id)
+            )
+            depth += 1
+            if search_id is None and response.log_pb is not None:
+                search_id = response.log_pb.impr_id
+
+            results = response.data or []
+            items = [result.item.model_dump(mode="json") for result in results if result.item]
+            users = [
+                user.model_dump(mode="json")
+                for result in results
+                for user in result.user_list or []
+            ]
+            next_cursor = response.cursor if response.cursor is not None else cursor
+            has_more = bool(response.has_more) and bool(results) and next_cursor != cursor
+            yield Record(
+                "search",
+                page_payload(
+                    keyword,
+                    next_cursor,
+                    has_more,
+                    {"items": items, "users": users},
+                    {"search_id": search_id} if search_id else None,
+                ),
+            )
+
+            if not has_more:
+                break
+            cursor = next_cursor
+
+        _LOGGER.info("Searched keyword -> [keyword: %s, pages: %s]", keyword, depth)
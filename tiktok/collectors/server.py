@@ -0,0 +1,55 @@
+"""
+A local HTTP endpoint serving live collector metrics.
+
+    registry = MetricsRegistry()
+    registry.register("trending", collector)
+    async with asyncio.TaskGroup() as group:
+        group.create_task(serve_metrics(registry))
+        group.create_task(collector.run(...))
+
+`GET /metrics` returns the Prometheus text format, `GET /metrics.json` the JSON snapshot.
+"""
+
+import logging
+from typing import Any
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from tiktok.collectors.metrics import MetricsRegistry
+
+_LOGGER = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def create_app(registry: MetricsRegistry) -> FastAPI:
+    """Create the metrics app of `registry`."""
+    app = FastAPI(title="Collector metrics", docs_url=None, redoc_url=None)
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def prometheus_metrics() -> PlainTextResponse:
+        return PlainTextResponse(registry.prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    @app.get("/metrics.json")
+    async def json_metrics() -> dict[str, Any]:
+        return registry.snapshot()
+
+    return app
+
+
+async def serve_metrics(
+    registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464
+) -> None:
+    """
+    Serve the metrics of `registry` until cancelled.
+
+    :param registry: the collectors to serve the metrics of
+    :param host: the interface to listen on, local only by default
+    :param port: the port to listen on
+    """
+    config = uvicorn.Config(create_app(registry), host=host, port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    _LOGGER.info("Serving collector metrics -> [url: http://%s:%s/metrics]", host, port)
+    await server.serve()
@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator, Protocol, Sequence
+
+import aiofiles
+import orjson
+from aiofiles.threadpool.binary import AsyncBufferedIOBase
+from pydantic import BaseModel, Field
+
+_LOGGER = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+DEFAULT_MAX_FILE_BYTES = 256 * 2**20
+
+
+class Sink(Protocol):
+    """A destination for collected payloads."""
+
+    async def write(self, payloads: Sequence[dict[str, Any]]) -> None:
+        """Write a batch of payloads."""
+        ...
+
+    async def flush(self) -> None:
+        """Make the written payloads durable."""
+        ...
+
+    async def close(self) -> None:
+        """Flush and release the sink resources."""
+        ...
+
+
+class SinkFile(BaseModel):
+    """A file written by a `NdjsonSink`."""
+
+    file: str
+    """The file name, relative to the sink folder."""
+
+    items: int = 0
+    """Number of payloads (lines) in the file."""
+
+    bytes: int = 0
+    """Size of the file in bytes."""
+
+    created_at: datetime = Field(default_factory=datetime.now)
+    """When the file was opened."""
+
+    closed_at: datetime | None = None
+    """When the file was rotated or the sink closed, None while it is being written."""
+
+    # Ranges of the file contents, indexed by `PartitionedSink` for pruning
+    first_written_at: datetime | None = None
+    """When the first payload was written (UTC)."""
+
+    last_written_at: datetime | None = None
+    """When the last payload was written (UTC)."""
+
+    min_create_time: int | None = None
+    """The earliest item `create_time` (Unix seconds)."""
+
+    max_create_time: int | None = None
+    """The latest item `create_time` (Unix seconds)."""
+
+    min_id: int | None = None
+    """The lowest item ID."""
+
+    max_id: int | None = None
+    """The highest item ID."""
+
+
+class SinkManifest(BaseModel):
+    """The manifest of the files written by a `NdjsonSink`."""
+
+    name: str
+    """The stream name, used as file prefix."""
+
+    files: list[SinkFile] = Field(default_factory=list)
+    """The written files, in order."""
+
+
+class NdjsonSink:
+    """
+    An append-only newline-delimited JSON sink.
+
+    Payloads are only ever appended, so each write costs O(payload) regardless of how much has
+    been collected. Files are rotated by size and/or age and listed in a manifest, rewritten
+    atomically on every flush and rotation.
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        name: str = "trending",
+        max_file_bytes: int | None = DEFAULT_MAX_FILE_BYTES,
+        max_file_age: float | None = None,
+    ) -> None:
+        self.output_path = output_path
+        self.name = name
+        self.max_file_bytes = max_file_bytes
+        self.max_file_age = max_file_age
+
+        # Resume the manifest of a previous run in the same folder, if any
+        manifest_file = output_path / MANIFEST_FILE
+        self.manifest = (
+            SinkManifest.model_validate_json(manifest_file.read_bytes())
+            if manifest_file.exists()
+            else SinkManifest(name=name)
+        )
+
+        self._file: AsyncBufferedIOBase | None = None
+        self._opened_at = 0.0
+
+        # Metrics
+        self.bytes_written = 0
+
+    @property
+    def current(self) -> SinkFile | None:
+        """The file currently being written, if any."""
+        if self.manifest.files and self.manifest.files[-1].closed_at is None:
+            return self.manifest.files[-1]
+        return None
+
+    async def write(self, payloads: Sequence[dict[str, Any]]) -> None:
+        """Append a batch of payloads, one JSON document per line."""
+        if not payloads:
+            return
+
+        data = b"".join(orjson.dumps(payload) + b"\n" for payload in payloads)
+        if self._should_rotate(len(data)):
+            await self.rotate()
+
+        current, file = await self._open()
+        await file.write(data)
+        current.items += len(payloads)
+        current.bytes += len(data)
+        self.bytes_written += len(data)
+
+    async def flush(self) -> None:
+        """Flush and fsync the current file, then persist the manifest."""
+        if self._file is not None:
+            await self._file.flush()
+            await asyncio.to_thread(os.fsync, self._file.fileno())
+        await self._write_manifest()
+
+    async def rotate(self) -> None:
+        """Close the current file; the next write opens a new one."""
+        current = self.current
+        if current is None:
+            return
+
+        if self._file is not None:
+            await self.flush()
+            await self._file.close()
+            self._file = None
+
+        current.closed_at = datetime.now()
+        await self._write_manifest()
+        _LOGGER.info("Rotated output file -> [file: %s, items: %s]", current.file, current.items)
+
+    async def close(self) -> None:
+        """Close the sink."""
+        await self.rotate()
+
+    def restore(self, manifest: SinkManifest) -> None:
+        """
+        Roll the sink back to `manifest`, a snapshot taken right after a flush.
+
+        Anything written since (including a torn last line) is dropped: files missing from the
+        snapshot are deleted and the others truncated to their snapshot size.
+        """
+        if self._file is not None:
+            raise RuntimeError("Cannot restore an open sink")
+
+        sizes = {sink_file.file: sink_file.bytes for sink_file in manifest.files}
+        for path in self.output_path.glob(f"{self.name}-*.ndjson"):
+            size = sizes.get(path.name)
+            if size is None:
+                path.unlink()
+            elif path.stat().st_size > size:
+                os.truncate(path, size)
+
+        self.manifest = manifest.model_copy(deep=True)
+        self.output_path.mkdir(parents=True, exist_ok=True)
+        manifest_file = self.output_path / MANIFEST_FILE
+        tmp_file = manifest_file.with_suffix(".tmp")
+        tmp_file.write_text(self.manifest.model_dump_json(indent=2))
+        os.replace(tmp_file, manifest_file)
+        _LOGGER.info("Restored output -> [path: %s, files: %s]", self.output_path, len(sizes))
+
+    def _should_rotate(self, incoming: int) -> bool:
+        """Whether the current file must be rotated before writing `incoming` bytes."""
+        current = self.current
+        if current is None or current.items == 0:
+            return False
+        if self.max_file_bytes is not None and current.bytes + incoming > self.max_file_bytes:
+            return True
+        return (
+            self.max_file_age is not None
+            and self._file is not None
+            and time.monotonic() - self._opened_at > self.max_file_age
+        )
+
+    async def _open(self) -> tuple[SinkFile, AsyncBufferedIOBase]:
+        """Return the current file, opening (and registering) one if needed."""
+        current = self.current
+        if current is None:
+            current = SinkFile(file=f"{self.name}-{len(self.manifest.files):05d}.ndjson")
+            self.manifest.files.append(current)
+
+        if self._file is None:
+            self.output_path.mkdir(parents=True, exist_ok=True)
+            self._file = await aiofiles.open(self.output_path / current.file, "ab")
+            self._opened_at = time.monotonic()
+
+        return current, self._file
+
+    async def _write_manifest(self) -> None:
+        """Atomically replace the manifest file."""
+        self.output_path.mkdir(parents=True, exist_ok=True)
+        manifest_file = self.output_path / MANIFEST_FILE
+        tmp_file = manifest_file.with_suffix(".tmp")
+        async with aiofiles.open(tmp_file, "wb") as f:
+            await f.write(self.manifest.model_dump_json(indent=2).encode())
+        os.replace(tmp_file, manifest_file)
+
+
+def iter_lines(path: Path, size: int) -> Iterator[bytes]:
+    """
+    Yield the non-blank lines of the first `size` bytes of a sink file.
+
+    Lines past the manifest size were not flushed yet, or torn by a crash: they are skipped.
+    """
+    remaining = size
+    with open(path, "rb") as f:
+        for line in f:
+            remaining -= len(line)
+            if remaining < 0:
+                break
+            if line.strip():
+                yield line
+
+
+def iter_ndjson(output_path: Path) -> Iterator[dict[str, Any]]:
+    """Yield the payloads flushed by a `NdjsonSink` in `output_path`, in order."""
+    manifest = SinkManifest.model_validate_json((output_path / MANIFEST_FILE).read_bytes())
+    for sink_file in manifest.files:
+        for line in iter_lines(output_path / sink_file.file, sink_file.bytes):
+            yield orjson.loads(line)
+
+
+def ndjson_to_json_array(output_path: Path, destination: Path) -> int:
+    """
+    Convert the output of a `NdjsonSink` into the legacy JSON array format.
+
+    The conversion streams line by line, so it runs in constant memory. Only the flushed payloads
+    are converted, see `iter_lines`.
+    :param output_path: the folder written by the sink
+    :param destination: the JSON file to write
+    :return: the number of converted payloads
+    """
+    manifest = SinkManifest.model_validate_json((output_path / MANIFEST_FILE).read_bytes())
+    count = 0
+    with open(destination, "wb") as out:
+        out.write(b"[")
+        for sink_file in manifest.files:
+            for line in iter_lines(output_path / sink_file.file, sink_file.bytes):
+                out.write(b",\n" if count else b"\n")
+                out.write(line.strip())
+                count += 1
+        out.write(b"\n]")
+    return count
@@ -0,0 +1,289 @@
+"""
+Engagement time series of tracked videos.
+
+`StatsSchedule` keeps every tracked video in flat arrays (about 130 bytes per video, heap
+included) and a heap of `due time << 24 | slot` integers. After each poll, a video is rescheduled
+after an interval that shrinks with its recent play growth (an exponentially smoothed velocity)
+and grows with its age, so fast-growing videos are sampled more often and old ones fade out.
+`StatsTracker` polls the due videos within a fixed request budget per minute and writes the
+stat deltas of every poll as a time series.
+"""
+
+import asyncio
+import heapq
+import logging
+import math
+import time
+from array import array
+from pathlib import Path
+from typing import Any, AsyncIterator, Sequence
+
+from tiktok.client.tiktok_client import TikTokClient
+from tiktok.collectors.base import Collector, CollectorState, Record, Stage
+from tiktok.collectors.budget import Budget, RequestBudget
+from tiktok.collectors.dedupe import SeenSet
+from tiktok.collectors.sinks import DEFAULT_MAX_FILE_BYTES, NdjsonSink
+from tiktok.collectors.trending import DEFAULT_OUTPUT_FOLDER
+from tiktok.models.apis.common import VideoStats
+from tiktok.models.params.base import TikTokParams
+from tiktok.models.types import AwemeId
+
+_LOGGER = logging.getLogger(__name__)
+
+STAT_FIELDS = ("play_count", "digg_count", "comment_count", "share_count", "collect_count")
+"""The tracked `VideoStats` counters, in storage order."""
+
+_SLOT_BITS = 24
+_SLOT_MASK = (1 << _SLOT_BITS) - 1
+
+
+class StatsSchedule:
+    """
+    A compact, velocity-prioritized polling schedule of tracked videos.
+
+    The polling interval of a video is `base_interval / score`, clamped to
+    `[min_interval, max_interval]`, with `score = (1 + velocity / velocity_scale) * 2 ** (-age /
+    half_life)` and `velocity` the smoothed play growth per hour. Videos older than `max_age` are
+    no longer rescheduled.
+    """
+
+    def __init__(
+        self,
+        base_interval: float = 3600,
+        min_interval: float = 300,
+        max_interval: float = 86400,
+        half_life: float = 86400,
+        velocity_scale: float = 1000,
+        smoothing: float = 0.5,
+        max_age: float = 7 * 86400,
+    ) -> None:
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.half_life = half_life
+        self.velocity_scale = velocity_scale
+        self.smoothing = smoothing
+        self.max_age = max_age
+
+        # One entry per slot
+        self.ids = array("q")
+        self.created_at = array("d")
+        self.polled_at = array("d")
+        self.velocity = array("d")
+        # len(STAT_FIELDS) entries per slot, -1 until the first poll
+        self.counts = array("q")
+
+        self._heap: list[int] = []
+        self._tracked = SeenSet()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def scheduled(self) -> int:
+        """The number of videos still being polled."""
+        return len(self._heap)
+
+    def add(self, video_id: int, created_at: float | None = None, now: float | None = None) -> bool:
+        """
+        Track `video_id`, due immediately.
+
+        :param video_id: the video to track
+        :param created_at: the video creation timestamp, defaults to now
+        :param now: the current timestamp
+        :return: whether the video was not tracked yet
+        """
+        if video_id in self._tracked:
+            return False
+        if len(self.ids) > _SLOT_MASK:
+            raise OverflowError("Too many tracked videos")
+
+        now = time.time() if now is None else now
+        slot = len(self.ids)
+        self._tracked.add(video_id)
+        self.ids.append(video_id)
+        self.created_at.append(created_at or now)
+        self.polled_at.append(0)
+        self.velocity.append(0)
+        self.counts.extend([-1] * len(STAT_FIELDS))
+        self._push(now, slot)
+        return True
+
+    def next_due(self) -> float | None:
+        """The timestamp the next video is due at, None if nothing is scheduled."""
+        return (self._heap[0] >> _SLOT_BITS) / 1000 if self._heap else None
+
+    def pop_due(self, now: float | None = None) -> int | None:
+        """Unschedule and return the slot of the next due video, if any is due."""
+        now = time.time() if now is None else now
+        if not self._heap or (self._heap[0] >> _SLOT_BITS) > now * 1000:
+            return None
+        return heapq.heappop(self._heap) & _SLOT_MASK
+
+    def retry(self, slot: int, now: float | None = None) -> None:
+        """Reschedule a slot whose poll failed."""
+        now = time.time() if now is None else now
+        self._push(now + self.min_interval, slot)
+
+    def update(self, slot: int, counts: Sequence[int], now: float | None = None) -> dict[str, Any]:
+        """
+        Record a poll of the video in `slot` and reschedule it.
+
+        :param slot: the polled slot
+        :param counts: the polled counters, in `STAT_FIELDS` order
+        :param now: the poll timestamp
+        :return: the time series row: the counter deltas since the previous poll
+        """
+        now = time.time() if now is None else now
+        offset = slot * len(STAT_FIELDS)
+        previous = self.counts[offset : offset + len(STAT_FIELDS)]
+        first = previous[0] < 0
+        deltas = [count if first else count - prev for count, prev in zip(counts, previous)]
+        elapsed = 0.0 if first else now - self.polled_at[slot]
+
+        if elapsed > 0:
+            growth = max(deltas[0], 0) / elapsed * 3600
+            self.velocity[slot] = (
+                self.smoothing * growth + (1 - self.smoothing) * self.velocity[slot]
+            )
+        self.counts[offset : offset + len(STAT_FIELDS)] = array("q", counts)
+        self.polled_at[slot] = now
+
+        if now - self.created_at[slot] < self.max_age:
+            self._push(now + self.interval(slot, now), slot)
+
+        return {
+            "id": str(self.ids[slot]),
+            "ts": int(now),
+            "dt": int(elapsed),
+            **{f"d_{field}": delta for field, delta in zip(STAT_FIELDS, deltas)},
+        }
+
+    def interval(self, slot: int, now: float | None = None) -> float:
+        """The polling interval of the video in `slot`."""
+        now = time.time() if now is None else now
+        age = max(now - self.created_at[slot], 0)
+        score = (1 + self.velocity[slot] / self.velocity_scale) * math.pow(2, -age / self.half_life)
+        return min(max(self.base_interval / score, self.min_interval), self.max_interval)
+
+    def _push(self, due: float, slot: int) -> None:
+        """Schedule `slot` at `due`."""
+        heapq.heappush(self._heap, int(due * 1000) << _SLOT_BITS | slot)
+
+
+def stat_counts(stats: VideoStats) -> list[int]:
+    """Return the tracked counters of `stats`, in `STAT_FIELDS` order."""
+    return [(getattr(stats, field, None) or 0) for field in STAT_FIELDS]
+
+
+class StatsTracker(Collector):
+    """
+    A collector re-polling the details of tracked videos into an engagement time series.
+
+    Videos are tracked with `track` (or the `TrackStage` of another collector), then polled as
+    they fall due in their `StatsSchedule`, never exceeding `requests_per_minute`. Rows are
+    appended to the `stats` folder of the output folder.
+    """
+
+    def __init__(
+        self,
+        client: TikTokClient,
+        params: TikTokParams,
+        output_folder: Path = DEFAULT_OUTPUT_FOLDER,
+        requests_per_minute: float = 60,
+        budget: Budget | None = None,
+        schedule: StatsSchedule | None = None,
+        idle_interval: float = 5,
+        max_file_bytes: int | None = DEFAULT_MAX_FILE_BYTES,
+        flush_interval: float = 1.0,
+        stages: Sequence[Stage] = (),
+    ) -> None:
+        super().__init__(stages, flush_interval=flush_interval)
+
+        # Input params
+        self.client = client
+        self.params = params.model_copy(deep=True)
+        self.output_path = output_folder / "stats"
+        # A shared budget, e.g. from a `Scheduler`, replaces `requests_per_minute`
+        self.budget = budget or RequestBudget(requests_per_minute / 60)
+        self.schedule = schedule or StatsSchedule()
+        # Max wait-time (in seconds) between due checks, so new videos are picked up
+        self.idle_interval = idle_interval
+        self.max_file_bytes = max_file_bytes
+
+        # Metrics
+        self.polls = 0
+
+    def track(self, video_id: str, created_at: float | None = None) -> bool:
+        """Track `video_id`, returning whether it was not tracked yet."""
+        try:
+            return self.schedule.add(int(video_id), created_at)
+        except ValueError:
+            _LOGGER.warning("[Stats] Invalid video ID -> [video_id: %s]", video_id)
+            return False
+
+    async def run(self, max_polls: int | None = None, skip_exceptions: bool = True) -> str:
+        """
+        Poll the tracked videos until stopped.
+
+        :param max_polls: how many polls to run. None for indefinitely.
+        :param skip_exceptions: whether to skip failing polls and continue running
+        :return: the output folder location
+        """
+        _LOGGER.info("Starting the stats tracker -> [tracked: %s]", len(self.schedule))
+
+        sink = NdjsonSink(self.output_path, "stats", self.max_file_bytes)
+        await self.pipeline(self.source(max_polls), {"stats": [sink]}, skip_exceptions)
+
+        return self.output_path.as_posix()
+
+    async def source(self, max_polls: int | None = None) -> AsyncIterator[Record]:
+        """Yield a time series row per poll of the due videos."""
+        while self.state == CollectorState.RUNNING and (
+            max_polls is None or self.polls < max_polls
+        ):
+            slot = self.schedule.pop_due()
+            if slot is None:
+                next_due = self.schedule.next_due()
+                wait = self.idle_interval if next_due is None else next_due - time.time()
+                await asyncio.sleep(min(max(wait, 0), self.idle_interval))
+                continue
+
+            await self.budget.acquire()
+            self.polls += 1
+            video_id = AwemeId(str(self.schedule.ids[slot]))
+            try:
+                response = await self.fetch(self.client.get_video_details(video_id, self.params))
+                stats = response.item_info.item_struct.stats
+            except Exception as e:
+                self.record_error(e)
+                self.schedule.retry(slot)
+                continue
+            if stats is None:
+                # Zeros would be recorded as a drop of every counter, then a rebound at next poll
+                _LOGGER.warning("[Stats] Missing stats -> [video_id: %s]", video_id)
+                self.schedule.retry(slot)
+                continue
+
+            yield Record("stats", self.schedule.update(slot, stat_counts(stats)))
+
+
+class TrackStage(Stage):
+    """A pass-through pipeline stage tracking the videos of trending or search records."""
+
+    def __init__(self, tracker: StatsTracker) -> None:
+        super().__init__("track", self.track)
+        self.tracker = tracker
+
+    async def track(self, record: Record) -> list[Record]:
+        """Track the videos of `record`."""
+        payload = record.payload
+        # Trending responses, or search pages
+        items = [
+            *(payload.get("item_list") or payload.get("itemList") or []),
+            *((payload.get("streams") or {}).get("items") or []),
+        ]
+        for item in items:
+            if item.get("id"):
+                self.tracker.track(item["id"], item.get("create_time") or item.get("createTime"))
+        return [record]
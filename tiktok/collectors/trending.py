@@ -1,31 +1,67 @@
-# TODO[FILM]: We can probably abstract out this class based on APIs. Requirements will follow.
-import asyncio
 import json
 import logging
+import os
 from datetime import datetime
-from enum import StrEnum
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Sequence
 
 import aiofiles
+from pydantic import BaseModel, Field, SecretStr
 
 from tiktok.client.tiktok_client import TikTokClient
+from tiktok.collectors.base import Collector, CollectorState, Record, Stage
+from tiktok.collectors.budget import Budget
+from tiktok.collectors.dedupe import SEEN_FILE, DedupeStage
+from tiktok.collectors.dimensions import (
+    DIMENSIONS_FILE,
+    DimensionStore,
+    NormalizeStage,
+    denormalize,
+)
+from tiktok.collectors.partitions import PartitionedSink
+from tiktok.collectors.sinks import (
+    DEFAULT_MAX_FILE_BYTES,
+    MANIFEST_FILE,
+    NdjsonSink,
+    Sink,
+    SinkManifest,
+    iter_ndjson,
+)
+from tiktok.models.apis.trending import TrendingResponse
+from tiktok.models.compaction import HostTable, compact_payload, expand_payload
 from tiktok.models.params.base import TikTokParams
 
 DEFAULT_OUTPUT_FOLDER = Path(__file__).parent.parent.parent / "outputs"
+HOSTS_FILE = "hosts.json"
+CHECKPOINT_FILE = "checkpoint.json"
 _LOGGER = logging.getLogger(__name__)
 
+__all__ = ["CollectorState", "TrendingCheckpoint", "TrendingCollector", "load_output"]
 
-class CollectorState(StrEnum):
-    """The collector state."""
 
-    IDLE = "idle"
-    RUNNING = "running"
-    STOPPED = "stopped"
-    ERROR = "error"
+class TrendingCheckpoint(BaseModel):
+    """The durable state of a `TrendingCollector` run, enough to resume it."""
 
+    output_path: str
+    """The output folder of the run."""
 
-class TrendingCollector:
+    cycle: int
+    """The last cycle whose response was flushed."""
+
+    vv_count_fyp: int
+    """The `vv_count_fyp` param of the next cycle."""
+
+    ms_token: str | None = None
+    """The last msToken rotated by the API."""
+
+    manifest: SinkManifest
+    """The output files as of the last flush, i.e. the offset to resume writing from."""
+
+    updated_at: datetime = Field(default_factory=datetime.now)
+    """When the checkpoint was written."""
+
+
+class TrendingCollector(Collector):
     """A collector for trending videos from TikTok."""
 
     def __init__(
@@ -33,44 +69,86 @@ class TrendingCollector:
         client: TikTokClient,
         starting_params: TikTokParams,
         output_folder: Path = DEFAULT_OUTPUT_FOLDER,
+        compact_urls: bool = False,
+        max_file_bytes: int | None = DEFAULT_MAX_FILE_BYTES,
+        max_file_age: float | None = None,
+        flush_interval: float = 1.0,
+        stages: Sequence[Stage] = (),
+        dedupe: bool = False,
+        checkpoint_every: int | None = None,
+        budget: Budget | None = None,
+        sinks: Sequence[Sink] = (),
+        partition_by: str | None = None,
+        normalize: bool = False,
         *,  # Helpful for testing
         _io_reader: Any = aiofiles.open,
         _test: bool = False,
     ) -> None:
+        if checkpoint_every is not None and partition_by is not None:
+            raise ValueError("Partitioned output cannot be checkpointed")
+        if compact_urls and any(
+            getattr(consumer, "requires_expanded_urls", False) for consumer in [*sinks, *stages]
+        ):
+            raise ValueError("Some sinks or stages need expanded URLs, disable `compact_urls`")
+        if normalize:
+            # Authors and music are shared by all the runs in the output folder
+            stages = [NormalizeStage(output_folder / "trending" / DIMENSIONS_FILE), *stages]
+        if dedupe:
+            # Seen videos are shared by all the runs in the output folder
+            stages = [DedupeStage(output_folder / "trending" / SEEN_FILE), *stages]
+        super().__init__(stages, flush_interval=flush_interval)
+
         # Input params
         self.client = client
         self.params = starting_params.model_copy(deep=True)
         self.output_folder = output_folder
+        # Host table of the compacted CDN URLs, None if compaction is disabled
+        self.hosts = HostTable() if compact_urls else None
+        # Output file rotation thresholds (bytes, seconds)
+        self.max_file_bytes = max_file_bytes
+        self.max_file_age = max_file_age
+        # Checkpoint every N flushed cycles, None to disable checkpoints
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_file = output_folder / "trending" / CHECKPOINT_FILE
+        # Request budget shared with other collectors, on top of the cycle interval
+        self.budget = budget
+        # Extra sinks of the responses next to the NDJSON output, e.g. a database
+        self.sinks = list(sinks)
+        # Partition the output by collection `hour` or `day` instead of by run, None to disable
+        self.partition_by = partition_by
 
-        # State params
-        self.state = CollectorState.IDLE
-        self.cycle = 0
-        self.last_error: Exception | None = None
+        # Run params
+        self.sink: NdjsonSink | None = None
+        self.partitions: PartitionedSink | None = None
+        self.output_path: Path | None = None
+        self.checkpointed_cycle = 0
+        # (cycle, next vv_count_fyp) of the last flushed record
+        self.cycle_meta: tuple[int, int] | None = None
 
         # Dependency injection
         self._io_reader = _io_reader
         self._test = _test
 
-    def stop(self) -> None:
-        """Stop the collector."""
-        self.state = CollectorState.STOPPED
-
     async def run(
         self,
         batch_size: int = 1,
         interval: int = 5,
         cycles: int | None = None,
         skip_exceptions: bool = False,
+        resume: bool = False,
     ) -> str:
         """
         Run the collector for a (optionally) set number of cycles.
 
         This function will start collecting trending videos from TikTok APIs,
-        storing the responses in an output json file.
+        appending the responses to newline-delimited json files in the output folder.
+        With `partition_by`, the responses go to the collection time partitions under
+        `trending/partitions` instead, see `tiktok.collectors.partitions`.
         :param batch_size: the number of videos to pull for each iteration
         :param interval: the wait-time (in seconds) between pulls
-        :param cycles: how many cycles to run. None for indefinitely.
+        :param cycles: how many cycles to run, including the resumed ones. None for indefinitely.
         :param skip_exceptions: whether to skip exceptions and continue running
+        :param resume: whether to continue the last checkpointed run, in its output folder
         :return: the output file location
         """
         _LOGGER.info(
@@ -80,41 +158,139 @@ class TrendingCollector:
             interval,
         )
 
-        self.state = CollectorState.RUNNING
-        self.cycle = 0
-        output_path = self.output_folder / "trending" / datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        checkpoint = self.load_checkpoint() if resume and self.partition_by is None else None
+        if self.partition_by is not None:
+            # Shared by all the runs, as are the hosts of the compacted URLs
+            output_path = self.output_folder / "trending" / "partitions"
+            start, vv_count_fyp = 0, 0
+            if self.hosts is not None and (output_path / HOSTS_FILE).exists():
+                self.hosts = HostTable.from_list(json.loads((output_path / HOSTS_FILE).read_text()))
+        elif checkpoint is not None:
+            output_path = Path(checkpoint.output_path)
+            start, vv_count_fyp = checkpoint.cycle, checkpoint.vv_count_fyp
+            if checkpoint.ms_token is not None:
+                self.client.ms_token = SecretStr(checkpoint.ms_token)
+            if self.hosts is not None and (output_path / HOSTS_FILE).exists():
+                self.hosts = HostTable.from_list(json.loads((output_path / HOSTS_FILE).read_text()))
+            _LOGGER.info("Resuming the collector -> [path: %s, cycle: %s]", output_path, start)
+        else:
+            output_path = (
+                self.output_folder / "trending" / datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+            )
+            start, vv_count_fyp = 0, 0
+
+        if not self._test:
+            output_path.mkdir(parents=True, exist_ok=True)
+        sink: Sink
+        if self.partition_by is not None:
+            sink = self.partitions = PartitionedSink(
+                output_path, "trending", self.partition_by, self.max_file_bytes, self.max_file_age
+            )
+        else:
+            sink = self.sink = NdjsonSink(
+                output_path, "trending", self.max_file_bytes, self.max_file_age
+            )
+            if checkpoint is not None:
+                self.sink.restore(checkpoint.manifest)
+        self.output_path = output_path
+        self.checkpointed_cycle = start
+        self.cycle_meta = None
+        self.params.count = batch_size
+
+        await self.pipeline(
+            self.source(output_path, interval, cycles, start, vv_count_fyp),
+            {"trending": [sink, *self.sinks]},
+            skip_exceptions,
+        )
+        if self.checkpoint_every is not None and self.cycle_meta is not None:
+            await self.write_checkpoint(*self.cycle_meta)
+
+        return output_path.as_posix()
+
+    async def source(
+        self,
+        output_path: Path,
+        interval: int,
+        cycles: int | None,
+        start: int = 0,
+        vv_count_fyp: int = 0,
+    ) -> AsyncIterator[Record]:
+        """
+        Yield the trending responses, one record per cycle.
 
-        # While the collector is running and we haven't reached the cycle limit
-        while self.state == CollectorState.RUNNING and (cycles is None or self.cycle < cycles):
-            self.log_state()
-            self.cycle += 1
+        Each record carries its cycle and the `vv_count_fyp` of the next cycle, checkpointed once
+        the record is flushed.
+        """
+        batch_size = self.params.count
+        async for cycle in self.cycles(cycles, interval, start):
             try:
-                self.params.count = batch_size
                 # scanned videos so far
-                self.params.vv_count_fyp = (self.cycle - 1) * batch_size
+                self.params.vv_count_fyp = vv_count_fyp + (cycle - start - 1) * batch_size
 
                 # Pull the trending videos
-                response = await self.client.get_trending(self.params)
-                await self.write_to_output(output_path, response.model_dump(mode="json"))
+                if self.budget is not None:
+                    await self.budget.acquire()
+                response = await self.fetch(self.client.get_trending(self.params))
+                payload = response.model_dump(mode="json")
+                if self.hosts is not None:
+                    known_hosts = len(self.hosts)
+                    payload = compact_payload(payload, self.hosts)
+                    if len(self.hosts) != known_hosts:
+                        await self.write_hosts(output_path)
 
             except Exception as e:
-                _LOGGER.exception("Error while running the collector")
-                self.last_error = e
+                self.record_error(e)
+                continue
 
-                if skip_exceptions:
-                    continue
+            yield Record("trending", payload, (cycle, self.params.vv_count_fyp + batch_size))
 
-                self.state = CollectorState.ERROR
-                break
+    async def committed(self, stream: str, meta: Any) -> None:
+        """Checkpoint the run every `checkpoint_every` flushed cycles."""
+        self.cycle_meta = meta
+        cycle, vv_count_fyp = meta
+        if self.checkpoint_every is not None and (
+            cycle - self.checkpointed_cycle >= self.checkpoint_every
+        ):
+            await self.write_checkpoint(cycle, vv_count_fyp)
 
-            # Wait for the next cycle
-            if cycles is not None and self.cycle < cycles:
-                await asyncio.sleep(interval)
+    async def write_checkpoint(self, cycle: int, vv_count_fyp: int) -> None:
+        """Atomically write the checkpoint of the run, as of the last flush."""
+        if self.sink is None or self.output_path is None:
+            return
 
-        return output_path.as_posix()
+        ms_token = self.client.ms_token.get_secret_value() if self.client.ms_token else None
+        checkpoint = TrendingCheckpoint(
+            output_path=self.output_path.as_posix(),
+            cycle=cycle,
+            vv_count_fyp=vv_count_fyp,
+            ms_token=ms_token,
+            manifest=self.sink.manifest,
+        )
+
+        self.checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.checkpoint_file.with_suffix(".tmp")
+        # The checkpoint holds a credential
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(checkpoint.model_dump_json(indent=2))
+        os.replace(tmp_file, self.checkpoint_file)
+        self.checkpointed_cycle = cycle
+        _LOGGER.info("Checkpointed the collector -> [cycle: %s]", cycle)
+
+    def load_checkpoint(self) -> TrendingCheckpoint | None:
+        """Load the checkpoint of the last run, if any."""
+        if not self.checkpoint_file.exists():
+            return None
+        return TrendingCheckpoint.model_validate_json(self.checkpoint_file.read_bytes())
 
     async def write_to_output(self, output_path: Path, json_payload: dict[str, Any]) -> None:
-        """Write json_payload to array in file."""
+        """
+        Write json_payload to array in file.
+
+        NOTE: This rewrites the end of a single JSON array and re-reads the whole file on every
+         call; `run` appends to a `NdjsonSink` instead, see `ndjson_to_json_array` to produce this
+         legacy format from its output.
+        """
         # Create the output folder if it doesn't exist
         output_file = output_path / "trending.json"
         if not output_path.exists() and not self._test:
@@ -135,8 +311,42 @@ class TrendingCollector:
             async with self._io_reader(output_file, "w") as f:
                 await f.write(json.dumps([json_payload], indent=2))
 
-    def log_state(self) -> None:
-        """Log current collector state and metrics in a clear, structured format."""
-        state_msg = f"Status -> [state: {self.state}, cycle: {self.cycle}, error: {str(self.last_error) if self.last_error else 'None'}]"
-        self.last_error = None
-        _LOGGER.info(state_msg)
+    async def write_hosts(self, output_path: Path) -> None:
+        """Write the host table needed to expand the compacted URLs."""
+        if self.hosts is None:
+            return
+
+        async with self._io_reader(output_path / HOSTS_FILE, "w") as f:
+            await f.write(json.dumps(self.hosts.to_list()))
+
+
+def load_output(output_path: Path) -> list[TrendingResponse]:
+    """
+    Load the responses archived by a `TrendingCollector` run.
+
+    NOTE: The responses are validated again: pydantic-core validates them faster than any
+     Python-level construction skipping validation would build them. On the test payloads,
+     `model_validate` takes ~1.1ms per trending response, against ~12ms for `model_construct`
+     applied to every nested model (see `scripts/benchmark_load_output.py`).
+    :param output_path: the run folder, as returned by `TrendingCollector.run`
+    :return: the archived responses
+    """
+    if (output_path / MANIFEST_FILE).exists():
+        payloads = list(iter_ndjson(output_path))
+    else:
+        # Legacy single-array output
+        payloads = json.loads((output_path / "trending.json").read_text())
+    dimensions_file = output_path.parent / DIMENSIONS_FILE
+    if dimensions_file.exists():
+        # Normalized output: join the authors and music back
+        store = DimensionStore(dimensions_file)
+        try:
+            payloads = [denormalize(payload, store) for payload in payloads]
+        finally:
+            store.close()
+    hosts_file = output_path / HOSTS_FILE
+    if hosts_file.exists():
+        hosts = HostTable.from_list(json.loads(hosts_file.read_text()))
+        payloads = [expand_payload(payload, hosts) for payload in payloads]
+
+    return [TrendingResponse.model_validate(payload) for payload in payloads]
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from tiktok.collectors.metrics import LatencyWindow
+from tiktok.collectors.sinks import Sink
+
+_LOGGER = logging.getLogger(__name__)
+
+_CLOSE = object()
+"""Queue sentinel asking the writer task to stop."""
+
+
+class BufferedWriter:
+    """
+    A write-behind writer in front of a `Sink`.
+
+    Producers enqueue payloads in a bounded queue and return immediately; a background task
+    batches them and commits each group with a single `Sink.write` and `Sink.flush` (one fsync).
+    A group is committed once `max_batch` payloads are queued or `flush_interval` seconds after
+    its first payload, whichever comes first. When the queue is full, `put` waits, slowing
+    producers down to the disk speed.
+
+    Payloads may carry a marker (e.g. a cursor): after each commit, `on_commit` is called with
+    the marker of the last committed payload that had one.
+    """
+
+    def __init__(
+        self,
+        sink: Sink,
+        max_queue: int = 1024,
+        max_batch: int = 256,
+        flush_interval: float = 1.0,
+        on_commit: Callable[[Any], Awaitable[None]] | None = None,
+    ) -> None:
+        self.sink = sink
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.on_commit = on_commit
+
+        self._queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=max_queue)
+        self._task: asyncio.Task[None] | None = None
+        self.error: Exception | None = None
+
+        # Metrics
+        self.items_written = 0
+        self.items_dropped = 0
+        self.flushes = 0
+        self.flush_seconds = 0.0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.max_queue_depth = 0
+        self.put_wait_seconds = 0.0
+        self.commit_latency = LatencyWindow()
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of payloads waiting to be written."""
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        """Start the writer task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def put(self, payload: dict[str, Any], marker: Any = None) -> None:
+        """
+        Enqueue `payload`, waiting if the queue is full.
+
+        :param payload: the payload to write
+        :param marker: the marker handed to `on_commit` once the payload is committed
+        :raises Exception: the error that made the writer task fail, if any
+        """
+        if self.error is not None:
+            raise self.error
+
+        if self._queue.full():
+            start = time.perf_counter()
+            await self._queue.put((payload, marker))
+            self.put_wait_seconds += time.perf_counter() - start
+        else:
+            self._queue.put_nowait((payload, marker))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+    async def close(self) -> None:
+        """Commit the queued payloads, stop the writer task and close the sink."""
+        if self._task is not None:
+            await self._queue.put(_CLOSE)
+            await self._task
+            self._task = None
+        await self.sink.close()
+
+    async def __aenter__(self) -> "BufferedWriter":
+        self.start()
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        await self.close()
+
+    async def _run(self) -> None:
+        """Batch the queued payloads and commit them until closed."""
+        closing = False
+        while not closing:
+            batch, closing = await self._next_batch()
+            if not batch:
+                continue
+
+            if self.error is not None:
+                # Keep draining so producers never block on a dead writer
+                self.items_dropped += len(batch)
+                continue
+
+            try:
+                await self._commit(batch)
+            except Exception as e:
+                _LOGGER.exception("Error while writing the output")
+                self.error = e
+                self.items_dropped += len(batch)
+
+    async def _next_batch(self) -> tuple[list[tuple[dict[str, Any], Any]], bool]:
+        """Wait for the next group of payloads, and whether the writer was closed."""
+        first = await self._queue.get()
+        if first is _CLOSE:
+            return [], True
+
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.max_batch:
+            try:
+                payload = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    payload = await asyncio.wait_for(self._queue.get(), remaining)
+                except TimeoutError:
+                    break
+
+            if payload is _CLOSE:
+                return batch, True
+            batch.append(payload)
+
+        return batch, False
+
+    async def _commit(self, batch: list[tuple[dict[str, Any], Any]]) -> None:
+        """Write and flush a group of payloads, recording the flush latency."""
+        start = time.perf_counter()
+        await self.sink.write([payload for payload, _ in batch])
+        await self.sink.flush()
+        elapsed = time.perf_counter() - start
+
+        markers = [marker for _, marker in batch if marker is not None]
+        if markers and self.on_commit is not None:
+            await self.on_commit(markers[-1])
+
+        self.items_written += len(batch)
+        self.flushes += 1
+        self.flush_seconds += elapsed
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self.commit_latency.record(elapsed)
+        _LOGGER.debug(
+            "Committed output -> [items: %s, latency: %.4f, queue: %s]",
+            len(batch),
+            elapsed,
+            self.queue_depth,
+        )
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the writer metrics."""
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "items_written": self.items_written,
+            "items_dropped": self.items_dropped,
+            "flushes": self.flushes,
+            "avg_flush_seconds": self.flush_seconds / self.flushes if self.flushes else 0.0,
+            "last_flush_seconds": self.last_flush_seconds,
+            "max_flush_seconds": self.max_flush_seconds,
+            "put_wait_seconds": self.put_wait_seconds,
+            # Sinks counting their output expose `bytes_written`
+            "bytes_written": getattr(self.sink, "bytes_written", 0),
+        }
+
+    def log_metrics(self) -> None:
+        """Log a one-line summary of the writer metrics."""
+        _LOGGER.info(
+            "Writer -> [queue: %s, written: %s, flushes: %s, last flush: %.4f, put wait: %.4f]",
+            self.queue_depth,
+            self.items_written,
+            self.flushes,
+            self.last_flush_seconds,
+            self.put_wait_seconds,
+        )
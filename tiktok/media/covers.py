@@ -0,0 +1,338 @@
+"""
+Perceptual hashes of the video covers, indexed for near-duplicate queries.
+
+`CoverHashStage` fetches the covers of the collected videos concurrently and hashes them with a
+64-bit DCT perceptual hash (pHash), computed for a batch of covers at once with NumPy: visually
+similar covers (re-encoded, resized, lightly edited re-uploads) get hashes a few bits apart.
+
+`HammingIndex` answers "which hashes are within `radius` bits of this one" with multi-index
+hashing: each hash is split into 4 substrings of 16 bits, each indexed by a sorted table. Two
+hashes within `radius` bits agree within `radius // 4` bits on at least one substring, so a query
+only probes the table entries close to its own substrings, then checks the candidates' full
+distance, instead of scanning every hash.
+"""
+
+import asyncio
+import io
+import logging
+import os
+from functools import cache
+from itertools import combinations
+from pathlib import Path
+from typing import Any
+
+import httpx
+import numpy as np
+import numpy.typing as npt
+from PIL import Image
+
+from tiktok.collectors.base import Record, Stage
+from tiktok.collectors.dedupe import SeenSet
+
+_LOGGER = logging.getLogger(__name__)
+
+COVERS_FILE = "covers.npz"
+HASH_SIZE = 8
+"""The side of the low-frequency DCT block, i.e. 64-bit hashes."""
+IMAGE_SIZE = 32
+"""The side of the grayscale image the DCT is computed on."""
+SUBSTRINGS = 4
+SUBSTRING_BITS = 64 // SUBSTRINGS
+_ITEM_LIST_KEYS = ("item_list", "itemList")
+
+
+def _dct_matrix(size: int) -> npt.NDArray[np.float64]:
+    """Return the orthonormal DCT-II matrix of `size`."""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix: npt.NDArray[np.float64] = np.sqrt(2 / size) * np.cos(
+        np.pi * (2 * n + 1) * k / (2 * size)
+    )
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT = _dct_matrix(IMAGE_SIZE)[:HASH_SIZE]
+_BITS = np.uint64(1) << np.arange(HASH_SIZE * HASH_SIZE, dtype=np.uint64)
+
+
+def cover_pixels(data: bytes) -> npt.NDArray[np.float32]:
+    """Decode an image into the grayscale pixels hashed by `phashes`."""
+    with Image.open(io.BytesIO(data)) as image:
+        gray = image.convert("L").resize((IMAGE_SIZE, IMAGE_SIZE), Image.Resampling.LANCZOS)
+    return np.asarray(gray, dtype=np.float32)
+
+
+def phashes(pixels: npt.NDArray[np.float32]) -> npt.NDArray[np.uint64]:
+    """
+    Return the perceptual hashes of a batch of images.
+
+    :param pixels: the grayscale images, shaped (count, 32, 32)
+    :return: one 64-bit hash per image: the low-frequency DCT coefficients above their median
+    """
+    # The 8x8 low frequencies of every image: D @ X @ D.T, batched
+    coefficients = _DCT @ pixels.astype(np.float64) @ _DCT.T
+    flat = coefficients.reshape(len(pixels), -1)
+    # The median excludes the DC term, which only reflects the mean brightness
+    medians = np.median(flat[:, 1:], axis=1, keepdims=True)
+    hashes: npt.NDArray[np.uint64] = ((flat > medians).astype(np.uint64) * _BITS).sum(
+        axis=1, dtype=np.uint64
+    )
+    return hashes
+
+
+@cache
+def _masks(radius: int) -> npt.NDArray[np.uint64]:
+    """Return the substring masks with at most `radius` bits set."""
+    masks = [0]
+    for bits in range(1, radius + 1):
+        for positions in combinations(range(SUBSTRING_BITS), bits):
+            masks.append(sum(1 << position for position in positions))
+    return np.array(masks, dtype=np.uint64)
+
+
+class HammingIndex:
+    """
+    A multi-index hashing index of 64-bit hashes by (integer) key.
+
+    Added hashes are buffered and merged into the sorted tables in batches, so inserts stay cheap;
+    the buffer is scanned by every query. `save` writes the buffer to a sidecar file of its own
+    (`covers.pending.npz` next to `covers.npz`), so frequent saves only rewrite the merged hashes
+    after a merge.
+    :param merge_every: the buffered hashes before a merge
+    """
+
+    def __init__(self, merge_every: int = 65_536) -> None:
+        self.merge_every = merge_every
+        self.keys = np.empty(0, dtype=np.int64)
+        self.hashes = np.empty(0, dtype=np.uint64)
+        # Per substring: the sorted substrings and the positions they come from
+        self._tables: list[tuple[npt.NDArray[np.uint64], npt.NDArray[np.intp]]] = []
+        self._pending_keys: list[int] = []
+        self._pending_hashes: list[int] = []
+        self._seen = SeenSet()
+        # Whether the merged hashes changed since the last save
+        self._merged_changed = False
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self.keys) + len(self._pending_keys)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._seen
+
+    def add(self, key: int, hash_: int) -> None:
+        """Index the hash of `key`, unless `key` is already indexed."""
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        self._pending_keys.append(key)
+        self._pending_hashes.append(hash_)
+        if len(self._pending_keys) >= self.merge_every:
+            self.merge()
+
+    def merge(self) -> None:
+        """Merge the buffered hashes into the tables."""
+        if not self._pending_keys:
+            return
+        self.keys = np.concatenate([self.keys, np.array(self._pending_keys, dtype=np.int64)])
+        self.hashes = np.concatenate([self.hashes, np.array(self._pending_hashes, dtype=np.uint64)])
+        self._pending_keys, self._pending_hashes = [], []
+        self._merged_changed = True
+        self._build()
+
+    def get(self, key: int) -> int | None:
+        """Return the hash of `key`, None if not indexed."""
+        if key in self._pending_keys:
+            return self._pending_hashes[self._pending_keys.index(key)]
+        positions = np.flatnonzero(self.keys == key)
+        return int(self.hashes[positions[0]]) if len(positions) else None
+
+    def query(self, hash_: int, radius: int = 8) -> list[tuple[int, int]]:
+        """
+        Return the keys whose hash is within `radius` bits of `hash_`.
+
+        :return: the (key, distance) pairs, closest first
+        """
+        query = np.uint64(hash_)
+        masks = _masks(radius // SUBSTRINGS)
+        substring_mask = np.uint64((1 << SUBSTRING_BITS) - 1)
+
+        candidates: list[npt.NDArray[np.intp]] = []
+        for index, (substrings, positions) in enumerate(self._tables):
+            shift = np.uint64(index * SUBSTRING_BITS)
+            probes = ((query >> shift) & substring_mask) ^ masks
+            starts = np.searchsorted(substrings, probes, side="left")
+            ends = np.searchsorted(substrings, probes, side="right")
+            # Gather the matching ranges at once: each range start, then consecutive positions
+            lengths = ends - starts
+            total = int(lengths.sum())
+            if total:
+                offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+                candidates.append(positions[offsets + np.arange(total)])
+
+        results: list[tuple[int, int]] = []
+        if candidates:
+            positions = np.concatenate(candidates)
+            # A match may come from several substrings: deduplicated once filtered, as few are
+            close = np.unique(positions[np.bitwise_count(self.hashes[positions] ^ query) <= radius])
+            distances = np.bitwise_count(self.hashes[close] ^ query)
+            results.extend(zip(self.keys[close].tolist(), distances.tolist()))
+
+        if self._pending_keys:
+            pending = np.array(self._pending_hashes, dtype=np.uint64)
+            distances = np.bitwise_count(pending ^ query)
+            for position in np.flatnonzero(distances <= radius):
+                results.append((self._pending_keys[position], int(distances[position])))
+        return sorted(results, key=lambda result: (result[1], result[0]))
+
+    def near_duplicates(self, key: int, radius: int = 8) -> list[tuple[int, int]]:
+        """Return the other keys whose hash is within `radius` bits of the hash of `key`."""
+        hash_ = self.get(key)
+        if hash_ is None:
+            return []
+        return [result for result in self.query(hash_, radius) if result[0] != key]
+
+    def save(self, path: Path) -> None:
+        """
+        Atomically write the index to `path`, and its buffered hashes to the pending file.
+
+        The merged hashes are only written when a merge changed them. They are written first: a
+        crash in between leaves a pending file whose hashes are merged already, skipped on load.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if self._merged_changed or not path.exists():
+            _write_hashes(path, self.keys, self.hashes)
+            self._merged_changed = False
+        _write_hashes(
+            _pending_path(path),
+            np.array(self._pending_keys, dtype=np.int64),
+            np.array(self._pending_hashes, dtype=np.uint64),
+        )
+
+    @classmethod
+    def load(cls, path: Path, merge_every: int = 65_536) -> "HammingIndex":
+        """Load an index written by `save`, or an empty one if `path` does not exist."""
+        index = cls(merge_every)
+        if path.exists():
+            with np.load(path) as data:
+                index.keys, index.hashes = data["keys"], data["hashes"]
+            index._seen = SeenSet(index.keys.tolist())
+            index._build()
+        if _pending_path(path).exists():
+            with np.load(_pending_path(path)) as data:
+                for key, hash_ in zip(data["keys"].tolist(), data["hashes"].tolist()):
+                    index.add(key, hash_)
+        return index
+
+    def _build(self) -> None:
+        """Sort the substring tables."""
+        self._tables = []
+        substring_mask = np.uint64((1 << SUBSTRING_BITS) - 1)
+        for index in range(SUBSTRINGS):
+            substrings = (self.hashes >> np.uint64(index * SUBSTRING_BITS)) & substring_mask
+            positions = np.argsort(substrings, kind="stable")
+            self._tables.append((substrings[positions], positions))
+
+
+def _pending_path(path: Path) -> Path:
+    """Return the file of the buffered hashes of the index saved to `path`."""
+    return path.with_suffix(".pending.npz")
+
+
+def _write_hashes(path: Path, keys: npt.NDArray[np.int64], hashes: npt.NDArray[np.uint64]) -> None:
+    """Atomically write keys and their hashes to an `.npz` file."""
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, keys=keys, hashes=hashes)
+    os.replace(tmp_path, path)
+
+
+class CoverHashStage(Stage):
+    """
+    A pipeline stage indexing the cover hashes of the collected videos; records pass unchanged.
+
+    The index is reloaded from `path` on start and saved every `save_every` records and when the
+    pipeline is drained; saves write the hashes buffered since the last merge, not the index.
+    :param path: the index file
+    :param concurrency: the covers fetched at once
+    :param save_every: the records between saves
+    """
+
+    requires_expanded_urls = True
+    """Refused by collectors compacting the URLs."""
+
+    def __init__(
+        self,
+        path: Path,
+        concurrency: int = 8,
+        save_every: int = 10,
+        *,  # Helpful for testing
+        _client: httpx.AsyncClient | None = None,
+    ) -> None:
+        super().__init__("covers", self.index_covers)
+        self.path = path
+        self.save_every = save_every
+        self.index = HammingIndex.load(path)
+        self._owns_client = _client is None
+        self.client = _client or httpx.AsyncClient(timeout=10.0, follow_redirects=True)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        _LOGGER.info("Loaded cover hashes -> [path: %s, count: %s]", path, len(self.index))
+
+        # Metrics
+        self.records = 0
+        self.covers = 0
+        self.failed = 0
+
+    async def index_covers(self, record: Record) -> list[Record]:
+        """Fetch and hash the covers of the new videos of `record`."""
+        key = next((key for key in _ITEM_LIST_KEYS if key in record.payload), None)
+        covers: dict[int, str] = {}
+        for item in (record.payload[key] if key else None) or []:
+            video = item.get("video") or {}
+            url = video.get("cover") or video.get("origin_cover")
+            item_id = str(item.get("id") or "")
+            # Compacted URLs are lists, skip them when the stage is fed by another source
+            if isinstance(url, str) and item_id.isdigit() and int(item_id) not in self.index:
+                covers[int(item_id)] = url
+
+        fetched = await asyncio.gather(*(self._fetch(url) for url in covers.values()))
+        decoded = [
+            (video_id, pixels) for video_id, pixels in zip(covers, fetched) if pixels is not None
+        ]
+        if decoded:
+            hashes = phashes(np.stack([pixels for _, pixels in decoded]))
+            for (video_id, _), hash_ in zip(decoded, hashes.tolist()):
+                self.index.add(video_id, hash_)
+        self.covers += len(decoded)
+
+        self.records += 1
+        if self.records % self.save_every == 0:
+            await asyncio.to_thread(self.index.save, self.path)
+        return [record]
+
+    async def _fetch(self, url: str) -> npt.NDArray[np.float32] | None:
+        """Fetch and decode a cover, None on failure."""
+        try:
+            async with self._semaphore:
+                response = await self.client.get(url)
+                response.raise_for_status()
+            return await asyncio.to_thread(cover_pixels, response.content)
+        except Exception as e:
+            self.failed += 1
+            _LOGGER.warning("[Covers] Cover fetch failed -> [url: %s, error: %s]", url, repr(e))
+            return None
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the cover metrics."""
+        return {
+            "covers_hashed": self.covers,
+            "covers_failed": self.failed,
+            "covers_indexed": len(self.index),
+        }
+
+    async def close(self) -> None:
+        """Save the index."""
+        await asyncio.to_thread(self.index.save, self.path)
+        if self._owns_client:
+            await self.client.aclose()
@@ -0,0 +1,469 @@
+"""
+Media download pipeline for the collected videos.
+
+`media_jobs` extracts the video files to download from collected payloads (trending responses or
+videos). `MediaDownloader` downloads them with a bounded number of concurrent transfers, through a
+`Fetcher`: `HttpFetcher` for the TikTok CDN, `FileFetcher` for a local folder standing in for it.
+
+Downloads go to a `MediaStore`, which keeps every file once, named by the SHA-256 of its content,
+and an index of the video IDs already downloaded, so re-trending videos are skipped:
+
+    media/index.ndjson
+    media/objects/3f/a2/3fa2...e9.mp4
+    media/partial/7445701530583436550.part
+
+A video may be served as several files: the `play_addr` file (mirrored by the `url_list` of its
+bitrate) and the watermarked `download_addr` one. Each file, a `MediaSource`, has its own partial
+file: an interrupted download is resumed from its size with a range request, from a mirror of the
+same file only. A complete file is checked against the size announced by the payload (or the
+server) before being hashed and moved into place.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+from http.cookiejar import MozillaCookieJar
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterable, NamedTuple, Protocol, Sequence
+
+import aiofiles
+import httpx
+import orjson
+
+from tiktok.collectors.metrics import LatencyWindow, Meter
+
+_LOGGER = logging.getLogger(__name__)
+
+INDEX_FILE = "index.ndjson"
+CHUNK_BYTES = 256 * 1024
+_ITEM_LIST_KEYS = ("item_list", "itemList")
+
+
+class MediaSource(NamedTuple):
+    """A file serving a video."""
+
+    urls: tuple[str, ...]
+    """The mirrors of the file, tried in order."""
+
+    size: int | None = None
+    """The expected size in bytes, if announced by the payload."""
+
+
+class MediaJob(NamedTuple):
+    """A video to download."""
+
+    video_id: str
+    sources: tuple[MediaSource, ...]
+    """The files serving the video, tried in order: any of them completes the job."""
+
+
+class MediaStream(NamedTuple):
+    """An open transfer."""
+
+    offset: int
+    """Where the transfer starts: the requested offset, or 0 if the server ignored it."""
+
+    size: int | None
+    """The full size of the file, if known."""
+
+    chunks: AsyncIterator[bytes]
+
+
+class Fetcher(Protocol):
+    """A source of media files, supporting transfers from an offset."""
+
+    def open(self, url: str, offset: int = 0) -> Any:
+        """Return an async context manager of the `MediaStream` of `url` from `offset`."""
+        ...
+
+
+class IncompleteDownload(Exception):
+    """The transfer ended before the expected size."""
+
+
+class SizeMismatch(Exception):
+    """The downloaded file is larger than expected."""
+
+
+def media_jobs(payload: dict[str, Any]) -> list[MediaJob]:
+    """
+    Return the videos of a payload: a trending response or a single video.
+
+    URLs must be expanded, see `tiktok.models.compaction.expand_payload`: compacted ones are skipped.
+    """
+    items = next((payload[key] for key in _ITEM_LIST_KEYS if key in payload), None)
+    jobs = []
+    for item in [payload] if items is None else items:
+        video = item.get("video") or {}
+        video_id = str(item.get("id") or "")
+        if not video_id.isdigit():
+            continue
+
+        # The file served at `play_addr`, and its mirrors
+        play = [video.get("play_addr")]
+        size = None
+        for info in video.get("bitrate_info") or []:
+            play_addr = info.get("play_addr") or {}
+            if info.get("bitrate") == video.get("bitrate"):
+                size = play_addr.get("data_size")
+                play.extend(play_addr.get("url_list") or [])
+        sources = [MediaSource(_urls(play), size), MediaSource(_urls([video.get("download_addr")]))]
+        sources = [source for source in sources if source.urls]
+        if sources:
+            jobs.append(MediaJob(video_id, tuple(sources)))
+    return jobs
+
+
+def _urls(candidates: list[Any]) -> tuple[str, ...]:
+    """Return the distinct expanded URLs of `candidates`."""
+    return tuple(dict.fromkeys(url for url in candidates if isinstance(url, str) and url))
+
+
+def is_compacted(payload: dict[str, Any]) -> bool:
+    """Return whether the video URLs of a payload are compacted."""
+    items = next((payload[key] for key in _ITEM_LIST_KEYS if key in payload), None)
+    return any(
+        isinstance((item.get("video") or {}).get(field), list)
+        for item in ([payload] if items is None else items) or []
+        for field in ("play_addr", "download_addr")
+    )
+
+
+class HttpFetcher:
+    """
+    A fetcher of media over HTTP, resuming with range requests.
+
+    :param headers: the request headers, e.g. the user agent the CDN URLs were signed for
+    :param cookies_file: a Netscape cookies file, e.g. exported from a logged-in browser
+    :param timeout: the connect and read timeout (seconds)
+    """
+
+    def __init__(
+        self,
+        headers: dict[str, str] | None = None,
+        cookies_file: Path | None = None,
+        timeout: float = 30.0,
+        *,  # Helpful for testing
+        _client: httpx.AsyncClient | None = None,
+    ) -> None:
+        cookies = None
+        if cookies_file is not None:
+            jar = MozillaCookieJar(cookies_file)
+            jar.load(ignore_discard=True, ignore_expires=True)
+            cookies = httpx.Cookies(jar)
+        self.client = _client or httpx.AsyncClient(
+            headers=headers, cookies=cookies, timeout=timeout, follow_redirects=True
+        )
+
+    @asynccontextmanager
+    async def open(self, url: str, offset: int = 0) -> AsyncIterator[MediaStream]:
+        """Stream `url` from `offset`."""
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 416:
+                # Nothing left past `offset`: the partial file is complete
+                total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                yield MediaStream(offset, int(total) if total.isdigit() else None, _empty())
+                return
+
+            response.raise_for_status()
+            if response.status_code == 206:
+                total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                size = int(total) if total.isdigit() else None
+            else:
+                offset = 0
+                length = response.headers.get("Content-Length")
+                size = int(length) if length and length.isdigit() else None
+            yield MediaStream(offset, size, response.aiter_bytes(CHUNK_BYTES))
+
+    async def close(self) -> None:
+        """Close the HTTP client."""
+        await self.client.aclose()
+
+
+class FileFetcher:
+    """A fetcher of media from a local folder, by file name: a stand-in for the CDN."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    @asynccontextmanager
+    async def open(self, url: str, offset: int = 0) -> AsyncIterator[MediaStream]:
+        """Stream the file named by the last segment of `url` from `offset`."""
+        path = self.root / url.rstrip("/").rpartition("/")[2].partition("?")[0]
+        async with aiofiles.open(path, "rb") as f:
+            await f.seek(offset)
+            yield MediaStream(offset, path.stat().st_size, _read_chunks(f))
+
+
+async def _read_chunks(f: Any) -> AsyncIterator[bytes]:
+    while chunk := await f.read(CHUNK_BYTES):
+        yield chunk
+
+
+async def _empty() -> AsyncIterator[bytes]:
+    return
+    yield
+
+
+class MediaStore:
+    """
+    A content-addressed store of media files, indexed by video ID.
+
+    :param root: the store folder
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        (root / "partial").mkdir(parents=True, exist_ok=True)
+        # digest by video ID
+        self.index: dict[str, str] = {}
+        index_file = root / INDEX_FILE
+        if index_file.exists():
+            with open(index_file, "rb") as f:
+                for line in f:
+                    try:
+                        entry = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        # A torn last line
+                        continue
+                    self.index[entry["video_id"]] = entry["digest"]
+        self._index_file = open(index_file, "ab")
+
+    def path(self, digest: str, suffix: str = ".mp4") -> Path:
+        """Return the file of a digest."""
+        return self.root / "objects" / digest[:2] / digest[2:4] / f"{digest}{suffix}"
+
+    def partial(self, video_id: str, source: int = 0) -> Path:
+        """Return the partial file of a video, from its `source`-th file."""
+        name = f"{video_id}.part" if source == 0 else f"{video_id}.{source}.part"
+        return self.root / "partial" / name
+
+    def get(self, video_id: str) -> Path | None:
+        """Return the file of a downloaded video, None if not downloaded."""
+        digest = self.index.get(video_id)
+        return self.path(digest) if digest is not None else None
+
+    def commit(self, video_id: str, partial: Path, digest: str) -> Path:
+        """Move a complete partial file into the store and index it."""
+        path = self.path(digest)
+        if path.exists():
+            # The same file, served for another video
+            partial.unlink()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(partial, path)
+
+        self.index[video_id] = digest
+        entry = {
+            "video_id": video_id,
+            "digest": digest,
+            "size": path.stat().st_size,
+            "downloaded_at": datetime.now(UTC),
+        }
+        self._index_file.write(orjson.dumps(entry) + b"\n")
+        self._index_file.flush()
+        return path
+
+    def sync(self) -> None:
+        """Fsync the index."""
+        os.fsync(self._index_file.fileno())
+
+    def close(self) -> None:
+        """Close the index."""
+        self._index_file.close()
+
+
+def _sha256(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(2**20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaDownloader:
+    """
+    Downloads media jobs into a `MediaStore`, at most `concurrency` at a time.
+
+    :param store: the media store
+    :param fetcher: the media source
+    :param concurrency: the maximum concurrent transfers
+    :param attempts: the transfers of a job before giving up, cycling through the URLs of its
+     sources and resuming from the bytes already downloaded from the same source
+    """
+
+    def __init__(
+        self, store: MediaStore, fetcher: Fetcher, concurrency: int = 4, attempts: int = 3
+    ) -> None:
+        self.store = store
+        self.fetcher = fetcher
+        self.concurrency = concurrency
+        self.attempts = attempts
+
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # Videos being downloaded, so a video queued twice is downloaded once
+        self._active: set[str] = set()
+
+        # Metrics
+        self.bytes = Meter()
+        self.completed = Meter()
+        self.skipped = 0
+        self.failed = 0
+        self.retried = 0
+        self.latency = LatencyWindow()
+
+    async def run(self, jobs: Iterable[MediaJob]) -> None:
+        """Download `jobs`, returning once all are done or failed."""
+        await asyncio.gather(*(self.download(job) for job in jobs))
+
+    async def download(self, job: MediaJob) -> Path | None:
+        """Download a job, unless already stored. Returns its file, None if it failed."""
+        path = self.store.get(job.video_id)
+        if path is not None or job.video_id in self._active:
+            self.skipped += 1
+            return path
+
+        self._active.add(job.video_id)
+        try:
+            async with self._semaphore:
+                return await self._download(job)
+        finally:
+            self._active.discard(job.video_id)
+
+    async def _download(self, job: MediaJob) -> Path | None:
+        """Transfer a job, retrying and resuming on errors."""
+        start = time.perf_counter()
+        # Mirrors of the same file first; partial files are never shared across files
+        urls = [(index, url) for index, source in enumerate(job.sources) for url in source.urls]
+        for attempt in range(self.attempts):
+            index, url = urls[attempt % len(urls)]
+            partial = self.store.partial(job.video_id, index)
+            try:
+                await self._transfer(url, partial, job.sources[index].size)
+                digest = await asyncio.to_thread(_sha256, partial)
+                path = self.store.commit(job.video_id, partial, digest)
+            except Exception as e:
+                if isinstance(e, SizeMismatch):
+                    partial.unlink(missing_ok=True)
+                self.retried += 1
+                _LOGGER.warning(
+                    "[Media] Download failed -> [video: %s, attempt: %s, error: %s]",
+                    job.video_id,
+                    attempt + 1,
+                    repr(e),
+                )
+                continue
+
+            for other in range(len(job.sources)):
+                self.store.partial(job.video_id, other).unlink(missing_ok=True)
+            self.completed.mark()
+            self.latency.record(time.perf_counter() - start)
+            _LOGGER.debug("[Media] Downloaded -> [video: %s, file: %s]", job.video_id, path.name)
+            return path
+
+        self.failed += 1
+        return None
+
+    async def _transfer(self, url: str, partial: Path, expected: int | None) -> None:
+        """Append the rest of `url` to the partial file, then check its size."""
+        offset = partial.stat().st_size if partial.exists() else 0
+        async with self.fetcher.open(url, offset) as stream:
+            expected = expected or stream.size
+            async with aiofiles.open(partial, "r+b" if partial.exists() else "wb") as f:
+                # The server may restart from the beginning
+                await f.truncate(stream.offset)
+                await f.seek(stream.offset)
+                async for chunk in stream.chunks:
+                    await f.write(chunk)
+                    self.bytes.mark(len(chunk))
+
+        size = partial.stat().st_size
+        if expected is not None and size < expected:
+            raise IncompleteDownload(f"{size} of {expected} bytes")
+        if expected is not None and size > expected:
+            raise SizeMismatch(f"{size} bytes, expected {expected}")
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the progress and throughput metrics."""
+        return {
+            "completed": self.completed.total,
+            "completed_per_second": self.completed.rate(),
+            "bytes": self.bytes.total,
+            "bytes_per_second": self.bytes.rate(),
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "retried": self.retried,
+            "in_flight": len(self._active),
+            "latency": self.latency.summary([self.latency]),
+        }
+
+    def log_progress(self) -> None:
+        """Log the progress metrics."""
+        _LOGGER.info(
+            "[Media] Progress -> [completed: %s, skipped: %s, failed: %s, in flight: %s, "
+            "throughput: %.1f MiB/s]",
+            self.completed.total,
+            self.skipped,
+            self.failed,
+            len(self._active),
+            self.bytes.rate() / 2**20,
+        )
+
+
+class MediaSink:
+    """
+    A collector sink downloading the videos of the written payloads in the background.
+
+    Writes only wait for room in a queue of `max_pending` jobs; `flush` persists the index of the
+    completed downloads and `close` waits for the queued ones. The payloads need expanded URLs:
+    the sink refuses compacted ones.
+    """
+
+    requires_expanded_urls = True
+    """Refused by collectors compacting the URLs."""
+
+    def __init__(self, downloader: MediaDownloader, max_pending: int = 1024) -> None:
+        self.downloader = downloader
+        self._queue: asyncio.Queue[MediaJob | None] = asyncio.Queue(maxsize=max_pending)
+        self._workers: list[asyncio.Task[None]] = []
+
+    @property
+    def pending(self) -> int:
+        """The queued jobs."""
+        return self._queue.qsize()
+
+    async def write(self, payloads: Sequence[dict[str, Any]]) -> None:
+        """Queue the videos of the payloads."""
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._work()) for _ in range(self.downloader.concurrency)
+            ]
+        for payload in payloads:
+            if is_compacted(payload):
+                raise ValueError("Compacted URLs cannot be downloaded, disable `compact_urls`")
+            for job in media_jobs(payload):
+                await self._queue.put(job)
+
+    async def flush(self) -> None:
+        """Persist the index of the completed downloads."""
+        await asyncio.to_thread(self.downloader.store.sync)
+        self.downloader.log_progress()
+
+    async def close(self) -> None:
+        """Wait for the queued downloads, then stop the workers."""
+        for _ in self._workers:
+            await self._queue.put(None)
+        await asyncio.gather(*self._workers)
+        self._workers = []
+        await self.flush()
+
+    async def _work(self) -> None:
+        """Download queued jobs until stopped."""
+        while (job := await self._queue.get()) is not None:
+            await self.downloader.download(job)
@@ -0,0 +1,282 @@
+"""
+Frame sampling of the downloaded videos, for content analysis without the videos themselves.
+
+`extract_frames` decodes a video with OpenCV and samples frames every `interval` seconds and/or on
+scene changes: frames whose color histogram moved away from the last sampled one. Each sampled
+frame is written as a small JPEG thumbnail, and its features (an HSV color histogram) to a
+per-video array file, written last so that its presence marks a complete extraction:
+
+    media/frames/3f/a2/3fa2...e9/0000.jpeg
+    media/frames/3f/a2/3fa2...e9/features.npz  (timestamps, features, scores)
+
+Frames are decoded one at a time and only the sampled ones are kept (as thumbnails), so the memory
+of an extraction does not grow with the length of the video. `FrameExtractor` extracts the videos
+of a `MediaStore` across a process pool, one video per worker and a bounded number of videos in
+flight; the output is keyed by file digest, so a video downloaded for several IDs is decoded once.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Iterable, Iterator, NamedTuple
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+from tiktok.media.download import MediaStore
+
+_LOGGER = logging.getLogger(__name__)
+
+FEATURES_FILE = "features.npz"
+HISTOGRAM_BINS = [8, 4, 4]
+"""The hue, saturation and value bins of the frame features."""
+
+
+class FrameOptions(NamedTuple):
+    """
+    How frames are sampled.
+
+    :param interval: the seconds between sampled frames, None to only sample on scene changes
+    :param scene_threshold: the histogram distance (Bhattacharyya, 0 to 1) from the last sampled
+     frame which samples a frame, None to only sample at intervals
+    :param scene_step: the seconds between the frames compared for scene changes
+    :param max_frames: the frames sampled per video
+    :param thumbnail_size: the longest side of the thumbnails, in pixels
+    :param quality: the JPEG quality of the thumbnails
+    """
+
+    interval: float | None = 1.0
+    scene_threshold: float | None = None
+    scene_step: float = 0.2
+    max_frames: int = 120
+    thumbnail_size: int = 160
+    quality: int = 70
+
+
+class SampledFrame(NamedTuple):
+    """A sampled frame: its time (seconds), image, features and scene change score."""
+
+    timestamp: float
+    image: npt.NDArray[Any]
+    features: npt.NDArray[np.float32]
+    score: float
+
+
+class FrameSummary(NamedTuple):
+    """The outcome of a video extraction."""
+
+    key: str
+    frames: int
+    elapsed: float
+
+
+def frame_features(image: npt.NDArray[Any]) -> npt.NDArray[np.float32]:
+    """Return the L1-normalized HSV color histogram of a BGR frame."""
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    histogram = cv2.calcHist([hsv], [0, 1, 2], None, HISTOGRAM_BINS, [0, 180, 0, 256, 0, 256])
+    features = histogram.flatten() / max(float(histogram.sum()), 1.0)
+    return features.astype(np.float32)
+
+
+def sample_frames(path: Path, options: FrameOptions) -> Iterator[SampledFrame]:
+    """
+    Yield the sampled frames of a video, decoding it sequentially.
+
+    Frames which are neither due nor compared for scene changes are only grabbed, not converted.
+    """
+    if options.interval is None and options.scene_threshold is None:
+        raise ValueError("Frames need an interval or a scene threshold")
+
+    capture = cv2.VideoCapture(str(path))
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open {path}")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        scene_step = max(1, round(options.scene_step * fps))
+        next_due = 0.0
+        last: npt.NDArray[np.float32] | None = None
+        sampled = 0
+        index = -1
+        while sampled < options.max_frames and capture.grab():
+            index += 1
+            timestamp = index / fps
+            due = options.interval is not None and timestamp >= next_due
+            compared = options.scene_threshold is not None and index % scene_step == 0
+            if not (due or compared):
+                continue
+
+            ok, image = capture.retrieve()
+            if not ok:
+                break
+            features = frame_features(image)
+            score = 1.0
+            if last is not None:
+                score = cv2.compareHist(last, features, cv2.HISTCMP_BHATTACHARYYA)
+            scene_change = (
+                options.scene_threshold is not None
+                and compared
+                and (last is None or score >= options.scene_threshold)
+            )
+            if not (due or scene_change):
+                continue
+
+            yield SampledFrame(timestamp, image, features, score)
+            last = features
+            sampled += 1
+            if options.interval is not None:
+                # Intervals restart from the last sampled frame
+                next_due = timestamp + options.interval
+    finally:
+        capture.release()
+
+
+def thumbnail(image: npt.NDArray[Any], size: int) -> npt.NDArray[Any]:
+    """Downscale a frame to `size` pixels on its longest side."""
+    height, width = image.shape[:2]
+    scale = size / max(height, width)
+    if scale >= 1:
+        return image
+    resized: npt.NDArray[Any] = cv2.resize(
+        image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA
+    )
+    return resized
+
+
+def extract_frames(key: str, path: Path, folder: Path, options: FrameOptions) -> FrameSummary:
+    """
+    Sample the frames of a video into `folder`: thumbnails, then the features file.
+
+    Run in the worker processes, with OpenCV limited to one thread.
+    :param key: the video key, e.g. its file digest
+    :param path: the video file
+    :param folder: the output folder of the video
+    :param options: how frames are sampled
+    """
+    start = time.monotonic()
+    cv2.setNumThreads(1)
+    folder.mkdir(parents=True, exist_ok=True)
+
+    timestamps, features, scores = [], [], []
+    for index, frame in enumerate(sample_frames(path, options)):
+        image = thumbnail(frame.image, options.thumbnail_size)
+        ok, encoded = cv2.imencode(".jpeg", image, [cv2.IMWRITE_JPEG_QUALITY, options.quality])
+        if not ok:
+            raise ValueError(f"Cannot encode frame {index} of {path}")
+        (folder / f"{index:04d}.jpeg").write_bytes(encoded.tobytes())
+        timestamps.append(frame.timestamp)
+        features.append(frame.features)
+        scores.append(frame.score)
+
+    tmp_path = folder / f"{FEATURES_FILE}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            timestamps=np.array(timestamps, dtype=np.float32),
+            features=np.array(features, dtype=np.float16).reshape(len(features), -1),
+            scores=np.array(scores, dtype=np.float16),
+        )
+    os.replace(tmp_path, folder / FEATURES_FILE)
+    return FrameSummary(key, len(timestamps), time.monotonic() - start)
+
+
+def load_features(folder: Path) -> dict[str, npt.NDArray[Any]]:
+    """Load the `timestamps`, `features` and `scores` arrays of an extracted video."""
+    with np.load(folder / FEATURES_FILE) as data:
+        return {name: data[name] for name in data.files}
+
+
+class FrameExtractor:
+    """
+    Extract the frames of the videos of a `MediaStore` across a process pool.
+
+    :param store: the media store, whose `frames` folder receives the output
+    :param options: how frames are sampled
+    :param workers: the worker processes, each extracting one video at a time
+    :param max_pending: the videos submitted ahead of the workers
+    """
+
+    def __init__(
+        self,
+        store: MediaStore,
+        options: FrameOptions = FrameOptions(),
+        workers: int | None = None,
+        max_pending: int | None = None,
+    ) -> None:
+        self.store = store
+        self.options = options
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.workers
+
+        # Metrics
+        self.extracted = 0
+        self.skipped = 0
+        self.failed = 0
+        self.frames = 0
+
+    def folder(self, digest: str) -> Path:
+        """Return the output folder of a video file."""
+        return self.store.root / "frames" / digest[:2] / digest[2:4] / digest
+
+    def get(self, video_id: str) -> Path | None:
+        """Return the output folder of a video, None if not extracted."""
+        digest = self.store.index.get(video_id)
+        if digest is None or not (self.folder(digest) / FEATURES_FILE).exists():
+            return None
+        return self.folder(digest)
+
+    def run(self, video_ids: Iterable[str] | None = None) -> None:
+        """
+        Extract the downloaded videos not extracted yet.
+
+        :param video_ids: the videos to extract, None for the whole store
+        """
+        digests = dict.fromkeys(
+            self.store.index[video_id]
+            for video_id in (self.store.index if video_ids is None else video_ids)
+            if video_id in self.store.index
+        )
+        pending: set[Future[FrameSummary]] = set()
+        # A worker is replaced after a few videos, bounding what leaks across decodes
+        with ProcessPoolExecutor(self.workers, max_tasks_per_child=16) as executor:
+            for digest in digests:
+                folder = self.folder(digest)
+                if (folder / FEATURES_FILE).exists():
+                    self.skipped += 1
+                    continue
+                if len(pending) >= self.max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._collect(done)
+                pending.add(
+                    executor.submit(
+                        extract_frames, digest, self.store.path(digest), folder, self.options
+                    )
+                )
+            self._collect(wait(pending).done)
+
+    def _collect(self, done: set[Future[FrameSummary]]) -> None:
+        """Account for completed extractions."""
+        for future in done:
+            try:
+                summary = future.result()
+            except Exception as e:
+                self.failed += 1
+                _LOGGER.error("[Frames] Extraction failed -> [error: %s]", repr(e))
+                continue
+            self.extracted += 1
+            self.frames += summary.frames
+            _LOGGER.debug(
+                "[Frames] Extracted -> [key: %s, frames: %s, elapsed: %.2fs]",
+                *summary,
+            )
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the extraction metrics."""
+        return {
+            "extracted": self.extracted,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "frames": self.frames,
+        }
@@ -3,6 +3,7 @@ from typing import Any
 from pydantic import BaseModel, ConfigDict, Field
 
 from tiktok.models.apis.common import Extra, LogPb
+from tiktok.models.interning import InternedStr
 
 
 class Acl(BaseModel):
@@ -49,14 +50,14 @@ class CommentUser(BaseModel):
     Model representing a comment author's user information.
     """
 
-    nickname: str | None = None
-    sec_uid: str | None = None
-    uid: str | None = None
-    unique_id: str | None = None
+    nickname: InternedStr | None = None
+    sec_uid: InternedStr | None = None
+    uid: InternedStr | None = None
+    unique_id: InternedStr | None = None
     avatar_thumb: AvatarThumb | None = None
 
     accept_private_policy: bool | None = None
-    account_region: str | None = None
+    account_region: InternedStr | None = None
     aweme_count: int | None = None
     comment_setting: int | None = None
     create_time: int | None = None
@@ -65,8 +66,8 @@ class CommentUser(BaseModel):
     following_count: int | None = None
     is_block: bool | None = None
     is_discipline_member: bool | None = None
-    language: str | None = None
-    region: str | None = None
+    language: InternedStr | None = None
+    region: InternedStr | None = None
     signature: str | None = None
     status: int | None = None
     unique_id_modify_time: int | None = None
@@ -81,10 +82,10 @@ class Comment(BaseModel):
     """
 
     author_pin: bool | None = None
-    aweme_id: str | None = None
+    aweme_id: InternedStr | None = None
     cid: str | None = None
     collect_stat: int | None = None
-    comment_language: str | None = None
+    comment_language: InternedStr | None = None
     comment_post_item_ids: list[Any] | None = None
     create_time: int | None = None
     digg_count: int | None = None
@@ -3,6 +3,7 @@ from typing import Any, Optional
 from pydantic import BaseModel, Field
 
 from tiktok.models.common import CamelizeBaseModel, PascalizeBaseModel
+from tiktok.models.interning import InternedStr
 
 
 class Extra(CamelizeBaseModel):
@@ -97,7 +98,7 @@ class Author(CamelizeBaseModel):
     ftc: bool | None = None
     """FTC-related flag, e.g. `false` in example data."""
 
-    id: str | None = None
+    id: InternedStr | None = None
     """User's numeric ID, e.g. `"id": "7232670243117728773"` in the JSON."""
 
     is_ad_virtual: bool | None = Field(None, alias="isADVirtual")
@@ -107,7 +108,7 @@ class Author(CamelizeBaseModel):
     is_embed_banned: bool | None = None
     """Indicates if user is banned from video embedding, typically `false`."""
 
-    nickname: str | None = None
+    nickname: InternedStr | None = None
     """User's display name, e.g. `"nickname": "Cristiano\ud83c\udf13"`."""
 
     open_favorite: bool | None = None
@@ -119,19 +120,19 @@ class Author(CamelizeBaseModel):
     relation: int | None = None
     """Relationship status with logged-in user, e.g. `0` means no direct relation."""
 
-    sec_uid: str | None = None
+    sec_uid: InternedStr | None = None
     """User's security UID, e.g. `"sec_uid": "MS4wLjABAAAAXlMNlrh5..."`."""
 
     secret: bool | None = None
     """Indicates if account has additional privacy settings, e.g. `false`."""
 
-    signature: str | None = None
+    signature: InternedStr | None = None
     """User's profile bio, e.g. `"signature": "4/4 BREAKFAST CLUB..."`."""
 
     stitch_setting: int | None = None
     """User's stitch privacy setting, e.g. `0` if stitching is disabled."""
 
-    unique_id: str | None = None
+    unique_id: InternedStr | None = None
     """User's unique username, e.g. `"unique_id": "borsi___"` in the JSON."""
 
     verified: bool | None = None
@@ -271,10 +272,10 @@ class BitrateInfo(PascalizeBaseModel):
     bitrate: int | None = None
     """Video bitrate in bits per second, e.g. `1548964`."""
 
-    codec_type: str | None = None
+    codec_type: InternedStr | None = None
     """Video codec (e.g., 'h264', 'h265')."""
 
-    gear_name: str | None = None
+    gear_name: InternedStr | None = None
     """Quality tier identifier, e.g. `'adapt_lowest_1080_1'`."""
 
     play_addr: PlayAddress | None = None
@@ -306,13 +307,13 @@ class OriginalLanguageInfo(CamelizeBaseModel):
     can_translate_real_time_no_check: bool | None = None
     """Whether real-time translation is available without verification, e.g. `true`."""
 
-    language: str | None = None
+    language: InternedStr | None = None
     """Language code with region (e.g., `'ita-IT'`)."""
 
-    language_code: str | None = None
+    language_code: InternedStr | None = None
     """Two-letter language code (e.g., `'it'`)."""
 
-    language_id: str | None = Field(None, alias="languageID")
+    language_id: InternedStr | None = Field(None, alias="languageID")
     """Language ID, e.g. `"26"`."""
 
 
@@ -335,19 +336,19 @@ class SubtitleInfo(PascalizeBaseModel):
     ```
     """
 
-    format: str | None = None
+    format: InternedStr | None = None
     """Format of the subtitle file (e.g., 'webvtt', 'creator_caption')."""
 
-    language_code_name: str | None = None
+    language_code_name: InternedStr | None = None
     """Language code with region (e.g., 'eng-US', 'ita-IT')."""
 
-    language_id: str | None = Field(None, alias="LanguageID")
+    language_id: InternedStr | None = Field(None, alias="LanguageID")
     """Unique identifier for the language, e.g. `'2'` for English."""
 
     size: int | None = None
     """Size of the subtitle file in bytes, e.g. `6536`."""
 
-    source: str | None = None
+    source: InternedStr | None = None
     """Source of the subtitles, e.g., `'MT'` (machine translation) or `'ASR'`."""
 
     url: str | None = None
@@ -356,7 +357,7 @@ class SubtitleInfo(PascalizeBaseModel):
     url_expire: int | None = None
     """Timestamp when the URL expires, e.g., `1736881501`."""
 
-    version: str | None = None
+    version: InternedStr | None = None
     """Version of the subtitle format, e.g. `'4'`."""
 
 
@@ -376,7 +377,7 @@ class CaptionInfo(CamelizeBaseModel):
     ```
     """
 
-    caption_format: str | None = None
+    caption_format: InternedStr | None = None
     """Format of the caption file (e.g., 'webvtt')."""
 
     cla_subtitle_id: str | None = Field(None, alias="claSubtitleID")
@@ -391,10 +392,10 @@ class CaptionInfo(CamelizeBaseModel):
     is_original_caption: bool | None = None
     """Whether this is the original caption track, e.g. `true` or `false`."""
 
-    language: str | None = None
+    language: InternedStr | None = None
     """Language code with region (e.g., `'eng-US'`)."""
 
-    language_id: str | None = Field(None, alias="languageID")
+    language_id: InternedStr | None = Field(None, alias="languageID")
     """Language ID, e.g. `'2'`."""
 
     sub_id: str | None = Field(None, alias="subID")
@@ -502,13 +503,13 @@ class Video(CamelizeBaseModel):
     cla_info: ClaInfo | None = None
     """Video classification information (captions, original language, etc.)."""
 
-    codec_type: str | None = None
+    codec_type: InternedStr | None = None
     """Primary video codec, e.g. `'h264'` or `'h265_hvc1'`."""
 
     cover: str | None = None
     """URL of video cover image, e.g. `'https://p16-sign-va.tiktokcdn.com/obj/tos...'`."""
 
-    definition: str | None = None
+    definition: InternedStr | None = None
     """Video quality definition, e.g. `'540p'`."""
 
     download_addr: str | None = None
@@ -520,13 +521,13 @@ class Video(CamelizeBaseModel):
     dynamic_cover: str | None = None
     """URL of animated video cover, e.g. `'https://p16-sign-va.tiktokcdn.com/obj/tos-maliva-p-0068/...'`."""
 
-    encode_user_tag: str | None = None
+    encode_user_tag: InternedStr | None = None
     """User tag for video encoding, often an empty string."""
 
-    encoded_type: str | None = None
+    encoded_type: InternedStr | None = None
     """Video encoding type, e.g. `'normal'`."""
 
-    format: str | None = None
+    format: InternedStr | None = None
     """Video format, e.g. `'mp4'`."""
 
     height: int | None = None
@@ -541,13 +542,13 @@ class Video(CamelizeBaseModel):
     play_addr: str | None = None
     """Primary video playback URL, e.g. `'https://v16-webapp-prime.tiktok.com/video/tos...'`."""
 
-    ratio: str | None = None
+    ratio: InternedStr | None = None
     """Video aspect ratio (e.g., `'540p'`, `'720p'`)."""
 
     subtitle_infos: list[SubtitleInfo] = Field(default_factory=list)
     """List of subtitle info objects if any. See `SubtitleInfo`."""
 
-    video_quality: str | None = None
+    video_quality: InternedStr | None = None
     """Video quality level, e.g. `'normal'`."""
 
     volume_info: VolumeInfo | None = None
@@ -579,10 +580,10 @@ class Music(CamelizeBaseModel):
     ```
     """
 
-    album: str | None = None
+    album: InternedStr | None = None
     """Album name, e.g. `'myAlbum'` or `null` if not provided."""
 
-    author_name: str | None = None
+    author_name: InternedStr | None = None
     """Creator of the audio track, e.g. `'chubby_s_life'`."""
 
     cover_large: str | None = None
@@ -597,7 +598,7 @@ class Music(CamelizeBaseModel):
     duration: int | None = None
     """Audio duration in seconds, e.g. `57`."""
 
-    id: str | None = None
+    id: InternedStr | None = None
     """Audio track identifier, e.g. `'7368542661508549409'`."""
 
     is_copyrighted: bool | None = None
@@ -609,7 +610,7 @@ class Music(CamelizeBaseModel):
     play_url: str | None = None
     """URL for playing the audio, if available."""
 
-    title: str | None = None
+    title: InternedStr | None = None
     """Audio track title, e.g. `'son original - Cat'slife'`."""
 
 
@@ -713,13 +714,13 @@ class TextExtra(CamelizeBaseModel):
     end: int | None = None
     """End position of the text in description, e.g. `30`."""
 
-    hashtag_name: str | None = None
+    hashtag_name: InternedStr | None = None
     """Name of hashtag if present, e.g. `"cat"`."""
 
     is_commerce: bool | None = None
     """Indicates if text is commerce-related, e.g. `false`."""
 
-    sec_uid: str | None = None
+    sec_uid: InternedStr | None = None
     """Security UID of related user, e.g. `null` if no user reference."""
 
     start: int | None = None
@@ -728,10 +729,10 @@ class TextExtra(CamelizeBaseModel):
     type: int | None = None
     """Type of text extra, e.g. `1` for hashtag, `0` for mention."""
 
-    user_id: str | None = None
+    user_id: InternedStr | None = None
     """Related user ID if mention is a user, e.g. `null` or `'6834929968847143941'`."""
 
-    user_unique_id: str | None = None
+    user_unique_id: InternedStr | None = None
     """Related user unique ID, e.g. `'violasilvii'`."""
 
     sub_type: int | None = None
@@ -781,7 +782,7 @@ class Challenge(CamelizeBaseModel):
     desc: str | None = None
     """Challenge description, possibly `""` if absent."""
 
-    id: str | None = None
+    id: InternedStr | None = None
     """Challenge identifier, e.g. `"36351816"`."""
 
     profile_larger: str | None = None
@@ -793,7 +794,7 @@ class Challenge(CamelizeBaseModel):
     profile_thumb: str | None = None
     """URL to thumbnail challenge profile image."""
 
-    title: str | None = None
+    title: InternedStr | None = None
     """Challenge title/name, e.g. `"republication"`."""
 
 
@@ -921,7 +922,7 @@ class TikTokVideo(CamelizeBaseModel):
     author: Author
     """Video creator information. See `Author` model."""
 
-    backend_source_event_tracking: str | None = None
+    backend_source_event_tracking: InternedStr | None = None
     """String marker for event tracking, e.g. `"fyp_35"`."""
 
     challenges: list[Challenge] | None = None
@@ -999,7 +1000,7 @@ class TikTokVideo(CamelizeBaseModel):
     text_extra: list[TextExtra] = Field(default_factory=list)
     """Additional text information in the video description, e.g. hashtags, mentions."""
 
-    text_language: str | None = None
+    text_language: InternedStr | None = None
     """Language of video description, e.g. `"es"` or `"it"`."""
 
     text_translatable: bool | None = None
@@ -0,0 +1,178 @@
+"""
+Compaction of CDN URLs in archived payloads.
+
+Signed CDN URLs (covers, avatars, play/download addresses, bitrate URL lists...) make up the bulk
+of every archived item, and their signatures expire within hours anyway. `compact_payload`
+replaces each of them by a `[host_id, path, expiry]` triple, dropping the signed query string
+unless asked otherwise; `expand_payload` reconstructs the URLs on demand.
+"""
+
+import re
+from typing import Any, Self
+from urllib.parse import urlsplit
+
+CompactUrl = list[Any]
+"""A compacted URL: `[host_id, path, expiry]`, with `expiry` a unix timestamp or None."""
+
+URL_FIELDS = frozenset(
+    {
+        # Video
+        "cover",
+        "dynamic_cover",
+        "dynamicCover",
+        "origin_cover",
+        "originCover",
+        "play_addr",
+        "playAddr",
+        "download_addr",
+        "downloadAddr",
+        # Author
+        "avatar_larger",
+        "avatarLarger",
+        "avatar_medium",
+        "avatarMedium",
+        "avatar_thumb",
+        "avatarThumb",
+        # Music & Challenge
+        "cover_large",
+        "coverLarge",
+        "cover_larger",
+        "coverLarger",
+        "cover_medium",
+        "coverMedium",
+        "cover_thumb",
+        "coverThumb",
+        "play_url",
+        "playUrl",
+        "profile_larger",
+        "profileLarger",
+        "profile_medium",
+        "profileMedium",
+        "profile_thumb",
+        "profileThumb",
+        # Captions & subtitles
+        "url",
+        "Url",
+    }
+)
+"""Keys holding a single URL, both as field names and aliases."""
+
+URL_LIST_FIELDS = frozenset({"url_list", "urlList", "UrlList"})
+"""Keys holding a list of URLs."""
+
+URL_MAP_FIELDS = frozenset({"zoom_cover", "zoomCover"})
+"""Keys holding a `size -> URL` mapping."""
+
+_EXPIRY = re.compile(r"(?:^|&)(?:x-expires|expire)=(\d+)")
+
+
+class HostTable:
+    """A bidirectional `scheme://host <-> id` mapping, stored alongside compacted archives."""
+
+    def __init__(self, hosts: list[str] | None = None) -> None:
+        self.hosts: list[str] = list(hosts or [])
+        self._ids = {host: host_id for host_id, host in enumerate(self.hosts)}
+
+    def __len__(self) -> int:
+        return len(self.hosts)
+
+    def id_for(self, host: str) -> int:
+        """Return the id of `host`, registering it if needed."""
+        host_id = self._ids.get(host)
+        if host_id is None:
+            host_id = self._ids[host] = len(self.hosts)
+            self.hosts.append(host)
+        return host_id
+
+    def to_list(self) -> list[str]:
+        """Return the serializable form of the table."""
+        return list(self.hosts)
+
+    @classmethod
+    def from_list(cls, hosts: list[str]) -> Self:
+        """Load a table from its serializable form."""
+        return cls(hosts)
+
+
+def compact_url(url: str, hosts: HostTable, keep_query: bool = False) -> CompactUrl | str:
+    """
+    Compact `url` into `[host_id, path, expiry]`.
+
+    :param url: the URL to compact
+    :param hosts: the host table to register the URL host into
+    :param keep_query: whether to keep the (signed) query string as part of the path
+    :return: the compacted URL, or `url` itself if it is not an absolute URL
+    """
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.netloc:
+        return url
+
+    expiry = _EXPIRY.search(parts.query)
+    path = f"{parts.path}?{parts.query}" if keep_query and parts.query else parts.path
+    return [
+        hosts.id_for(f"{parts.scheme}://{parts.netloc}"),
+        path,
+        int(expiry.group(1)) if expiry else None,
+    ]
+
+
+def expand_url(compact: CompactUrl | str, hosts: HostTable) -> str:
+    """Reconstruct the URL compacted by `compact_url`."""
+    if isinstance(compact, str):
+        return compact
+
+    host_id, path, _ = compact
+    return f"{hosts.hosts[host_id]}{path}"
+
+
+def compact_payload(payload: Any, hosts: HostTable, keep_query: bool = False) -> Any:
+    """Return a copy of the JSON `payload` with every known URL field compacted."""
+    if isinstance(payload, list):
+        return [compact_payload(item, hosts, keep_query) for item in payload]
+
+    if not isinstance(payload, dict):
+        return payload
+
+    compacted: dict[str, Any] = {}
+    for key, value in payload.items():
+        if key in URL_FIELDS and isinstance(value, str):
+            compacted[key] = compact_url(value, hosts, keep_query)
+        elif key in URL_LIST_FIELDS and isinstance(value, list):
+            compacted[key] = [
+                compact_url(url, hosts, keep_query) if isinstance(url, str) else url
+                for url in value
+            ]
+        elif key in URL_MAP_FIELDS and isinstance(value, dict):
+            compacted[key] = {
+                size: compact_url(url, hosts, keep_query) if isinstance(url, str) else url
+                for size, url in value.items()
+            }
+        else:
+            compacted[key] = compact_payload(value, hosts, keep_query)
+    return compacted
+
+
+def expand_payload(payload: Any, hosts: HostTable) -> Any:
+    """Return a copy of the JSON `payload` with every URL compacted by `compact_payload` expanded."""
+    if isinstance(payload, list):
+        return [expand_payload(item, hosts) for item in payload]
+
+    if not isinstance(payload, dict):
+        return payload
+
+    expanded: dict[str, Any] = {}
+    for key, value in payload.items():
+        if key in URL_FIELDS and isinstance(value, list):
+            expanded[key] = expand_url(value, hosts)
+        elif key in URL_LIST_FIELDS and isinstance(value, list):
+            expanded[key] = [expand_url(url, hosts) for url in value]
+        elif key in URL_MAP_FIELDS and isinstance(value, dict):
+            expanded[key] = {size: expand_url(url, hosts) for size, url in value.items()}
+        else:
+            expanded[key] = expand_payload(value, hosts)
+    return expanded
+
+
+def url_expiry(compact: CompactUrl | str) -> int | None:
+    """Return the expiry timestamp of a compacted URL, if known."""
+    return None if isinstance(compact, str) else compact[2]
@@ -0,0 +1,205 @@
+"""
+Schema drift detection for raw API payloads.
+
+The response models silently ignore unknown keys, so API changes only surface when something
+breaks. `SchemaDriftMonitor` samples raw payloads, walks them alongside the declared models and
+keeps a compact per-path histogram of the observed JSON types, flagging keys that no model
+declares and values whose type does not match the declared annotation.
+"""
+
+import logging
+import types
+from collections import Counter
+from functools import cache
+from typing import Annotated, Any, Literal, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+_LOGGER = logging.getLogger(__name__)
+
+_MAP: Literal["map"] = "map"
+"""Marker for `dict[str, ...]` fields, whose keys are data rather than schema."""
+
+_Shape = type[BaseModel] | Literal["map"] | None
+"""What is expected below a key: a model, a free-form mapping or nothing we know of."""
+
+_JSON_TYPES: dict[type, frozenset[str]] = {
+    str: frozenset({"str"}),
+    int: frozenset({"int"}),
+    float: frozenset({"int", "float"}),
+    # Lax validation coerces 0/1 into booleans, which the API often sends
+    bool: frozenset({"bool", "int"}),
+    list: frozenset({"list"}),
+    dict: frozenset({"dict"}),
+}
+
+
+def _json_type(value: Any) -> str:
+    """Return the JSON type name of a decoded value."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    return type(value).__name__
+
+
+def _describe(annotation: Any) -> tuple[_Shape, frozenset[str] | None]:
+    """
+    Describe a field annotation.
+
+    :return: the shape expected below the field and the allowed JSON types (None for any)
+    """
+    origin = get_origin(annotation)
+
+    if origin is Annotated:
+        return _describe(get_args(annotation)[0])
+
+    if origin is Union or origin is types.UnionType:
+        shape: _Shape = None
+        allowed: set[str] = {"null"}
+        for arg in get_args(annotation):
+            if arg is type(None):
+                continue
+            arg_shape, arg_allowed = _describe(arg)
+            if arg_allowed is None:
+                return arg_shape or shape, None
+            shape = shape or arg_shape
+            allowed |= arg_allowed
+        return shape, frozenset(allowed)
+
+    if origin is list:
+        (item_type,) = get_args(annotation) or (Any,)
+        item_shape, _ = _describe(item_type)
+        return item_shape, _JSON_TYPES[list]
+
+    if origin is dict or annotation is dict:
+        return _MAP, _JSON_TYPES[dict]
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, _JSON_TYPES[dict]
+
+    if isinstance(annotation, type) and annotation in _JSON_TYPES:
+        return None, _JSON_TYPES[annotation]
+
+    return None, None
+
+
+@cache
+def _field_index(model: type[BaseModel]) -> dict[str, tuple[_Shape, frozenset[str] | None]]:
+    """Map every key accepted by `model` (aliases and field names) to its description."""
+    index = {}
+    for name, field in model.model_fields.items():
+        description = _describe(field.annotation)
+        for key in (name, field.alias, field.validation_alias):
+            if isinstance(key, str):
+                index[key] = description
+    return index
+
+
+class SchemaDriftMonitor:
+    """
+    A sampling monitor of the differences between raw API payloads and the declared models.
+
+    Only one in `sample_every` payloads per model is walked, and only the first
+    `max_list_items` items of each list, so the amortized cost per request stays negligible.
+    """
+
+    def __init__(
+        self, sample_every: int = 100, max_list_items: int = 5, max_paths: int = 10_000
+    ) -> None:
+        self.sample_every = sample_every
+        self.max_list_items = max_list_items
+        self.max_paths = max_paths
+
+        # Counters
+        self.payloads_seen: Counter[str] = Counter()
+        self.payloads_sampled: Counter[str] = Counter()
+        self.unknown_keys: Counter[str] = Counter()
+        self.type_mismatches: Counter[tuple[str, str]] = Counter()
+
+        # Per-path JSON type histogram
+        self.histogram: dict[str, Counter[str]] = {}
+
+    def observe(self, model: type[BaseModel], payload: Any) -> None:
+        """Account for a raw `payload` that is about to be validated into `model`."""
+        seen = self.payloads_seen[model.__name__]
+        self.payloads_seen[model.__name__] += 1
+        if seen % self.sample_every:
+            return
+
+        self.payloads_sampled[model.__name__] += 1
+        self._walk(payload, model, model.__name__)
+
+    def _walk(self, value: Any, shape: _Shape, path: str) -> None:
+        """Walk `value`, expected to have the given `shape`, updating the counters."""
+        if isinstance(value, list):
+            for item in value[: self.max_list_items]:
+                self._walk(item, shape, path + "[]")
+            return
+
+        if not isinstance(value, dict):
+            return
+
+        index = _field_index(shape) if isinstance(shape, type) else None
+        for key, child in value.items():
+            child_path = f"{path}.*" if shape == _MAP else f"{path}.{key}"
+            child_type = _json_type(child)
+            self._count(child_path, child_type)
+
+            if index is None:
+                self._walk(child, None, child_path)
+                continue
+
+            if key not in index:
+                if not self.unknown_keys[child_path]:
+                    _LOGGER.warning(
+                        "[Drift] New key -> [path: %s, type: %s]", child_path, child_type
+                    )
+                self.unknown_keys[child_path] += 1
+                self._walk(child, None, child_path)
+                continue
+
+            child_shape, allowed = index[key]
+            if allowed is not None and child_type not in allowed:
+                if not self.type_mismatches[child_path, child_type]:
+                    _LOGGER.warning(
+                        "[Drift] Type mismatch -> [path: %s, type: %s, declared: %s]",
+                        child_path,
+                        child_type,
+                        sorted(allowed),
+                    )
+                self.type_mismatches[child_path, child_type] += 1
+            self._walk(child, child_shape, child_path)
+
+    def _count(self, path: str, json_type: str) -> None:
+        """Update the type histogram of `path`, bounding the number of tracked paths."""
+        counter = self.histogram.get(path)
+        if counter is None:
+            if len(self.histogram) >= self.max_paths:
+                return
+            counter = self.histogram[path] = Counter()
+        counter[json_type] += 1
+
+    def report(self) -> dict[str, Any]:
+        """Return a summary of the observed drift."""
+        return {
+            "payloads_seen": dict(self.payloads_seen),
+            "payloads_sampled": dict(self.payloads_sampled),
+            "unknown_keys": {
+                path: {"count": count, "types": dict(self.histogram.get(path, {}))}
+                for path, count in self.unknown_keys.most_common()
+            },
+            "type_mismatches": [
+                {"path": path, "type": json_type, "count": count}
+                for (path, json_type), count in self.type_mismatches.most_common()
+            ],
+        }
+
+    def log_report(self) -> None:
+        """Log a one-line summary of the observed drift."""
+        _LOGGER.info(
+            "Drift -> [sampled: %s, unknown keys: %s, type mismatches: %s]",
+            sum(self.payloads_sampled.values()),
+            len(self.unknown_keys),
+            len(self.type_mismatches),
+        )
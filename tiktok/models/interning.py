@@ -0,0 +1,72 @@
+"""
+Bounded interning of hot string fields.
+
+Trending and search payloads repeat the same author IDs, nicknames, music titles, codecs and
+language codes over and over; every occurrence would otherwise be a distinct string object kept
+alive by the parsed models. Fields annotated with `InternedStr` share a single instance per value.
+"""
+
+import sys
+from typing import Annotated
+
+from pydantic import AfterValidator
+
+
+class StringInterner:
+    """
+    A bounded string intern table.
+
+    Unlike `sys.intern`, the table is capped: once `max_size` distinct values are stored, the
+    oldest entries are evicted first, so a long-running collector never grows it unboundedly.
+    """
+
+    def __init__(self, max_size: int = 200_000) -> None:
+        self.max_size = max_size
+        self.enabled = True
+        self._table: dict[str, str] = {}
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def intern(self, value: str) -> str:
+        """Return the shared instance equal to `value`."""
+        if not self.enabled:
+            return value
+
+        shared = self._table.get(value)
+        if shared is not None:
+            if shared is not value:
+                self.hits += 1
+                self.bytes_saved += sys.getsizeof(value)
+            return shared
+
+        if len(self._table) >= self.max_size:
+            # Dicts preserve insertion order: drop the oldest entry
+            del self._table[next(iter(self._table))]
+
+        self.misses += 1
+        self._table[value] = value
+        return value
+
+    def clear(self) -> None:
+        """Empty the table and reset the metrics."""
+        self._table.clear()
+        self.hits = self.misses = self.bytes_saved = 0
+
+
+INTERNER = StringInterner()
+"""The intern table shared by all models."""
+
+
+def intern_str(value: str) -> str:
+    """Intern `value` in the shared table."""
+    return INTERNER.intern(value)
+
+
+InternedStr = Annotated[str, AfterValidator(intern_str)]
+"""A string field whose values are interned in the shared table."""
@@ -10,10 +10,20 @@ class CommentParams(TikTokParams):
     aweme_id: AwemeId
     """The ID of the video to comment for."""
 
+    cursor: int | None = None
+    """The offset of the page to list, as returned by the previous page."""
+
     @classmethod
-    def with_video_id(cls, video_id: AwemeId, params: TikTokParams) -> Self:
+    def with_video_id(
+        cls, video_id: AwemeId, params: TikTokParams, cursor: int | None = None
+    ) -> Self:
         """Create a new CommentParams instance with the given video ID and base parameters."""
-        return cls(**params.model_dump(by_alias=True, exclude_unset=True), aweme_id=video_id)
+        comment_params = cls(
+            **params.model_dump(by_alias=True, exclude_unset=True), aweme_id=video_id
+        )
+        if cursor is not None:
+            comment_params.cursor = cursor
+        return comment_params
 
 
 class CommentDiggParams(TikTokParams):
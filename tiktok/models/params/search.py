@@ -9,7 +9,24 @@ class SearchParams(TikTokParams):
     keyword: str
     """The keyword to search for."""
 
+    offset: int | None = None
+    """The offset of the page to list, as returned by the previous page cursor."""
+
+    search_id: str | None = None
+    """The ID of the search the page belongs to, as returned by the first page `log_pb`."""
+
     @classmethod
-    def with_keyword(cls, keyword: str, params: TikTokParams) -> Self:
+    def with_keyword(
+        cls,
+        keyword: str,
+        params: TikTokParams,
+        offset: int | None = None,
+        search_id: str | None = None,
+    ) -> Self:
         """Create a new SearchParams instance with the given keyword and base parameters."""
-        return cls(**params.model_dump(by_alias=True, exclude_unset=True), keyword=keyword)
+        search_params = cls(**params.model_dump(by_alias=True, exclude_unset=True), keyword=keyword)
+        if offset is not None:
+            search_params.offset = offset
+        if search_id is not None:
+            search_params.search_id = search_id
+        return search_params
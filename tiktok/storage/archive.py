@@ -0,0 +1,366 @@
+"""
+A compressed archive of collected payloads with random access by item ID.
+
+Payloads are stored as NDJSON lines, grouped into independent zstd frames of about
+`frame_bytes` (uncompressed) each, appended to `archive-00000.zst`, `archive-00001.zst`...
+Every archive file has a sidecar index, `archive-00000.idx`: fixed-size records sorted by ID,
+
+    id (u64) | frame offset (u64) | frame size (u32) | line offset (u32) | line size (u32)
+
+mapping the ID of every item of a payload (videos of a trending response, a video, a comment) to
+the line of its payload. A lookup memory-maps the indexes, binary searches them and decompresses
+the one frame holding the payload, so its cost does not depend on the archive size.
+
+An index is written when its archive file is complete (rotated or closed). Frames flushed since
+are durable but unindexed until then; the next writer of the folder indexes such files from their
+frames, see `index_archive`.
+
+As a collector sink, a flush writes the pending lines as a (short) frame before the fsync, since
+collectors take a flushed payload as durable; the collector flushes every second, so the frames
+compress less than offline. `ArchiveWriter.flush` only fsyncs the complete frames by default,
+keeping the lines of the current frame in memory until it is full: `to_archive` (offline
+conversion from the NDJSON output) and a sink created with `flush_pending=False` write full
+frames, at the cost of up to a frame of payloads lost on a crash.
+"""
+
+import asyncio
+import logging
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Sequence
+
+import orjson
+import zstandard
+
+from tiktok.collectors.sinks import MANIFEST_FILE, iter_ndjson
+from tiktok.storage.rows import ITEM_LIST_KEYS, to_id
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_FRAME_BYTES = 2**20
+DEFAULT_MAX_FILE_BYTES = 64 * 2**20
+
+INDEX_MAGIC = b"TTARCIX1"
+INDEX_RECORD = struct.Struct("<QQIII")
+"""id, frame offset, frame size, line offset in the frame, line size."""
+
+
+def payload_ids(payload: dict[str, Any]) -> list[int]:
+    """Return the IDs of the items of a payload: videos of a response, a video or a comment."""
+    items = next((payload[key] for key in ITEM_LIST_KEYS if key in payload), None)
+    ids = []
+    for item in [payload] if items is None else items:
+        item_id = to_id(item.get("id") or item.get("cid"))
+        if item_id is not None:
+            ids.append(item_id)
+    return ids
+
+
+def write_index(path: Path, entries: list[tuple[int, int, int, int, int]]) -> None:
+    """Atomically write the sorted index of an archive file."""
+    entries.sort(key=lambda entry: entry[0])
+    tmp_file = path.with_suffix(".idx.tmp")
+    with open(tmp_file, "wb") as f:
+        f.write(INDEX_MAGIC)
+        f.write(b"".join(INDEX_RECORD.pack(*entry) for entry in entries))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+
+
+def iter_frames(data_file: Path) -> Iterator[tuple[int, int, bytes]]:
+    """Yield the (offset, size, decompressed content) of the frames of an archive file."""
+    data = memoryview(data_file.read_bytes())
+    offset = 0
+    while offset < len(data):
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+        content = decompressor.decompress(data[offset:])
+        if not decompressor.eof:
+            # A torn last frame
+            _LOGGER.warning(
+                "[Archive] Truncated frame -> [file: %s, offset: %s]", data_file, offset
+            )
+            return
+        size = len(data) - offset - len(decompressor.unused_data)
+        yield offset, size, content
+        offset += size
+
+
+def index_archive(data_file: Path) -> int:
+    """
+    Index an archive file from its frames, dropping a torn last frame.
+
+    :param data_file: the `.zst` archive file
+    :return: the number of indexed IDs
+    """
+    entries = []
+    end = 0
+    for offset, size, content in iter_frames(data_file):
+        line_offset = 0
+        for line in content.splitlines(keepends=True):
+            for item_id in payload_ids(orjson.loads(line)):
+                entries.append((item_id, offset, size, line_offset, len(line)))
+            line_offset += len(line)
+        end = offset + size
+
+    if data_file.stat().st_size > end:
+        os.truncate(data_file, end)
+    write_index(data_file.with_suffix(".idx"), entries)
+    return len(entries)
+
+
+class ArchiveWriter:
+    """
+    A writer of payloads to a frame-compressed archive folder.
+
+    :param output_path: the archive folder
+    :param name: the file prefix
+    :param frame_bytes: the uncompressed bytes of a frame, i.e. what a lookup decompresses
+    :param max_file_bytes: the compressed bytes of an archive file, rounded up to whole frames
+    :param level: the zstd compression level
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        name: str = "archive",
+        frame_bytes: int = DEFAULT_FRAME_BYTES,
+        max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+        level: int = 3,
+    ) -> None:
+        self.output_path = output_path
+        self.name = name
+        self.frame_bytes = frame_bytes
+        self.max_file_bytes = max_file_bytes
+        self.compressor = zstandard.ZstdCompressor(level=level)
+
+        # The lines of the current frame, with the IDs of their payload
+        self._lines: list[tuple[bytes, list[int]]] = []
+        self._frame_size = 0
+        self._file: Any = None
+        self._data_file: Path | None = None
+        self._entries: list[tuple[int, int, int, int, int]] = []
+
+        # Metrics
+        self.payloads_written = 0
+        self.bytes_in = 0
+        self.bytes_written = 0
+        self.frames = 0
+
+    def add(self, payloads: Iterable[dict[str, Any]]) -> None:
+        """Add payloads, writing a frame every `frame_bytes`."""
+        for payload in payloads:
+            line = orjson.dumps(payload) + b"\n"
+            self._lines.append((line, payload_ids(payload)))
+            self._frame_size += len(line)
+            self.payloads_written += 1
+            if self._frame_size >= self.frame_bytes:
+                self._write_frame()
+
+    def flush(self, pending: bool = False) -> None:
+        """
+        Fsync the written frames.
+
+        :param pending: whether to first write the pending lines as a (short) frame
+        """
+        if pending:
+            self._write_frame()
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """Write the pending lines and complete the current file with its index."""
+        self._write_frame()
+        self._close_file()
+
+    def _write_frame(self) -> None:
+        """Compress the pending lines into one frame."""
+        if not self._lines:
+            return
+        if self._file is None:
+            self._open_file()
+
+        frame = self.compressor.compress(b"".join(line for line, _ in self._lines))
+        offset = self._file.tell()
+        self._file.write(frame)
+        line_offset = 0
+        for line, ids in self._lines:
+            for item_id in ids:
+                self._entries.append((item_id, offset, len(frame), line_offset, len(line)))
+            line_offset += len(line)
+
+        self.bytes_in += self._frame_size
+        self.bytes_written += len(frame)
+        self.frames += 1
+        self._lines, self._frame_size = [], 0
+
+        if offset + len(frame) >= self.max_file_bytes:
+            self._close_file()
+
+    def _open_file(self) -> None:
+        """Start a new archive file, indexing the files left unindexed by a crashed writer."""
+        self.output_path.mkdir(parents=True, exist_ok=True)
+        data_files = sorted(self.output_path.glob(f"{self.name}-*.zst"))
+        for data_file in data_files:
+            if not data_file.with_suffix(".idx").exists():
+                count = index_archive(data_file)
+                _LOGGER.info("[Archive] Indexed file -> [file: %s, ids: %s]", data_file.name, count)
+
+        self._data_file = self.output_path / f"{self.name}-{len(data_files):05d}.zst"
+        self._file = open(self._data_file, "ab")
+        self._entries = []
+
+    def _close_file(self) -> None:
+        """Fsync the current file and write its index."""
+        if self._file is None or self._data_file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        write_index(self._data_file.with_suffix(".idx"), self._entries)
+        _LOGGER.info(
+            "[Archive] Wrote file -> [file: %s, ids: %s]", self._data_file.name, len(self._entries)
+        )
+        self._file, self._data_file, self._entries = None, None, []
+
+
+class ArchiveSink:
+    """
+    A collector sink writing payloads to an archive, compressed off the event loop.
+
+    :param flush_pending: whether `flush` writes the pending lines as a frame, making every
+     flushed payload durable. Only disable it when another sink (e.g. a `NdjsonSink`) is the
+     durable log: flushes then only fsync the complete frames, which compress better
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        frame_bytes: int = DEFAULT_FRAME_BYTES,
+        max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+        level: int = 3,
+        flush_pending: bool = True,
+    ) -> None:
+        self.writer = ArchiveWriter(output_path, "archive", frame_bytes, max_file_bytes, level)
+        self.flush_pending = flush_pending
+
+    @property
+    def bytes_written(self) -> int:
+        """The compressed bytes written."""
+        return self.writer.bytes_written
+
+    async def write(self, payloads: Sequence[dict[str, Any]]) -> None:
+        """Add payloads, compressing and writing full frames in a thread."""
+        await asyncio.to_thread(self.writer.add, payloads)
+
+    async def flush(self) -> None:
+        """Write the pending payloads, then fsync; they are indexed once their file completes."""
+        await asyncio.to_thread(self.writer.flush, self.flush_pending)
+
+    async def close(self) -> None:
+        """Write the pending payloads and index the current file."""
+        await asyncio.to_thread(self.writer.close)
+
+
+class ArchiveReader:
+    """
+    Random access to the payloads of an archive folder by item ID.
+
+    Only indexed files are read; the indexes are memory-mapped, never loaded.
+    """
+
+    def __init__(self, output_path: Path, name: str = "archive") -> None:
+        self.output_path = output_path
+        # (data file descriptor, index map, record count), newest file first
+        self.files: list[tuple[int, mmap.mmap, int]] = []
+        for index_file in sorted(output_path.glob(f"{name}-*.idx"), reverse=True):
+            with open(index_file, "rb") as f:
+                if os.fstat(f.fileno()).st_size <= len(INDEX_MAGIC):
+                    continue
+                index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if index[: len(INDEX_MAGIC)] != INDEX_MAGIC:
+                raise ValueError(f"Not an archive index: {index_file}")
+            count = (len(index) - len(INDEX_MAGIC)) // INDEX_RECORD.size
+            fd = os.open(index_file.with_suffix(".zst"), os.O_RDONLY)
+            self.files.append((fd, index, count))
+        self.decompressor = zstandard.ZstdDecompressor()
+
+    def close(self) -> None:
+        """Release the files."""
+        for fd, index, _ in self.files:
+            index.close()
+            os.close(fd)
+        self.files = []
+
+    def __enter__(self) -> "ArchiveReader":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return sum(count for _, _, count in self.files)
+
+    def get(self, item_id: int) -> dict[str, Any] | None:
+        """Return the last archived payload holding the item, None if not archived."""
+        for fd, index, count in self.files:
+            record = self._search(index, count, item_id)
+            if record is None:
+                continue
+            _, frame_offset, frame_size, line_offset, line_size = record
+            frame = self.decompressor.decompress(os.pread(fd, frame_size, frame_offset))
+            payload: dict[str, Any] = orjson.loads(frame[line_offset : line_offset + line_size])
+            return payload
+        return None
+
+    def get_item(self, item_id: int) -> dict[str, Any] | None:
+        """Return the item itself (e.g. the video of a trending response), None if not archived."""
+        payload = self.get(item_id)
+        if payload is None:
+            return None
+        items = next((payload[key] for key in ITEM_LIST_KEYS if key in payload), None)
+        for item in [payload] if items is None else items:
+            if to_id(item.get("id") or item.get("cid")) == item_id:
+                return item
+        return None
+
+    @staticmethod
+    def _search(index: mmap.mmap, count: int, item_id: int) -> tuple[int, ...] | None:
+        """Binary search the last record of `item_id` in an index."""
+        low, high = 0, count
+        # The first record with a greater ID
+        while low < high:
+            middle = (low + high) // 2
+            (record_id,) = struct.unpack_from(
+                "<Q", index, len(INDEX_MAGIC) + middle * INDEX_RECORD.size
+            )
+            if record_id <= item_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low == 0:
+            return None
+        record = INDEX_RECORD.unpack_from(index, len(INDEX_MAGIC) + (low - 1) * INDEX_RECORD.size)
+        return record if record[0] == item_id else None
+
+
+def to_archive(
+    output_path: Path, destination: Path, frame_bytes: int = DEFAULT_FRAME_BYTES
+) -> ArchiveWriter:
+    """
+    Archive the output folder of a `NdjsonSink`, streaming.
+
+    :param output_path: a folder written by a `NdjsonSink`
+    :param destination: the archive folder
+    :param frame_bytes: the uncompressed bytes of a frame
+    :return: the writer, with its metrics
+    """
+    if not (output_path / MANIFEST_FILE).exists():
+        raise FileNotFoundError(f"No {MANIFEST_FILE} in {output_path}")
+    writer = ArchiveWriter(destination, frame_bytes=frame_bytes)
+    writer.add(iter_ndjson(output_path))
+    writer.close()
+    return writer
@@ -0,0 +1,331 @@
+"""
+A content-addressed store of raw API payloads.
+
+A payload is stored once under the SHA-256 digest of its canonical JSON (sorted keys),
+zstd-compressed, in directories sharded by the first digest bytes:
+
+    blobs/3f/a2/3fa2...e9.zst
+
+Item lists (`item_list`, `itemList`, `comments`) are split off: each item is stored as its own
+blob and replaced by a `{"$blob": digest}` reference, so a video served in many responses, cycles
+or sessions is stored once while each response keeps only its envelope. `get` resolves the
+references back into the original payload.
+
+Blobs are immutable and never reference-counted in place: `collect_garbage` marks the blobs
+reachable from the digests still referenced (bot logs, collector outputs, see `find_references`)
+and sweeps the others. A crash can thus only leave unreferenced blobs, collected by the next
+sweep, never a referenced blob missing.
+
+Sweeping runs alongside writers: a `put` deduplicated against an old blob refreshes its mtime,
+which keeps it for the grace period until the new reference is written. The sweep renames a blob
+to a trash file before deleting it and checks its mtime again after the rename, so a refresh
+landing between the first check and the deletion restores the blob, while a `put` after the
+rename finds no blob and writes it again.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from hashlib import sha256
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Sequence
+
+import orjson
+import zstandard
+
+from tiktok.collectors.sinks import NdjsonSink
+
+_LOGGER = logging.getLogger(__name__)
+
+SPLIT_KEYS = ("item_list", "itemList", "comments")
+"""The item lists whose items are stored as separate blobs."""
+
+REFERENCE_KEY = "$blob"
+
+TRASH_SUFFIX = ".trash"
+
+
+def canonical_json(payload: Any) -> bytes:
+    """Return the canonical encoding of a payload, which its digest is computed on."""
+    return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS, default=str)
+
+
+def is_reference(value: Any) -> bool:
+    """Whether `value` is a reference to a split-off blob."""
+    return isinstance(value, dict) and len(value) == 1 and REFERENCE_KEY in value
+
+
+class BlobStore:
+    """
+    A content-addressed payload store on the local filesystem.
+
+    Safe to share between threads and processes: blobs are written to a temporary file and
+    renamed into place, so a blob is either complete or missing.
+    :param root: the store folder
+    :param level: the zstd compression level
+    :param fsync: whether to fsync new blobs before publishing them
+    """
+
+    def __init__(self, root: Path, level: int = 3, fsync: bool = True) -> None:
+        self.root = root
+        self.level = level
+        self.fsync = fsync
+        # zstd contexts cannot be shared by concurrent threads
+        self._local = threading.local()
+
+        # Metrics
+        self.puts = 0
+        self.deduplicated = 0
+        self.bytes_in = 0
+        self.bytes_written = 0
+
+    def path(self, digest: str) -> Path:
+        """Return the file of a blob."""
+        return self.root / digest[:2] / digest[2:4] / f"{digest}.zst"
+
+    def __contains__(self, digest: str) -> bool:
+        return self.path(digest).exists()
+
+    def put(self, payload: dict[str, Any]) -> str:
+        """
+        Store a payload, splitting off its items.
+
+        :param payload: the JSON payload
+        :return: the digest of the payload, its reference in logs and outputs
+        """
+        envelope = dict(payload)
+        for key in SPLIT_KEYS:
+            items = envelope.get(key)
+            if isinstance(items, list):
+                envelope[key] = [
+                    {REFERENCE_KEY: self.put_bytes(canonical_json(item))}
+                    if isinstance(item, dict)
+                    else item
+                    for item in items
+                ]
+        return self.put_bytes(canonical_json(envelope))
+
+    def put_bytes(self, data: bytes) -> str:
+        """Store raw bytes, unless already stored, and return their digest."""
+        digest = sha256(data).hexdigest()
+        self.puts += 1
+        self.bytes_in += len(data)
+        path = self.path(digest)
+        if path.exists():
+            # Refresh the blob, so a concurrent sweep keeps it until referenced
+            try:
+                os.utime(path)
+                self.deduplicated += 1
+                return digest
+            except FileNotFoundError:
+                pass
+
+        compressed = self._compressor().compress(data)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_file, "wb") as f:
+            f.write(compressed)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+        self.bytes_written += len(compressed)
+        return digest
+
+    def get_bytes(self, digest: str) -> bytes:
+        """Return the raw bytes of a blob, raising `KeyError` if missing."""
+        try:
+            compressed = self.path(digest).read_bytes()
+        except FileNotFoundError:
+            raise KeyError(digest) from None
+        return bytes(self._decompressor().decompress(compressed))
+
+    def get(self, digest: str) -> dict[str, Any]:
+        """Return a payload, with its split-off items resolved."""
+        payload: dict[str, Any] = orjson.loads(self.get_bytes(digest))
+        for key in SPLIT_KEYS:
+            items = payload.get(key)
+            if isinstance(items, list):
+                payload[key] = [
+                    orjson.loads(self.get_bytes(item[REFERENCE_KEY]))
+                    if is_reference(item)
+                    else item
+                    for item in items
+                ]
+        return payload
+
+    def children(self, digest: str) -> list[str]:
+        """Return the digests of the items split off a payload."""
+        payload = orjson.loads(self.get_bytes(digest))
+        if not isinstance(payload, dict):
+            return []
+        return [
+            item[REFERENCE_KEY]
+            for key in SPLIT_KEYS
+            if isinstance(payload.get(key), list)
+            for item in payload[key]
+            if is_reference(item)
+        ]
+
+    def digests(self) -> Iterator[str]:
+        """Yield the digest of every stored blob."""
+        for path in self.root.glob("??/??/*.zst"):
+            yield path.name.removesuffix(".zst")
+
+    def collect_garbage(self, references: Iterable[str], grace: float = 3600.0) -> int:
+        """
+        Delete the blobs unreachable from `references`.
+
+        :param references: the digests still referenced, e.g. from `find_references`
+        :param grace: the age (in seconds) under which a blob is kept anyway, as its reference
+         may not be written yet
+        :return: the number of deleted blobs
+        """
+        live = set()
+        for digest in references:
+            if digest in live:
+                continue
+            live.add(digest)
+            try:
+                live.update(self.children(digest))
+            except KeyError:
+                _LOGGER.warning("[Blobs] Missing referenced blob -> [digest: %s]", digest)
+
+        deleted = 0
+        cutoff = time.time() - grace
+        for path in self.root.glob("??/??/*"):
+            try:
+                if path.name.endswith(TRASH_SUFFIX):
+                    # Left by an interrupted sweep
+                    blob = path.with_name(path.name.removesuffix(TRASH_SUFFIX))
+                    if blob.name.removesuffix(".zst") in live or path.stat().st_mtime > cutoff:
+                        os.replace(path, blob)
+                    else:
+                        path.unlink()
+                        deleted += 1
+                    continue
+                if path.name.removesuffix(".zst") in live or path.stat().st_mtime > cutoff:
+                    continue
+                deleted += self._sweep(path, cutoff)
+            except FileNotFoundError:
+                # Swept or replaced concurrently
+                continue
+        _LOGGER.info("[Blobs] Collected garbage -> [live: %s, deleted: %s]", len(live), deleted)
+        return deleted
+
+    def _sweep(self, path: Path, cutoff: float) -> bool:
+        """Delete an unreferenced blob, unless a `put` refreshed it since it was checked."""
+        trash = path.with_name(path.name + TRASH_SUFFIX)
+        os.rename(path, trash)
+        # A refresh before the rename shows; a `put` after it finds no blob and writes it again
+        if trash.stat().st_mtime > cutoff:
+            os.replace(trash, path)
+            return False
+        trash.unlink()
+        return True
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        compressor: zstandard.ZstdCompressor | None = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+        return compressor
+
+    def _decompressor(self) -> zstandard.ZstdDecompressor:
+        decompressor: zstandard.ZstdDecompressor | None = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = self._local.decompressor = zstandard.ZstdDecompressor()
+        return decompressor
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the write metrics."""
+        return {
+            "puts": self.puts,
+            "deduplicated": self.deduplicated,
+            "bytes_in": self.bytes_in,
+            "bytes_written": self.bytes_written,
+        }
+
+
+class BlobSink:
+    """
+    A collector sink storing payloads in a `BlobStore`.
+
+    The digests are appended to `blobs-*.ndjson` files in `output_path`, the references of the
+    run kept alive by `collect_garbage`.
+    """
+
+    def __init__(self, store: BlobStore, output_path: Path) -> None:
+        self.store = store
+        self.references = NdjsonSink(output_path, "blobs", max_file_bytes=None)
+
+    @property
+    def bytes_written(self) -> int:
+        """The compressed bytes of the new blobs."""
+        return self.store.bytes_written
+
+    async def write(self, payloads: Sequence[dict[str, Any]]) -> None:
+        """Store payloads off the event loop, then reference them."""
+        digests = await asyncio.to_thread(lambda: [self.store.put(p) for p in payloads])
+        await self.references.write([{"digest": digest} for digest in digests])
+
+    async def flush(self) -> None:
+        """Persist the references; their blobs were stored before being referenced."""
+        await self.references.flush()
+
+    async def close(self) -> None:
+        """Close the references."""
+        await self.references.close()
+
+
+def find_references(folders: Iterable[Path]) -> set[str]:
+    """
+    Return the digests referenced by the bot logs and blob sinks under `folders`.
+
+    :param folders: folders holding `bot_activity_*.json` logs and/or `blobs-*.ndjson` outputs
+    """
+    references = set()
+    for folder in folders:
+        for log_file in folder.rglob("bot_activity_*.json"):
+            log = orjson.loads(log_file.read_bytes())
+            for cycle in log.get("cycles", []):
+                for response in cycle.get("api_responses", []):
+                    if response.get("response_digest"):
+                        references.add(response["response_digest"])
+                for action in cycle.get("actions", []):
+                    digest = (action.get("api_response") or {}).get("response_digest")
+                    if digest:
+                        references.add(digest)
+        for references_file in folder.rglob("blobs-*.ndjson"):
+            with open(references_file, "rb") as f:
+                for line in f:
+                    try:
+                        references.add(orjson.loads(line)["digest"])
+                    except (orjson.JSONDecodeError, KeyError):
+                        # A blank or torn line, after the last flush
+                        continue
+    return references
+
+
+def iter_logged_responses(
+    log_dir: Path, endpoints: Sequence[str] | None = None
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    """
+    Yield the (endpoint, payload) of the successful API responses logged by the bot.
+
+    Payloads are read inline from older logs, or from the `blobs` store of `log_dir`.
+    :param log_dir: the bot log folder
+    :param endpoints: the endpoints to keep, None for all
+    """
+    store = BlobStore(log_dir / "blobs")
+    for log_file in sorted(log_dir.glob("bot_activity_*.json")):
+        log = orjson.loads(log_file.read_bytes())
+        for cycle in log["cycles"]:
+            for response in cycle["api_responses"]:
+                if endpoints is not None and response["endpoint"] not in endpoints:
+                    continue
+                if response.get("response_data"):
+                    yield response["endpoint"], response["response_data"]
+                elif response.get("response_digest"):
+                    yield response["endpoint"], store.get(response["response_digest"])
@@ -0,0 +1,249 @@
+"""
+Columnar Parquet export of collected videos and comments.
+
+Payloads are flattened (`tiktok.storage.rows.flat_records`) into one wide record per video or
+comment, with author, music, video dimensions and stats as columns and hashtags as a list
+column. Records are buffered up to one row group, sorted by `create_time`, then written with
+dictionary encoding and zstd compression. At most one row group is held in memory.
+
+Collected videos arrive in no `create_time` order, so every row group spans most of the creation
+times and its min/max statistics cannot skip it. The sort pays off within row groups instead:
+the files carry a page index, whose per-page statistics cover narrow `create_time` ranges, so
+readers using it (e.g. Spark or DataFusion) only decode the pages matching a `create_time`
+filter.
+
+Files are rotated every `max_file_rows` records. A file is written as `.parquet.tmp` and renamed
+once its footer is written, so readers of the folder only ever see complete files.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Iterable, Sequence
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from tiktok.collectors.sinks import MANIFEST_FILE, iter_ndjson
+from tiktok.storage.rows import flat_records
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_ROW_GROUP_ROWS = 128 * 1024
+
+_TIMESTAMP = pa.timestamp("s", tz="UTC")
+
+VIDEO_SCHEMA = pa.schema(
+    [
+        pa.field("id", pa.int64(), nullable=False),
+        pa.field("create_time", _TIMESTAMP),
+        pa.field("observed_at", _TIMESTAMP),
+        pa.field("description", pa.string()),
+        pa.field("text_language", pa.string()),
+        pa.field("author_id", pa.int64()),
+        pa.field("author_unique_id", pa.string()),
+        pa.field("author_nickname", pa.string()),
+        pa.field("author_verified", pa.bool_()),
+        pa.field("music_id", pa.int64()),
+        pa.field("music_title", pa.string()),
+        pa.field("music_author_name", pa.string()),
+        pa.field("music_original", pa.bool_()),
+        pa.field("video_duration", pa.int32()),
+        pa.field("video_width", pa.int32()),
+        pa.field("video_height", pa.int32()),
+        pa.field("video_ratio", pa.string()),
+        pa.field("video_definition", pa.string()),
+        pa.field("play_count", pa.int64()),
+        pa.field("digg_count", pa.int64()),
+        pa.field("comment_count", pa.int64()),
+        pa.field("share_count", pa.int64()),
+        pa.field("collect_count", pa.int64()),
+        pa.field("hashtags", pa.list_(pa.string())),
+    ]
+)
+COMMENT_SCHEMA = pa.schema(
+    [
+        pa.field("id", pa.int64(), nullable=False),
+        pa.field("create_time", _TIMESTAMP),
+        pa.field("video_id", pa.int64()),
+        pa.field("reply_id", pa.int64()),
+        pa.field("text", pa.string()),
+        pa.field("language", pa.string()),
+        pa.field("author_id", pa.int64()),
+        pa.field("author_unique_id", pa.string()),
+        pa.field("digg_count", pa.int64()),
+        pa.field("reply_count", pa.int64()),
+    ]
+)
+
+DICTIONARY_COLUMNS = (
+    "text_language",
+    "author_unique_id",
+    "author_nickname",
+    "music_title",
+    "music_author_name",
+    "video_ratio",
+    "video_definition",
+    "hashtags",
+    "language",
+)
+"""The low-cardinality columns, dictionary-encoded."""
+
+_EPOCH = datetime.fromtimestamp(0, UTC)
+
+
+class ParquetExport:
+    """
+    A streaming Parquet writer of flattened payloads.
+
+    :param output_path: the folder of the Parquet files
+    :param kind: the payload kind: `trending` (responses, into videos), `videos` or `comments`
+    :param row_group_rows: the records of a row group, i.e. the records held in memory
+    :param max_file_rows: the records of a file, rounded up to whole row groups
+    :param compression_level: the zstd level, None for the default
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        kind: str = "trending",
+        row_group_rows: int = DEFAULT_ROW_GROUP_ROWS,
+        max_file_rows: int = 8 * DEFAULT_ROW_GROUP_ROWS,
+        compression_level: int | None = None,
+    ) -> None:
+        self.output_path = output_path
+        self.kind = kind
+        self.name = "comments" if kind == "comments" else "videos"
+        self.schema = COMMENT_SCHEMA if kind == "comments" else VIDEO_SCHEMA
+        self.row_group_rows = row_group_rows
+        self.max_file_rows = max_file_rows
+        self.compression_level = compression_level
+
+        self._records: list[dict[str, Any]] = []
+        self._writer: pq.ParquetWriter | None = None
+        self._tmp_file: Path | None = None
+        self._file_rows = 0
+
+        # Metrics
+        self.rows_written = 0
+        self.row_groups = 0
+        self.files: list[Path] = []
+
+    def add(self, payloads: Iterable[dict[str, Any]]) -> None:
+        """Add payloads, writing a row group every `row_group_rows` records."""
+        for payload in payloads:
+            self._records.extend(flat_records(self.kind, payload))
+            while len(self._records) >= self.row_group_rows:
+                group = self._records[: self.row_group_rows]
+                del self._records[: self.row_group_rows]
+                self._write_group(group)
+
+    def close(self) -> None:
+        """Write the buffered records and complete the current file."""
+        if self._records:
+            self._write_group(self._records)
+            self._records = []
+        self._close_file()
+
+    def _write_group(self, records: list[dict[str, Any]]) -> None:
+        """Write the records as one row group, sorted by creation time."""
+        records.sort(key=lambda record: record["create_time"] or _EPOCH)
+        if self._writer is None:
+            self._open_file()
+        assert self._writer is not None
+
+        table = pa.Table.from_pylist(records, schema=self.schema)
+        self._writer.write_table(table, row_group_size=len(records))
+        self._file_rows += len(records)
+        self.rows_written += len(records)
+        self.row_groups += 1
+
+        if self._file_rows >= self.max_file_rows:
+            self._close_file()
+
+    def _open_file(self) -> None:
+        """Start a new file."""
+        self.output_path.mkdir(parents=True, exist_ok=True)
+        index = len(list(self.output_path.glob(f"{self.name}-*.parquet")))
+        self._tmp_file = self.output_path / f"{self.name}-{index:05d}.parquet.tmp"
+        self._writer = pq.ParquetWriter(
+            self._tmp_file,
+            self.schema,
+            compression="zstd",
+            compression_level=self.compression_level,
+            use_dictionary=[name for name in DICTIONARY_COLUMNS if name in self.schema.names],
+            write_statistics=True,
+            write_page_index=True,
+        )
+        self._file_rows = 0
+
+    def _close_file(self) -> None:
+        """Write the footer of the current file and publish it."""
+        if self._writer is None or self._tmp_file is None:
+            return
+        self._writer.close()
+        path = self._tmp_file.with_suffix("")
+        os.replace(self._tmp_file, path)
+        self.files.append(path)
+        _LOGGER.info("Wrote Parquet file -> [file: %s, rows: %s]", path.name, self._file_rows)
+        self._writer, self._tmp_file = None, None
+
+
+class ParquetSink:
+    """
+    A collector sink exporting payloads to Parquet, written off the event loop.
+
+    Parquet files are only readable once complete: records become visible when their file is
+    rotated or the sink closed, so `flush` does not make them durable. Keep the NDJSON output as
+    the durable log and use this sink as a columnar copy.
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        kind: str = "trending",
+        row_group_rows: int = DEFAULT_ROW_GROUP_ROWS,
+        max_file_rows: int = 8 * DEFAULT_ROW_GROUP_ROWS,
+    ) -> None:
+        self.export = ParquetExport(output_path, kind, row_group_rows, max_file_rows)
+
+    async def write(self, payloads: Sequence[dict[str, Any]]) -> None:
+        """Add payloads, encoding and writing full row groups in a thread."""
+        await asyncio.to_thread(self.export.add, payloads)
+
+    async def flush(self) -> None:
+        """Nothing to flush before a file is complete."""
+
+    async def close(self) -> None:
+        """Write the buffered records and complete the current file."""
+        await asyncio.to_thread(self.export.close)
+
+
+def to_parquet(
+    output_path: Path,
+    destination: Path,
+    kind: str = "trending",
+    row_group_rows: int = DEFAULT_ROW_GROUP_ROWS,
+) -> int:
+    """
+    Convert a collector output folder to Parquet, in bounded memory.
+
+    :param output_path: a folder written by a `NdjsonSink`, or holding a legacy `trending.json`
+    :param destination: the folder of the Parquet files
+    :param kind: the payload kind: `trending` (responses, into videos), `videos` or `comments`
+    :param row_group_rows: the records of a row group
+    :return: the number of written records
+    """
+    if (output_path / MANIFEST_FILE).exists():
+        payloads: Iterable[dict[str, Any]] = iter_ndjson(output_path)
+    else:
+        # Legacy single-array output, which cannot be streamed
+        payloads = json.loads((output_path / "trending.json").read_bytes())
+
+    export = ParquetExport(destination, kind, row_group_rows)
+    export.add(payloads)
+    export.close()
+    return export.rows_written
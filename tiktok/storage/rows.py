@@ -0,0 +1,358 @@
+"""
+Normalization of collected payloads into relational rows.
+
+Payloads are the JSON dumps written by the collectors: trending responses, videos (e.g. search
+items) and comments. They are split into the rows of a normalized schema:
+
+    authors, music, hashtags -> videos -> video_hashtags, video_stats
+    comments (by video)
+
+A `RowBatch` accumulates the rows of many payloads, keeping the last version of each row by
+primary key, so a batch can be upserted in one statement per table.
+
+For columnar exports, `flat_video` and `flat_comment` flatten a video or comment into a single
+wide record instead.
+"""
+
+from datetime import UTC, datetime
+from typing import Any, Callable, Iterable, NamedTuple
+
+ITEM_LIST_KEYS = ("item_list", "itemList")
+
+
+class Table(NamedTuple):
+    """A table of the normalized schema."""
+
+    name: str
+    columns: tuple[str, ...]
+    key: tuple[str, ...]
+    """The primary key columns, a prefix of `columns`."""
+
+    @property
+    def values(self) -> tuple[str, ...]:
+        """The non-key columns, updated on conflict."""
+        return self.columns[len(self.key) :]
+
+
+AUTHORS = Table(
+    "authors",
+    (
+        "id",
+        "unique_id",
+        "nickname",
+        "sec_uid",
+        "signature",
+        "verified",
+        "private_account",
+        "updated_at",
+    ),
+    ("id",),
+)
+MUSIC = Table(
+    "music",
+    ("id", "title", "author_name", "album", "duration", "original", "updated_at"),
+    ("id",),
+)
+HASHTAGS = Table("hashtags", ("id", "title", "description", "updated_at"), ("id",))
+VIDEOS = Table(
+    "videos",
+    (
+        "id",
+        "author_id",
+        "music_id",
+        "description",
+        "create_time",
+        "duration",
+        "text_language",
+        "updated_at",
+    ),
+    ("id",),
+)
+VIDEO_HASHTAGS = Table("video_hashtags", ("video_id", "hashtag_id"), ("video_id", "hashtag_id"))
+VIDEO_STATS = Table(
+    "video_stats",
+    (
+        "video_id",
+        "observed_at",
+        "play_count",
+        "digg_count",
+        "comment_count",
+        "share_count",
+        "collect_count",
+    ),
+    ("video_id", "observed_at"),
+)
+COMMENTS = Table(
+    "comments",
+    (
+        "id",
+        "video_id",
+        "author_id",
+        "reply_id",
+        "text",
+        "language",
+        "digg_count",
+        "reply_count",
+        "create_time",
+        "updated_at",
+    ),
+    ("id",),
+)
+
+TABLES = (AUTHORS, MUSIC, HASHTAGS, VIDEOS, VIDEO_HASHTAGS, VIDEO_STATS, COMMENTS)
+"""Every table, referenced tables first."""
+
+
+def to_id(value: Any) -> int | None:
+    """Return a TikTok ID as a 64-bit integer, None if missing or not numeric."""
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def to_time(timestamp: Any) -> datetime | None:
+    """Return a Unix timestamp (in seconds) as an aware datetime."""
+    return datetime.fromtimestamp(timestamp, UTC) if timestamp else None
+
+
+class RowBatch:
+    """The rows of a group of payloads, deduplicated by primary key."""
+
+    def __init__(self) -> None:
+        self.rows: dict[str, dict[tuple[Any, ...], tuple[Any, ...]]] = {
+            table.name: {} for table in TABLES
+        }
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self.rows.values())
+
+    def records(self, table: Table) -> list[tuple[Any, ...]]:
+        """The rows of `table`."""
+        return list(self.rows[table.name].values())
+
+    def add_row(self, table: Table, row: tuple[Any, ...]) -> None:
+        """Add a row, replacing any row with the same key."""
+        self.rows[table.name][row[: len(table.key)]] = row
+
+    def add_trending(self, payload: dict[str, Any]) -> None:
+        """Add the videos of a trending response, observed when it was served."""
+        now = (payload.get("extra") or {}).get("now")
+        observed_at = datetime.fromtimestamp(now / 1000, UTC) if now else datetime.now(UTC)
+        items = next((payload[key] for key in ITEM_LIST_KEYS if key in payload), None) or []
+        for item in items:
+            self.add_video(item, observed_at)
+
+    def add_video(self, item: dict[str, Any], observed_at: datetime | None = None) -> None:
+        """Add a video with its author, music, hashtags and stats snapshot."""
+        video_id = to_id(item.get("id"))
+        if video_id is None:
+            self.skipped += 1
+            return
+        observed_at = observed_at or datetime.now(UTC)
+
+        author = item.get("author") or {}
+        # Normalized videos only reference their author
+        author_id = to_id(author.get("id") or item.get("author_id"))
+        if author_id is not None and author:
+            self.add_row(
+                AUTHORS,
+                (
+                    author_id,
+                    author.get("unique_id"),
+                    author.get("nickname"),
+                    author.get("sec_uid"),
+                    author.get("signature"),
+                    author.get("verified"),
+                    author.get("private_account"),
+                    observed_at,
+                ),
+            )
+
+        music = item.get("music") or {}
+        # Normalized videos only reference their music
+        music_id = to_id(music.get("id") or item.get("music_id"))
+        if music_id is not None and music:
+            self.add_row(
+                MUSIC,
+                (
+                    music_id,
+                    music.get("title"),
+                    music.get("author_name"),
+                    music.get("album"),
+                    music.get("duration"),
+                    music.get("original"),
+                    observed_at,
+                ),
+            )
+
+        for challenge in item.get("challenges") or []:
+            hashtag_id = to_id(challenge.get("id"))
+            if hashtag_id is None:
+                continue
+            self.add_row(
+                HASHTAGS, (hashtag_id, challenge.get("title"), challenge.get("desc"), observed_at)
+            )
+            self.add_row(VIDEO_HASHTAGS, (video_id, hashtag_id))
+
+        video = item.get("video") or {}
+        self.add_row(
+            VIDEOS,
+            (
+                video_id,
+                author_id,
+                music_id,
+                item.get("desc"),
+                to_time(item.get("create_time")),
+                video.get("duration"),
+                item.get("text_language"),
+                observed_at,
+            ),
+        )
+
+        stats = item.get("stats")
+        if stats:
+            self.add_row(
+                VIDEO_STATS,
+                (
+                    video_id,
+                    observed_at,
+                    stats.get("play_count"),
+                    stats.get("digg_count"),
+                    stats.get("comment_count"),
+                    stats.get("share_count"),
+                    stats.get("collect_count"),
+                ),
+            )
+
+    def add_comment(self, comment: dict[str, Any]) -> None:
+        """Add a comment."""
+        comment_id = to_id(comment.get("cid"))
+        if comment_id is None:
+            self.skipped += 1
+            return
+
+        self.add_row(
+            COMMENTS,
+            (
+                comment_id,
+                to_id(comment.get("aweme_id")),
+                to_id((comment.get("user") or {}).get("uid")),
+                to_id(comment.get("reply_id")) or None,
+                comment.get("text"),
+                comment.get("comment_language"),
+                comment.get("digg_count"),
+                comment.get("reply_comment_total"),
+                to_time(comment.get("create_time")),
+                datetime.now(UTC),
+            ),
+        )
+
+    def extend(self, kind: str, payloads: Iterable[dict[str, Any]]) -> None:
+        """
+        Add payloads of the given kind.
+
+        :param kind: `trending` (responses), `videos` or `comments`
+        :param payloads: the payloads to add
+        """
+        adders: dict[str, Callable[[dict[str, Any]], None]] = {
+            "trending": self.add_trending,
+            "videos": self.add_video,
+            "comments": self.add_comment,
+        }
+        add = adders.get(kind)
+        if add is None:
+            raise ValueError(f"Unknown payload kind '{kind}'")
+        for payload in payloads:
+            add(payload)
+
+
+def flat_video(item: dict[str, Any], observed_at: datetime | None = None) -> dict[str, Any] | None:
+    """
+    Flatten a video with its author, music, stats and hashtags into one record.
+
+    :param item: the video payload
+    :param observed_at: when the stats were observed
+    :return: the record, None if the video has no valid ID
+    """
+    video_id = to_id(item.get("id"))
+    if video_id is None:
+        return None
+
+    author = item.get("author") or {}
+    music = item.get("music") or {}
+    video = item.get("video") or {}
+    stats = item.get("stats") or {}
+    return {
+        "id": video_id,
+        "create_time": to_time(item.get("create_time")),
+        "observed_at": observed_at or datetime.now(UTC),
+        "description": item.get("desc"),
+        "text_language": item.get("text_language"),
+        "author_id": to_id(author.get("id") or item.get("author_id")),
+        "author_unique_id": author.get("unique_id"),
+        "author_nickname": author.get("nickname"),
+        "author_verified": author.get("verified"),
+        "music_id": to_id(music.get("id") or item.get("music_id")),
+        "music_title": music.get("title"),
+        "music_author_name": music.get("author_name"),
+        "music_original": music.get("original"),
+        "video_duration": video.get("duration"),
+        "video_width": video.get("width"),
+        "video_height": video.get("height"),
+        "video_ratio": video.get("ratio"),
+        "video_definition": video.get("definition"),
+        "play_count": stats.get("play_count"),
+        "digg_count": stats.get("digg_count"),
+        "comment_count": stats.get("comment_count"),
+        "share_count": stats.get("share_count"),
+        "collect_count": stats.get("collect_count"),
+        "hashtags": [
+            challenge["title"]
+            for challenge in item.get("challenges") or []
+            if challenge.get("title")
+        ],
+    }
+
+
+def flat_comment(comment: dict[str, Any]) -> dict[str, Any] | None:
+    """Flatten a comment with its author into one record, None if it has no valid ID."""
+    comment_id = to_id(comment.get("cid"))
+    if comment_id is None:
+        return None
+
+    user = comment.get("user") or {}
+    return {
+        "id": comment_id,
+        "create_time": to_time(comment.get("create_time")),
+        "video_id": to_id(comment.get("aweme_id")),
+        "reply_id": to_id(comment.get("reply_id")) or None,
+        "text": comment.get("text"),
+        "language": comment.get("comment_language"),
+        "author_id": to_id(user.get("uid")),
+        "author_unique_id": user.get("unique_id"),
+        "digg_count": comment.get("digg_count"),
+        "reply_count": comment.get("reply_comment_total"),
+    }
+
+
+def flat_records(kind: str, payload: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    Flatten a payload of the given kind into records.
+
+    :param kind: `trending` (responses, into videos), `videos` or `comments`
+    :param payload: the payload to flatten
+    """
+    if kind == "trending":
+        now = (payload.get("extra") or {}).get("now")
+        observed_at = datetime.fromtimestamp(now / 1000, UTC) if now else datetime.now(UTC)
+        items = next((payload[key] for key in ITEM_LIST_KEYS if key in payload), None) or []
+        records = [flat_video(item, observed_at) for item in items]
+    elif kind == "videos":
+        records = [flat_video(payload)]
+    elif kind == "comments":
+        records = [flat_comment(payload)]
+    else:
+        raise ValueError(f"Unknown payload kind '{kind}'")
+    return [record for record in records if record is not None]
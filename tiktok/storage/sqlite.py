@@ -0,0 +1,351 @@
+"""
+An embedded SQLite store of the normalized schema of `tiktok.storage.rows`, for single-node runs.
+
+The database runs in WAL mode: a single writer appends to the log while any number of readers
+(other connections, threads or processes) query the last committed state without blocking it.
+
+`SqliteSink` keeps the event loop free of disk I/O: rows are batched on the loop, then handed
+to a dedicated writer thread which upserts each batch in one transaction, with one prepared
+statement per table (`executemany`). `SqliteReader` queries the store, e.g. while a collector
+is writing to it.
+"""
+
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Sequence
+
+from tiktok.storage.rows import TABLES, RowBatch, Table
+
+_LOGGER = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS authors (
+    id INTEGER PRIMARY KEY,
+    unique_id TEXT,
+    nickname TEXT,
+    sec_uid TEXT,
+    signature TEXT,
+    verified INTEGER,
+    private_account INTEGER,
+    updated_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS music (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    author_name TEXT,
+    album TEXT,
+    duration INTEGER,
+    original INTEGER,
+    updated_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hashtags (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    description TEXT,
+    updated_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS hashtags_title ON hashtags (title);
+CREATE TABLE IF NOT EXISTS videos (
+    id INTEGER PRIMARY KEY,
+    author_id INTEGER,
+    music_id INTEGER,
+    description TEXT,
+    create_time INTEGER,
+    duration INTEGER,
+    text_language TEXT,
+    updated_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_author_id ON videos (author_id);
+CREATE INDEX IF NOT EXISTS videos_create_time ON videos (create_time);
+CREATE TABLE IF NOT EXISTS video_hashtags (
+    video_id INTEGER NOT NULL,
+    hashtag_id INTEGER NOT NULL,
+    PRIMARY KEY (video_id, hashtag_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS video_hashtags_hashtag_id ON video_hashtags (hashtag_id);
+CREATE TABLE IF NOT EXISTS video_stats (
+    video_id INTEGER NOT NULL,
+    observed_at INTEGER NOT NULL,
+    play_count INTEGER,
+    digg_count INTEGER,
+    comment_count INTEGER,
+    share_count INTEGER,
+    collect_count INTEGER,
+    PRIMARY KEY (video_id, observed_at)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY,
+    video_id INTEGER,
+    author_id INTEGER,
+    reply_id INTEGER,
+    text TEXT,
+    language TEXT,
+    digg_count INTEGER,
+    reply_count INTEGER,
+    create_time INTEGER,
+    updated_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS comments_video_id ON comments (video_id);
+"""
+"""The schema, created if missing. Timestamps are stored as Unix seconds."""
+
+_STOP = object()
+"""Writer queue sentinel asking the writer thread to stop."""
+
+
+def upsert_statement(table: Table) -> str:
+    """Return the prepared upsert statement of `table`."""
+    columns = ", ".join(table.columns)
+    placeholders = ", ".join("?" * len(table.columns))
+    conflict = ", ".join(table.key)
+    action = (
+        "DO UPDATE SET " + ", ".join(f"{column} = excluded.{column}" for column in table.values)
+        if table.values
+        else "DO NOTHING"
+    )
+    return (
+        f"INSERT INTO {table.name} ({columns}) VALUES ({placeholders}) "
+        f"ON CONFLICT ({conflict}) {action}"
+    )
+
+
+def connect(path: Path, read_only: bool = False) -> sqlite3.Connection:
+    """Open a connection to the store at `path`, in WAL mode."""
+    if read_only:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode = WAL")
+        # Durable at checkpoints, not every commit: a crash may lose the last transactions only
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.executescript(SCHEMA)
+    connection.execute("PRAGMA busy_timeout = 5000")
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+def _adapt(row: tuple[Any, ...]) -> tuple[Any, ...]:
+    """Store the datetimes of a row as Unix seconds."""
+    return tuple(int(value.timestamp()) if isinstance(value, datetime) else value for value in row)
+
+
+class SqliteSink:
+    """
+    A SQLite sink for one kind of payload, written from a dedicated thread.
+
+    :param path: the database file
+    :param kind: the payload kind: `trending` (responses), `videos` or `comments`
+    :param batch_rows: the rows of a batch, handed to the writer thread as soon as reached
+    :param max_queue: the batches waiting for the writer thread, before `write` waits
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        kind: str = "trending",
+        batch_rows: int = 10_000,
+        max_queue: int = 4,
+    ) -> None:
+        self.path = path
+        self.kind = kind
+        self.batch_rows = batch_rows
+
+        self._batch = RowBatch()
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._error: Exception | None = None
+
+        # Metrics
+        self.rows_written = 0
+        self.transactions = 0
+        self.write_seconds = 0.0
+
+    async def write(self, payloads: Sequence[dict[str, Any]]) -> None:
+        """Add the rows of a group of payloads, handing the batch over once full."""
+        self._raise_error()
+        self._batch.extend(self.kind, payloads)
+        if len(self._batch) >= self.batch_rows:
+            await self._hand_over()
+
+    async def flush(self) -> None:
+        """Hand the pending rows over and wait until the writer thread committed them."""
+        await self._hand_over()
+        if self._thread is not None:
+            done: Future[None] = Future()
+            await self._put(done)
+            await asyncio.wrap_future(done)
+        self._raise_error()
+
+    async def close(self) -> None:
+        """Commit the pending rows and stop the writer thread."""
+        try:
+            await self.flush()
+        finally:
+            if self._thread is not None:
+                await self._put(_STOP)
+                await asyncio.to_thread(self._thread.join)
+                self._thread = None
+
+    async def _hand_over(self) -> None:
+        """Queue the current batch for the writer thread."""
+        if not len(self._batch):
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+            self._thread.start()
+
+        batch, self._batch = self._batch, RowBatch()
+        await self._put(batch)
+
+    async def _put(self, item: Any) -> None:
+        """Queue an item for the writer thread, waiting off the loop if the queue is full."""
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            await asyncio.to_thread(self._queue.put, item)
+
+    def _run(self) -> None:
+        """Commit the queued batches until stopped, in the writer thread."""
+        connection: sqlite3.Connection | None = None
+        try:
+            connection = connect(self.path)
+        except Exception as e:
+            _LOGGER.exception("[SQLite] Cannot open the store -> [path: %s]", self.path)
+            self._error = e
+
+        statements = {table.name: upsert_statement(table) for table in TABLES}
+        try:
+            # Keep draining after an error, so flushes never wait on a dead thread
+            while (item := self._queue.get()) is not _STOP:
+                if isinstance(item, Future):
+                    # Every batch queued before it is committed
+                    item.set_result(None)
+                elif connection is not None and self._error is None:
+                    self._commit(connection, statements, item)
+        finally:
+            if connection is not None:
+                connection.close()
+
+    def _commit(
+        self, connection: sqlite3.Connection, statements: dict[str, str], batch: RowBatch
+    ) -> None:
+        """Upsert a batch in one transaction."""
+        start = time.perf_counter()
+        try:
+            connection.execute("BEGIN")
+            for table in TABLES:
+                records = batch.records(table)
+                if records:
+                    connection.executemany(statements[table.name], map(_adapt, records))
+            connection.execute("COMMIT")
+        except Exception as e:
+            _LOGGER.exception("[SQLite] Batch write failed -> [rows: %s]", len(batch))
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            self._error = e
+            return
+
+        elapsed = time.perf_counter() - start
+        self.rows_written += len(batch)
+        self.transactions += 1
+        self.write_seconds += elapsed
+        _LOGGER.debug("[SQLite] Committed batch -> [rows: %s, latency: %.3f]", len(batch), elapsed)
+
+    def _raise_error(self) -> None:
+        """Raise the error of a failed batch, if any."""
+        if self._error is not None:
+            raise self._error
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the write metrics."""
+        return {
+            "rows_written": self.rows_written,
+            "transactions": self.transactions,
+            "rows_per_second": self.rows_written / self.write_seconds
+            if self.write_seconds
+            else 0.0,
+            "queued_batches": self._queue.qsize(),
+            "pending_rows": len(self._batch),
+        }
+
+
+class SqliteReader:
+    """Read-only queries of a SQLite store, safe while a `SqliteSink` writes to it."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.connection = connect(path, read_only=True)
+
+    def close(self) -> None:
+        """Close the connection."""
+        self.connection.close()
+
+    def __enter__(self) -> "SqliteReader":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> list[dict[str, Any]]:
+        """Run a query, returning its rows as dicts."""
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def counts(self) -> dict[str, int]:
+        """Return the row count of every table."""
+        return {
+            table.name: self.connection.execute(f"SELECT COUNT(*) FROM {table.name}").fetchone()[0]
+            for table in TABLES
+        }
+
+    def video(self, video_id: int) -> dict[str, Any] | None:
+        """Return a video, None if not stored."""
+        rows = self.query("SELECT * FROM videos WHERE id = ?", (video_id,))
+        return rows[0] if rows else None
+
+    def videos_by_author(self, author_id: int, limit: int = 100) -> list[dict[str, Any]]:
+        """Return the latest videos of an author."""
+        return self.query(
+            "SELECT * FROM videos WHERE author_id = ? ORDER BY create_time DESC LIMIT ?",
+            (author_id, limit),
+        )
+
+    def videos_by_hashtag(self, title: str, limit: int = 100) -> list[dict[str, Any]]:
+        """Return the latest videos of a hashtag, by title."""
+        return self.query(
+            "SELECT videos.* FROM hashtags "
+            "JOIN video_hashtags ON video_hashtags.hashtag_id = hashtags.id "
+            "JOIN videos ON videos.id = video_hashtags.video_id "
+            "WHERE hashtags.title = ? ORDER BY videos.create_time DESC LIMIT ?",
+            (title, limit),
+        )
+
+    def videos_created_between(
+        self, start: datetime, end: datetime, limit: int = 1000
+    ) -> list[dict[str, Any]]:
+        """Return the videos created in `[start, end)`."""
+        return self.query(
+            "SELECT * FROM videos WHERE create_time >= ? AND create_time < ? "
+            "ORDER BY create_time LIMIT ?",
+            (int(start.timestamp()), int(end.timestamp()), limit),
+        )
+
+    def stats(self, video_id: int) -> list[dict[str, Any]]:
+        """Return the stats snapshots of a video, oldest first."""
+        return self.query(
+            "SELECT * FROM video_stats WHERE video_id = ? ORDER BY observed_at", (video_id,)
+        )
+
+    def comments(self, video_id: int, limit: int = 100) -> list[dict[str, Any]]:
+        """Return the comments of a video, most liked first."""
+        return self.query(
+            "SELECT * FROM comments WHERE video_id = ? ORDER BY digg_count DESC LIMIT ?",
+            (video_id, limit),
+        )